@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+
+from board import Board
+
+# Arguments stored by init_worker in each worker process of a pool
+worker_args = None
+
+
+def init_worker(*args):
+    """Store arguments in a worker process of a pool, as the pool's initializer."""
+    global worker_args
+    worker_args = args
+
+
+def seed_game(seed, index):
+    """
+    Seed the random number generators for one game of a run, so that game i plays the
+    same way whatever the number of workers.
+
+    Parameters
+    ----------
+    seed (int): The seed of the whole run.
+    index (int): The index of the game.
+
+    Returns
+    -------
+    int: The seed of the game, which the random and np.random generators are seeded with.
+    """
+    game_seed = int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+    np.random.seed(game_seed)
+    random.seed(game_seed)
+    return game_seed
+
+
+def play_match(player_1, player_2, verbose=False, on_move=None):
+    """
+    Play a game of Othello between two players in this process.
+
+    Parameters
+    ----------
+    player_1 (Player): The player who moves first.
+    player_2 (Player): The player who moves second.
+    verbose (bool): Whether to print the moves and the final board.
+    on_move (function): Called with the board, the number of the player and the move
+        before each move is made, or None.
+
+    Returns
+    -------
+    tuple[int, int]: The scores of the two players.
+
+    Raises
+    ------
+    ValueError: If a player selects an invalid move.
+    """
+    players = [None, player_1, player_2]
+    board = Board()
+    player_number = 1
+    while True:
+        moves = board.get_valid_moves(player_number)
+        if not moves:
+            if board.check_game_over():
+                break
+            # the player has to pass
+            if verbose:
+                print(f"Player {player_number} passed")
+            player_number = 3 - player_number
+            continue
+        move = players[player_number].get_move(board.position, player_number)
+        if move not in moves:
+            raise ValueError(f"Player {player_number} played an invalid move: {move}")
+        if verbose:
+            print(f"Player {player_number} played {move}")
+        if on_move is not None:
+            on_move(board, player_number, move)
+        board.make_move(move[0], move[1], player_number)
+        player_number = 3 - player_number
+    p1_score = board.score(1)
+    p2_score = board.score(2)
+    if verbose:
+        board.print_board()
+        print("\033[31mPlayer One\033[0m:", p1_score)
+        print("\033[34mPlayer Two\033[0m:", p2_score)
+    return (p1_score, p2_score)
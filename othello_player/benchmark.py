@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from board import Board, _move_cache
+from player import Player, Strategy
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# A benchmark regresses when it is this fraction slower than its baseline
+THRESHOLD = 0.2
+# Number of empty squares of the positions of each phase of the corpus
+PHASE_EMPTIES = {'opening': 50, 'midgame': 30, 'endgame': 12}
+
+
+def build_corpus(num_games=8, seed=0):
+    """
+    Build the fixed corpus of positions by playing random games with a fixed seed.
+
+    Parameters
+    ----------
+    num_games (int): The number of games to take positions from.
+    seed (int): The seed of the random games.
+
+    Returns
+    -------
+    dict[str, list[tuple[list[list[int]], int]]]: The (board_state, player_number) of the
+        positions of each phase, where the player to move has at least one legal move.
+    """
+    rng = random.Random(seed)
+    corpus = {phase: [] for phase in PHASE_EMPTIES}
+    phases = {empties: phase for phase, empties in PHASE_EMPTIES.items()}
+    for _ in range(num_games):
+        board = Board()
+        player_number = 1
+        while not board.check_game_over():
+            moves = board.get_valid_moves(player_number)
+            if moves:
+                empties = 64 - board.score(1) - board.score(2)
+                if empties in phases:
+                    corpus[phases[empties]].append((board.board_state, player_number))
+                move = rng.choice(moves)
+                board.make_move(move[0], move[1], player_number)
+            player_number = 3 - player_number
+    return corpus
+
+
+def make_move_and_unmake(board, player_number):
+    """Make and take back every legal move of a position, generating them without the memo."""
+    _move_cache.clear()
+    for move in board.get_valid_moves(player_number):
+        board.unmake_move(board.make_move(move[0], move[1], player_number))
+
+
+def get_benchmarks():
+    """
+    Get the functions to time.
+
+    Returns
+    -------
+    dict[str, tuple[bool, function]]: For each benchmark, whether the function takes a
+        Board (or else a board_state), and the function, which is called with the
+        position and the number of the player to move.
+    """
+    players = {strategy: Player(strategy, search_depth=3, tt_size_mb=1)
+               for strategy in (Strategy.RANDOM, Strategy.GREEDY, Strategy.MAX_STABLE,
+                                Strategy.ALPHA_BETA)}
+
+    # the move generation benchmarks empty the memo of the boards' legal moves every
+    # call, so they time bitboard.get_moves and has_moves instead of a lookup
+    def get_valid_moves(board, player_number):
+        _move_cache.clear()
+        return board.get_valid_moves(player_number)
+
+    def check_game_over(board, player_number):
+        _move_cache.clear()
+        return board.check_game_over()
+
+    def alpha_beta_select(board_state, player_number):
+        # an empty table every call, so every call searches the same tree
+        searcher = players[Strategy.ALPHA_BETA].searcher
+        if searcher.tt is not None:
+            searcher.tt.clear()
+        return players[Strategy.ALPHA_BETA].alpha_beta_select(board_state, player_number)
+
+    return {
+        'get_valid_moves': (True, get_valid_moves),
+        'make_move': (True, make_move_and_unmake),
+        'count_stable_discs': (True, lambda board, player_number: board.count_stable_discs(player_number)),
+        'check_game_over': (True, check_game_over),
+        'random_select': (False, players[Strategy.RANDOM].random_select),
+        'greedy_select': (False, players[Strategy.GREEDY].greedy_select),
+        'max_stable_select': (False, players[Strategy.MAX_STABLE].max_stable_select),
+        'alpha_beta_select': (False, alpha_beta_select),
+    }
+
+
+def run_benchmarks(corpus, repeat=5, min_time=0.05, names=None):
+    """
+    Time every benchmark on the positions of every phase.
+
+    Each benchmark is called on all the positions of a phase in a loop, which is run
+    enough times to take at least min_time. The fastest of repeat such runs is kept.
+
+    Parameters
+    ----------
+    corpus (dict[str, list[tuple[list[list[int]], int]]]): The positions (see build_corpus).
+    repeat (int): The number of timed runs of each benchmark.
+    min_time (float): The shortest time of one run, in seconds.
+    names (list[str]): The benchmarks to run, or None for all of them.
+
+    Returns
+    -------
+    dict[str, float]: The seconds per call of each benchmark, by "<name>/<phase>".
+    """
+    np.random.seed(0)
+    results = {}
+    for name, (takes_board, function) in get_benchmarks().items():
+        if names is not None and name not in names:
+            continue
+        for phase, positions in corpus.items():
+            calls = [(Board(board_state) if takes_board else board_state, player_number)
+                     for board_state, player_number in positions]
+            loops = 1
+            while True:
+                start = time.perf_counter()
+                for _ in range(loops):
+                    for position, player_number in calls:
+                        function(position, player_number)
+                if time.perf_counter() - start >= min_time:
+                    break
+                loops *= 2
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    for position, player_number in calls:
+                        function(position, player_number)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[f'{name}/{phase}'] = best / (loops * len(calls))
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Find the benchmarks that are slower than their baseline.
+
+    Parameters
+    ----------
+    results (dict[str, float]): The seconds per call of each benchmark.
+    baseline (dict[str, float]): The stored seconds per call of each benchmark.
+    threshold (float): The fraction by which a benchmark may be slower than its baseline.
+
+    Returns
+    -------
+    list[tuple[str, float, float]]: The name, baseline and result of each regression.
+        Benchmarks without a baseline are skipped.
+    """
+    return [(name, baseline[name], result) for name, result in results.items()
+            if name in baseline and result > baseline[name] * (1 + threshold)]
+
+
+def load_baseline(path=BASELINE_PATH):
+    """
+    Load stored benchmark results.
+
+    Parameters
+    ----------
+    path (str): The path of the baseline file.
+
+    Returns
+    -------
+    dict[str, float]: The seconds per call of each benchmark, or an empty dict if the
+        file does not exist.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """
+    Store benchmark results as the new baseline.
+
+    Parameters
+    ----------
+    results (dict[str, float]): The seconds per call of each benchmark.
+    path (str): The path of the baseline file.
+    """
+    with open(path, 'w') as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    """
+    Run the benchmarks and compare them with the stored baseline.
+    Exits with status 1 if a benchmark regressed.
+
+    Parameters
+    ----------
+    --save: Store the results as the new baseline.
+    --threshold=<fraction>: The fraction by which a benchmark may be slower than its
+        baseline (default: 0.2).
+    --repeat=<n>: The number of timed runs of each benchmark (default: 5).
+    --baseline=<path>: The baseline file (default: benchmark_baseline.json).
+    names: The benchmarks to run (default: all).
+    """
+    save = False
+    threshold = THRESHOLD
+    repeat = 5
+    path = BASELINE_PATH
+    names = []
+    for arg in sys.argv[1:]:
+        if arg == '--save':
+            save = True
+        elif arg.startswith('--threshold='):
+            threshold = float(arg[len('--threshold='):])
+        elif arg.startswith('--repeat=') and arg[len('--repeat='):].isnumeric():
+            repeat = int(arg[len('--repeat='):])
+        elif arg.startswith('--baseline='):
+            path = arg[len('--baseline='):]
+        elif arg in get_benchmarks():
+            names.append(arg)
+        else:
+            print("Usage: python benchmark.py [--save] [--threshold=<fraction>] "
+                  "[--repeat=<n>] [--baseline=<path>] [<benchmark> ...]")
+            sys.exit(1)
+    baseline = load_baseline(path)
+    results = run_benchmarks(build_corpus(), repeat, names=names or None)
+    for name, result in results.items():
+        line = f"{name:32} {result * 1e6:12.2f} µs"
+        if name in baseline:
+            line += f" {(result / baseline[name] - 1) * 100:+7.1f}%"
+        print(line)
+    regressions = compare(results, baseline, threshold)
+    if save:
+        save_baseline({**baseline, **results}, path)
+        print(f"Baseline saved to {path}")
+    elif regressions:
+        for name, base, result in regressions:
+            print(f"\033[31mRegression\033[0m: {name} {base * 1e6:.2f} µs -> {result * 1e6:.2f} µs")
+        sys.exit(1)
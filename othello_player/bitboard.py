@@ -0,0 +1,354 @@
+"""
+Bitboard primitives for Othello.
+
+A position is stored as two 64-bit integer masks, one per player. Square
+(row, col) maps to bit ``row * 8 + col``, so iterating bits from low to high
+visits the board in the same row-major order as the nested ``board_state`` lists.
+"""
+
+FULL = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101  # column 0
+FILE_H = 0x8080808080808080  # column 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+CORNERS = 0x8100000000000081
+
+# (shift, mask) pairs for each direction in board.DIRECTIONS order.
+# Shifting a mask moves every bit one step in that direction, and the mask
+# removes bits that wrapped around from the opposite edge of the board.
+SHIFTS = [(1, NOT_FILE_A), (-1, NOT_FILE_H), (8, FULL), (-8, FULL),
+          (9, NOT_FILE_A), (-9, NOT_FILE_H), (7, NOT_FILE_H), (-7, NOT_FILE_A)]
+
+# Stability is checked along 4 axes, each made of a pair of opposite directions.
+# Every axis is stored as (edge, forward, backward), where edge is the set of
+# squares missing a neighbour on at least one side of the axis, so a disc there
+# can never be flanked along that axis.
+STABILITY_AXES = [
+    (FULL ^ ((FULL << forward[0]) & forward[1] & FULL & (FULL >> -backward[0]) & backward[1]),
+     forward, backward)
+    for forward, backward in zip(SHIFTS[0::2], SHIFTS[1::2])
+]
+
+
+def square(row, col):
+    """
+    Convert a board coordinate to a bit index.
+
+    Parameters
+    ----------
+    row (int): The row index.
+    col (int): The column index.
+
+    Returns
+    -------
+    int: The bit index of the square.
+    """
+    return row * 8 + col
+
+
+def shift(bits, step, mask):
+    """
+    Shift every bit of a mask one step in a direction.
+
+    Parameters
+    ----------
+    bits (int): The mask to shift.
+    step (int): The change in bit index (positive moves towards higher rows/columns).
+    mask (int): The mask that removes bits wrapping around the board edge.
+
+    Returns
+    -------
+    int: The shifted mask.
+    """
+    if step > 0:
+        return (bits << step) & mask & FULL
+    return (bits >> -step) & mask
+
+
+def get_moves(player, opponent):
+    """
+    Compute the legal moves for a player with a shift-based fill in all 8 directions.
+
+    Parameters
+    ----------
+    player (int): The mask of the player's discs.
+    opponent (int): The mask of the opponent's discs.
+
+    Returns
+    -------
+    int: A mask with a bit set on every legal move.
+    """
+    empty = FULL ^ (player | opponent)
+    moves = 0
+    for step, mask in SHIFTS:
+        if step > 0:
+            candidates = ((player << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            moves |= (candidates << step) & mask
+        else:
+            step = -step
+            candidates = ((player >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            moves |= (candidates >> step) & mask
+    return moves & empty
+
+
+def has_moves(player, opponent):
+    """
+    Check whether a player has a legal move, stopping at the first direction with one.
+
+    Parameters
+    ----------
+    player (int): The mask of the player's discs.
+    opponent (int): The mask of the opponent's discs.
+
+    Returns
+    -------
+    bool: True if get_moves(player, opponent) is not empty.
+    """
+    empty = FULL ^ (player | opponent)
+    for step, mask in SHIFTS:
+        if step > 0:
+            candidates = ((player << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            candidates |= ((candidates << step) & mask) & opponent
+            if (candidates << step) & mask & empty:
+                return True
+        else:
+            step = -step
+            candidates = ((player >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            candidates |= ((candidates >> step) & mask) & opponent
+            if (candidates >> step) & mask & empty:
+                return True
+    return False
+
+
+def get_flips_direction(player, opponent, move_bit, step, mask):
+    """
+    Compute the discs flipped in one direction by a move.
+
+    Parameters
+    ----------
+    player (int): The mask of the player's discs.
+    opponent (int): The mask of the opponent's discs.
+    move_bit (int): A mask with only the bit of the move set.
+    step (int): The change in bit index for the direction.
+    mask (int): The wrap-around mask for the direction.
+
+    Returns
+    -------
+    int: A mask of the discs flipped in this direction (0 if none).
+    """
+    flips = 0
+    bit = shift(move_bit, step, mask)
+    while bit & opponent:
+        flips |= bit
+        bit = shift(bit, step, mask)
+    if bit & player:
+        return flips
+    return 0
+
+
+def get_flips(player, opponent, move_bit):
+    """
+    Compute all discs flipped by a move.
+
+    Parameters
+    ----------
+    player (int): The mask of the player's discs.
+    opponent (int): The mask of the opponent's discs.
+    move_bit (int): A mask with only the bit of the move set.
+
+    Returns
+    -------
+    int: A mask of every disc flipped by the move (0 if the move flips nothing).
+    """
+    flips = 0
+    for step, mask in SHIFTS:
+        flips |= get_flips_direction(player, opponent, move_bit, step, mask)
+    return flips
+
+
+def get_stable(player, stable=0):
+    """
+    Compute the stable discs of a player.
+
+    A disc is stable if it is a corner, or if along each of the 4 axes at least
+    one neighbour is off the board or is another stable disc of the same player.
+    The stable set is grown from the edges of the board until it stops changing.
+
+    Parameters
+    ----------
+    player (int): The mask of the player's discs.
+    stable (int): A mask of discs already known to be stable, e.g. the player's
+        stable discs in the parent position. Stable discs can never be flipped,
+        so they remain stable after any move and the search can start from them.
+
+    Returns
+    -------
+    int: A mask of the player's stable discs.
+    """
+    stable &= player
+    while True:
+        candidates = player & ~stable
+        for edge, (step_1, mask_1), (step_2, mask_2) in STABILITY_AXES:
+            candidates &= edge | ((stable << step_1) & mask_1 & FULL) | \
+                ((stable >> -step_2) & mask_2)
+            if not candidates:
+                return stable
+        stable |= candidates
+
+
+def flip_vertical(bits):
+    """
+    Mirror a mask top to bottom (row r becomes row 7 - r).
+
+    Parameters
+    ----------
+    bits (int): The mask to mirror.
+
+    Returns
+    -------
+    int: The mirrored mask.
+    """
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def flip_horizontal(bits):
+    """
+    Mirror a mask left to right (column c becomes column 7 - c).
+
+    Parameters
+    ----------
+    bits (int): The mask to mirror.
+
+    Returns
+    -------
+    int: The mirrored mask.
+    """
+    bits = ((bits >> 1) & 0x5555555555555555) | ((bits & 0x5555555555555555) << 1)
+    bits = ((bits >> 2) & 0x3333333333333333) | ((bits & 0x3333333333333333) << 2)
+    return ((bits >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bits & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def flip_diagonal(bits):
+    """
+    Mirror a mask along the main diagonal (square (r, c) becomes (c, r)).
+
+    Parameters
+    ----------
+    bits (int): The mask to mirror.
+
+    Returns
+    -------
+    int: The mirrored mask.
+    """
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    return bits ^ t ^ (t >> 7)
+
+
+def transform(bits, symmetry):
+    """
+    Apply one of the 8 symmetries of the board to a mask.
+
+    Parameters
+    ----------
+    bits (int): The mask to transform.
+    symmetry (int): The symmetry (0-7). Bit 0 mirrors left to right, bit 1 mirrors top to
+        bottom and bit 2 mirrors along the main diagonal, applied in that order.
+
+    Returns
+    -------
+    int: The transformed mask.
+    """
+    if symmetry & 1:
+        bits = flip_horizontal(bits)
+    if symmetry & 2:
+        bits = flip_vertical(bits)
+    if symmetry & 4:
+        bits = flip_diagonal(bits)
+    return bits
+
+
+def iter_bits(bits):
+    """
+    Iterate over the indices of the set bits of a mask, from low to high.
+
+    Parameters
+    ----------
+    bits (int): The mask to iterate over.
+
+    Yields
+    ------
+    int: The index of each set bit.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def to_rows(player_1, player_2):
+    """
+    Convert a pair of masks to the nested list format used by the server.
+
+    Parameters
+    ----------
+    player_1 (int): The mask of player 1's discs.
+    player_2 (int): The mask of player 2's discs.
+
+    Returns
+    -------
+    list[list[int]]: The board state, with 0 for empty, 1 and 2 for each player.
+    """
+    board_state = []
+    for row in range(8):
+        row_1 = player_1 >> (row * 8)
+        row_2 = player_2 >> (row * 8)
+        board_state.append([1 if row_1 >> col & 1 else 2 if row_2 >> col & 1 else 0
+                            for col in range(8)])
+    return board_state
+
+
+def from_rows(board_state):
+    """
+    Convert the nested list format used by the server to a pair of masks.
+
+    Parameters
+    ----------
+    board_state (list[list[int]]): The board state, with 0 for empty, 1 and 2 for each player.
+
+    Returns
+    -------
+    tuple[int, int]: The masks of player 1's and player 2's discs.
+    """
+    player_1 = 0
+    player_2 = 0
+    bit = 1
+    for row in board_state:
+        for cell in row:
+            if cell == 1:
+                player_1 |= bit
+            elif cell == 2:
+                player_2 |= bit
+            bit <<= 1
+    return player_1, player_2
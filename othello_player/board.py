@@ -1,6 +1,10 @@
-from copy import deepcopy
 from enum import Enum
 
+import bitboard
+import zobrist
+from metrics import counters
+from position import Position
+
 
 class GameResult(Enum):
     """Enum for the different possible results of a game."""
@@ -9,6 +13,11 @@ class GameResult(Enum):
     LOSE = 2
 
 
+# Largest number of positions whose legal moves are remembered before the memo is emptied
+MOVE_CACHE_ENTRIES = 1 << 16
+# Legal move mask of recently seen positions, by (p1 mask, p2 mask, player number)
+_move_cache = {}
+
 # Directions for checking valid moves
 DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0),
               (1, 1), (-1, -1), (1, -1), (-1, 1)]
@@ -17,24 +26,62 @@ DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0),
 class Board:
     """
     Class to represent the state of the Othello board and perform operations on it.
+
+    The position is stored as one 64-bit mask per player (see bitboard.py).
+    The nested list format used by the server is still accepted and emitted
+    through the board_state property. The disc counts and the Zobrist hash of the
+    position (see zobrist.py) are updated incrementally on every move.
     """
 
     def __init__(self, board_state=None):
         """
         Parameters
         ----------
-        board_state (list[list[int]]): The current state of the board.
+        board_state (list[list[int]] or Position): The current state of the board.
             0 represents an empty space, 1 represents a piece belonging to player 1,
-            and 2 represents a piece belonging to player 2.
+            and 2 represents a piece belonging to player 2. A Position is used as is.
         """
+        self.patterns = None  # PatternEvaluator kept up to date by the moves, if attached
         if board_state is not None:
-            self.board_state = deepcopy(board_state)
+            self.board_state = board_state
+        else:
+            # index 0 is unused so that the masks can be indexed by player number
+            self.bitboards = [0, 0x0000001008000000, 0x0000000810000000]
+            self.disc_counts = [0, 2, 2]
+            self.hash = zobrist.hash_position(self.bitboards[1], self.bitboards[2])
+
+    @property
+    def board_state(self):
+        """list[list[int]]: The state of the board in the nested list format used by the server."""
+        return bitboard.to_rows(self.bitboards[1], self.bitboards[2])
+
+    @board_state.setter
+    def board_state(self, board_state):
+        if isinstance(board_state, Position):
+            player_1, player_2 = board_state
         else:
-            self.board_state = [[0 for _ in range(8)] for _ in range(8)]
-            self.board_state[3][3] = 1
-            self.board_state[3][4] = 2
-            self.board_state[4][3] = 2
-            self.board_state[4][4] = 1
+            player_1, player_2 = bitboard.from_rows(board_state)
+        self.bitboards = [0, player_1, player_2]
+        self.disc_counts = [0, player_1.bit_count(), player_2.bit_count()]
+        self.hash = zobrist.hash_position(player_1, player_2)
+        if self.patterns is not None:
+            self.patterns.reset(player_1, player_2)
+
+    @property
+    def position(self):
+        """Position: An immutable snapshot of the board."""
+        return Position(self.bitboards[1], self.bitboards[2])
+
+    def attach_patterns(self, patterns):
+        """
+        Keep a pattern evaluator up to date with the moves made on the board.
+
+        Parameters
+        ----------
+        patterns (PatternEvaluator): The evaluator, which is reset to the current position.
+        """
+        self.patterns = patterns
+        patterns.reset(self.bitboards[1], self.bitboards[2])
 
     def print_board(self, moves=[]):
         """
@@ -46,24 +93,25 @@ class Board:
             Each move is represented as a list of two integers, [row, column].
         """
         alphabet = 'abcdefgh'
+        board_state = self.board_state
         print(end='   ')
-        for i in range(len(self.board_state)):
+        for i in range(len(board_state)):
             print(alphabet[i], end='  ')
         print()
-        for row in range(len(self.board_state)):
+        for row in range(len(board_state)):
             print(row, end=' ')
-            for col in range(len(self.board_state[row])):
+            for col in range(len(board_state[row])):
                 if [row, col] in moves:
                     print(' ◉', end=' ')
-                elif self.board_state[row][col] == 0:
+                elif board_state[row][col] == 0:
                     print(' ▢', end=' ')
-                elif self.board_state[row][col] == 1:
+                elif board_state[row][col] == 1:
                     print(' \033[31m1\033[0m', end=' ')
                 else:
                     print(' \033[34m2\033[0m', end=' ')
             print(' '+str(row))
         print(end='   ')
-        for i in range(len(self.board_state)):
+        for i in range(len(board_state)):
             print(alphabet[i], end='  ')
         print()
 
@@ -79,7 +127,7 @@ class Board:
         -------
         int: The score of the player.
         """
-        return sum(row.count(player_number) for row in self.board_state)
+        return self.disc_counts[player_number]
 
     def check_game_over(self):
         """
@@ -89,9 +137,7 @@ class Board:
         -------
         bool: True if the game is over, False otherwise.
         """
-        player_1_no_moves = self.get_valid_moves(1) == []
-        player_2_no_moves = self.get_valid_moves(2) == []
-        return player_1_no_moves and player_2_no_moves
+        return not (self.has_any_move(1) or self.has_any_move(2))
 
     def get_game_result(self, player_number):
         """
@@ -127,7 +173,7 @@ class Board:
         -------
         bool: True if the position is within the bounds of the board, False otherwise.
         """
-        return 0 <= row < len(self.board_state) and 0 <= col < len(self.board_state[row])
+        return 0 <= row < 8 and 0 <= col < 8
 
     def is_valid_direction(self, row, col, direction, player_number):
         """
@@ -145,19 +191,13 @@ class Board:
         -------
         bool: True if the move is valid in the given direction, False otherwise.
         """
-        dx, dy = direction
-        x, y = row + dx, col + dy
-        opponent_number = 1 if player_number == 2 else 2
-        if not self.is_in_bounds(x, y) or self.board_state[x][y] != opponent_number:
+        if not self.is_in_bounds(row, col):
             return False
-        while self.is_in_bounds(x, y):
-            if self.board_state[x][y] == player_number:
-                return True
-            elif self.board_state[x][y] == 0:
-                return False
-            x += dx
-            y += dy
-        return False
+        step, mask = bitboard.SHIFTS[DIRECTIONS.index(direction)]
+        player = self.bitboards[player_number]
+        opponent = self.bitboards[3 - player_number]
+        move_bit = 1 << bitboard.square(row, col)
+        return bitboard.get_flips_direction(player, opponent, move_bit, step, mask) != 0
 
     def is_valid_move(self, row, col, player_number):
         """
@@ -173,14 +213,70 @@ class Board:
         -------
         bool: True if the move is valid, False otherwise.
         """
+        move_bit = 1 << bitboard.square(row, col)
+        player = self.bitboards[player_number]
+        opponent = self.bitboards[3 - player_number]
         # Check if the move is available
-        if self.board_state[row][col] != 0:
+        if (player | opponent) & move_bit:
             return False
-        # Check if the move is valid in any direction
-        for direction in DIRECTIONS:
-            if self.is_valid_direction(row, col, direction, player_number):
-                return True
-        return False
+        # Check if the move flips a piece in any direction
+        return bitboard.get_flips(player, opponent, move_bit) != 0
+
+    def get_moves(self, player_number):
+        """
+        Get the legal moves of a player as a mask, remembering them for the position.
+
+        Parameters
+        ----------
+        player_number (int): The number of the player (1 or 2).
+
+        Returns
+        -------
+        int: A mask with a bit set on every legal move (see bitboard.get_moves).
+        """
+        key = (self.bitboards[1], self.bitboards[2], player_number)
+        moves = _move_cache.get(key)
+        if moves is None:
+            moves = bitboard.get_moves(self.bitboards[player_number], self.bitboards[3 - player_number])
+            if len(_move_cache) >= MOVE_CACHE_ENTRIES:
+                _move_cache.clear()
+            _move_cache[key] = moves
+        return moves
+
+    def has_any_move(self, player_number):
+        """
+        Check whether a player has a legal move, without listing the moves.
+
+        Parameters
+        ----------
+        player_number (int): The number of the player (1 or 2).
+
+        Returns
+        -------
+        bool: True if the player has at least one legal move.
+        """
+        moves = _move_cache.get((self.bitboards[1], self.bitboards[2], player_number))
+        if moves is not None:
+            return moves != 0
+        return bitboard.has_moves(self.bitboards[player_number], self.bitboards[3 - player_number])
+
+    def iter_valid_moves(self, player_number):
+        """
+        Iterate over the valid moves of a player, in the order of get_valid_moves. Each
+        move is only decoded, and counted, when it is reached, so stopping at the first
+        one does no work for the others.
+
+        Parameters
+        ----------
+        player_number (int): The number of the current player (1 or 2).
+
+        Yields
+        ------
+        list[int]: Each valid move as a list of two integers, [row, column].
+        """
+        for square in bitboard.iter_bits(self.get_moves(player_number)):
+            counters.moves_generated += 1
+            yield [square >> 3, square & 7]
 
     def get_valid_moves(self, player_number):
         """
@@ -195,12 +291,9 @@ class Board:
         list[list[int]]: A list of valid moves for the player.
             Each move is represented as a list of two integers, [row, column].
         """
-        valid_moves = []
-        for row in range(len(self.board_state)):
-            for col in range(len(self.board_state[row])):
-                if self.is_valid_move(row, col, player_number):
-                    valid_moves.append([row, col])
-        return valid_moves
+        moves = self.get_moves(player_number)
+        counters.moves_generated += moves.bit_count()
+        return [[square >> 3, square & 7] for square in bitboard.iter_bits(moves)]
 
     def flip_pieces(self, row, col, direction, player_number):
         """
@@ -214,22 +307,17 @@ class Board:
             The first element is the change in row, and the second element is the change in column.
         player_number (int): The number of the current player (1 or 2).
         """
-        dx, dy = direction
-        x, y = row + dx, col + dy
-        opponent_number = 1 if player_number == 2 else 2
-        if not self.is_in_bounds(x, y) or self.board_state[x][y] != opponent_number:
-            return
-        pieces_to_flip = []
-        while self.is_in_bounds(x, y):
-            if self.board_state[x][y] == player_number:
-                for piece in pieces_to_flip:
-                    self.board_state[piece[0]][piece[1]] = player_number
-                return
-            elif self.board_state[x][y] == 0:
-                return
-            pieces_to_flip.append([x, y])
-            x += dx
-            y += dy
+        step, mask = bitboard.SHIFTS[DIRECTIONS.index(direction)]
+        player = self.bitboards[player_number]
+        opponent = self.bitboards[3 - player_number]
+        move_bit = 1 << bitboard.square(row, col)
+        flips = bitboard.get_flips_direction(player, opponent, move_bit, step, mask)
+        self.bitboards[player_number] = player | flips
+        self.bitboards[3 - player_number] = opponent ^ flips
+        num_flips = flips.bit_count()
+        self.disc_counts[player_number] += num_flips
+        self.disc_counts[3 - player_number] -= num_flips
+        self.hash ^= zobrist.hash_flips(flips)
 
     def make_move(self, row, col, player_number):
         """
@@ -240,11 +328,47 @@ class Board:
         row (int): The row index of the move.
         col (int): The column index of the move.
         player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        tuple[int, int, int, int]: An undo record of (move bit, flipped discs, player number,
+            previous hash) that can be passed to unmake_move to take the move back.
+        """
+        square = bitboard.square(row, col)
+        move_bit = 1 << square
+        player = self.bitboards[player_number]
+        opponent = self.bitboards[3 - player_number]
+        flips = bitboard.get_flips(player, opponent, move_bit)
+        assert (flips and not (player | opponent) & move_bit)
+        self.bitboards[player_number] = player | flips | move_bit
+        self.bitboards[3 - player_number] = opponent ^ flips
+        num_flips = flips.bit_count()
+        self.disc_counts[player_number] += num_flips + 1
+        self.disc_counts[3 - player_number] -= num_flips
+        previous_hash = self.hash
+        self.hash ^= zobrist.KEYS[player_number][square] ^ zobrist.hash_flips(flips)
+        counters.moves_made += 1
+        if self.patterns is not None:
+            self.patterns.make(square, flips, player_number)
+        return (move_bit, flips, player_number, previous_hash)
+
+    def unmake_move(self, undo):
         """
-        assert (self.is_valid_move(row, col, player_number))
-        self.board_state[row][col] = player_number
-        for direction in DIRECTIONS:
-            self.flip_pieces(row, col, direction, player_number)
+        Take back a move made with make_move.
+
+        Parameters
+        ----------
+        undo (tuple[int, int, int, int]): The undo record returned by make_move.
+            Moves must be taken back in the reverse order they were made.
+        """
+        move_bit, flips, player_number, self.hash = undo
+        self.bitboards[player_number] ^= flips | move_bit
+        self.bitboards[3 - player_number] |= flips
+        num_flips = flips.bit_count()
+        self.disc_counts[player_number] -= num_flips + 1
+        self.disc_counts[3 - player_number] += num_flips
+        if self.patterns is not None:
+            self.patterns.unmake()
 
     def is_corner_piece(self, row, col):
         """
@@ -261,62 +385,39 @@ class Board:
         """
         return (row == 0 or row == 7) and (col == 0 or col == 7)
 
-    def count_stable_discs(self, player_number):
+    def get_stable_discs(self, player_number, stable=0):
+        """
+        Get a mask of the stable discs for a player.
+
+        Parameters
+        ----------
+        player_number (int): The number of the player (1 or 2).
+        stable (int): The player's stable discs in the parent position, if known.
+            Stable discs stay stable after any move, so passing them in lets the
+            stable set be updated from the parent instead of recomputed from the corners.
+
+        Returns
+        -------
+        int: A mask of the player's stable discs (see bitboard.get_stable).
+        """
+        counters.stability_evals += 1
+        return bitboard.get_stable(self.bitboards[player_number], stable)
+
+    def count_stable_discs(self, player_number, stable=0):
         """
         Count the number of stable discs for a player.
 
         Parameters
         ----------
         player_number (int): The number of the player (1 or 2).
+        stable (int): The player's stable discs in the parent position, if known.
 
         Returns
         -------
         int: The number of stable discs for the player.
         """
+        counters.stability_evals += 1
         # check if corner pieces are not stable for the player
-        if self.board_state[0][0] != player_number and \
-                self.board_state[0][7] != player_number and \
-                self.board_state[7][0] != player_number and \
-                self.board_state[7][7] != player_number:
+        if not (self.bitboards[player_number] & bitboard.CORNERS or stable):
             return 0
-        board_stable = [[False for _ in range(8)] for _ in range(8)]
-        board_stable_prev = [[True for _ in range(8)] for _ in range(8)]
-        while (board_stable != board_stable_prev):
-            board_stable_prev = deepcopy(board_stable)
-            for row in range(len(self.board_state)):
-                for col in range(len(self.board_state[row])):
-                    if self.board_state[row][col] == player_number:
-                        if self.is_corner_piece(row, col):
-                            board_stable[row][col] = True
-                        else:
-                            # check if the piece can be flipped vertically
-                            x1, y1 = row+1, col
-                            stable1 = (not self.is_in_bounds(x1, y1)
-                                       ) or board_stable[x1][y1] == True
-                            x2, y2 = row-1, col
-                            stable2 = (not self.is_in_bounds(x2, y2)
-                                       ) or board_stable[x2][y2] == True
-                            # check if the piece can be flipped horizontally
-                            x3, y3 = row, col+1
-                            stable3 = (not self.is_in_bounds(x3, y3)
-                                       ) or board_stable[x3][y3] == True
-                            x4, y4 = row, col-1
-                            stable4 = (not self.is_in_bounds(x4, y4)
-                                       ) or board_stable[x4][y4] == True
-                            # check if the piece can be flipped diagonally (up)
-                            x5, y5 = row+1, col+1
-                            stable5 = (not self.is_in_bounds(x5, y5)
-                                       ) or board_stable[x5][y5] == True
-                            x6, y6 = row-1, col-1
-                            stable6 = (not self.is_in_bounds(x6, y6)
-                                       ) or board_stable[x6][y6] == True
-                            # check if the piece can be flipped diagonally (down)
-                            x7, y7 = row+1, col-1
-                            stable7 = (not self.is_in_bounds(x7, y7)
-                                       ) or board_stable[x7][y7] == True
-                            x8, y8 = row-1, col+1
-                            stable8 = (not self.is_in_bounds(x8, y8)
-                                       ) or board_stable[x8][y8] == True
-                            board_stable[row][col] = (stable1 or stable2) and (stable3 or stable4) and \
-                                (stable5 or stable6) and (stable7 or stable8)
-        return sum(_.count(True) for _ in board_stable)
+        return bitboard.get_stable(self.bitboards[player_number], stable).bit_count()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import struct
+import sys
+
+import bitboard
+from search import Searcher
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+MAGIC = b'OTHBOOK1'
+# player to move's discs, opponent's discs, move square, padding, score
+RECORD = struct.Struct('<QQBxh')
+
+# INVERSE[symmetry] undoes bitboard.transform(bits, symmetry)
+_PATTERN = 0x0102040810204081 | 0x3F  # not symmetric under any of the 8 symmetries
+INVERSE = [next(inverse for inverse in range(8)
+                if bitboard.transform(bitboard.transform(_PATTERN, symmetry), inverse) == _PATTERN)
+           for symmetry in range(8)]
+
+
+def canonicalize(player, opponent):
+    """
+    Get the canonical form of a position under the 8 symmetries of the board.
+
+    Parameters
+    ----------
+    player (int): The mask of the discs of the player to move.
+    opponent (int): The mask of the opponent's discs.
+
+    Returns
+    -------
+    tuple[int, int, int]: The smallest (player, opponent) pair over all symmetries,
+        and the symmetry that produces it.
+    """
+    best = (player, opponent, 0)
+    for symmetry in range(1, 8):
+        candidate = (bitboard.transform(player, symmetry),
+                     bitboard.transform(opponent, symmetry), symmetry)
+        if candidate < best:
+            best = candidate
+    return best
+
+
+def write_book(path, entries):
+    """
+    Write an opening book file.
+
+    Parameters
+    ----------
+    path (str): The path of the book file.
+    entries (iterable[tuple[int, int, int, int]]): The (player, opponent, move square, score)
+        of each position, from the point of view of the player to move. Positions are
+        canonicalized, and the first entry of any duplicates is kept.
+    """
+    records = {}
+    for player, opponent, move, score in entries:
+        canonical_player, canonical_opponent, symmetry = canonicalize(player, opponent)
+        key = (canonical_player, canonical_opponent)
+        if key not in records:
+            move = bitboard.transform(1 << move, symmetry).bit_length() - 1
+            records[key] = (move, max(-32768, min(32767, score)))
+    with open(path, 'wb') as book_file:
+        book_file.write(MAGIC)
+        for key in sorted(records):
+            book_file.write(RECORD.pack(key[0], key[1], *records[key]))
+
+
+def iter_opening_positions(plies):
+    """
+    Iterate over every position reachable from the start in at most a number of moves.
+
+    Parameters
+    ----------
+    plies (int): The number of moves to play from the start position.
+
+    Yields
+    ------
+    tuple[int, int]: The canonical (player, opponent) masks of each position with at least
+        one legal move, each yielded once.
+    """
+    frontier = {canonicalize(0x0000001008000000, 0x0000000810000000)[:2]}
+    for ply in range(plies + 1):
+        next_frontier = set()
+        for player, opponent in frontier:
+            moves = bitboard.get_moves(player, opponent)
+            if not moves:
+                continue
+            yield player, opponent
+            if ply == plies:
+                continue
+            for square in bitboard.iter_bits(moves):
+                move_bit = 1 << square
+                flips = bitboard.get_flips(player, opponent, move_bit)
+                next_frontier.add(canonicalize(opponent ^ flips, player | flips | move_bit)[:2])
+        frontier = next_frontier
+
+
+def build_book(path, plies=6, search_depth=6, verbose=False):
+    """
+    Build an opening book by searching every position of the first moves of the game.
+
+    Parameters
+    ----------
+    path (str): The path of the book file to write.
+    plies (int): The number of moves from the start position to cover.
+    search_depth (int): The depth to search each position to.
+    verbose (bool): If True, print progress.
+    """
+    searcher = Searcher(search_depth)
+
+    def entries():
+        for count, (player, opponent) in enumerate(iter_opening_positions(plies)):
+            # the player to move is stored as player 1
+            result = searcher.search(bitboard.to_rows(player, opponent), 1)
+            if verbose and count % 100 == 0:
+                print(f"{count} positions searched")
+            yield player, opponent, bitboard.square(*result.move), result.score
+    write_book(path, entries())
+
+
+class OpeningBook:
+    """
+    Opening book read from a memory-mapped file of sorted fixed-size records.
+    The file is only mapped on the first lookup, and lookups binary search it in place.
+    """
+
+    def __init__(self, path=BOOK_PATH):
+        """
+        Parameters
+        ----------
+        path (str): The path of the book file.
+        """
+        self.path = path
+        self.book_map = None
+        self.num_records = 0
+
+    def __getstate__(self):
+        # the memory map is reopened on the first lookup after unpickling
+        state = self.__dict__.copy()
+        state['book_map'] = None
+        return state
+
+    def open(self):
+        """Map the book file into memory."""
+        with open(self.path, 'rb') as book_file:
+            self.book_map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert (self.book_map[:len(MAGIC)] == MAGIC)
+        self.num_records = (len(self.book_map) - len(MAGIC)) // RECORD.size
+
+    def close(self):
+        """Unmap the book file."""
+        if self.book_map is not None:
+            self.book_map.close()
+            self.book_map = None
+
+    def lookup(self, board, player_number):
+        """
+        Look up the book move for a position.
+
+        Parameters
+        ----------
+        board (Board): The current position.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The book move as a list of two integers, [row, column], or None if the
+            position is not in the book.
+        """
+        if self.book_map is None:
+            self.open()
+        player, opponent, symmetry = canonicalize(board.bitboards[player_number],
+                                                  board.bitboards[3 - player_number])
+        key = (player, opponent)
+        low, high = 0, self.num_records
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(self.book_map, len(MAGIC) + middle * RECORD.size)
+            if record[:2] < key:
+                low = middle + 1
+            elif record[:2] > key:
+                high = middle
+            else:
+                move = bitboard.transform(1 << record[2], INVERSE[symmetry]).bit_length() - 1
+                return [move >> 3, move & 7]
+        return None
+
+
+if __name__ == "__main__":
+    """
+    Build the opening book.
+
+    Parameters
+    ----------
+    plies (int): The number of moves from the start position to cover.
+    search_depth (int): The depth to search each position to.
+    """
+    if len(sys.argv) != 3 or not sys.argv[1].isnumeric() or not sys.argv[2].isnumeric():
+        print("Usage: python book.py <plies> <search_depth>")
+        sys.exit(1)
+    build_book(BOOK_PATH, int(sys.argv[1]), int(sys.argv[2]), verbose=True)
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+import os
 import socket
 import sys
 
+from book import BOOK_PATH
+from endgame import ENDGAME_EMPTIES
 from player import Player, Strategy
 
 if __name__ == "__main__":
@@ -20,5 +23,7 @@ if __name__ == "__main__":
     port = int(sys.argv[1]) if (len(sys.argv) > 1 and sys.argv[1]) else 1337
     host = sys.argv[2] if (
         len(sys.argv) > 2 and sys.argv[2]) else socket.gethostname()
-    ai_player = Player(Strategy.MAX_STABLE)
+    book_path = BOOK_PATH if os.path.exists(BOOK_PATH) else None
+    ai_player = Player(Strategy.MAX_STABLE, endgame_empties=ENDGAME_EMPTIES,
+                       book_path=book_path)
     ai_player.play_game(port, host)
@@ -0,0 +1,176 @@
+import time
+
+import bitboard
+from board import Board
+from search import CHECK_INTERVAL, SQUARE_ORDER, SearchResult, SearchTimeout
+
+# Solve exactly when at most this many squares are empty
+ENDGAME_EMPTIES = 12
+# Fraction of the move's time budget the solver may use before the player falls back to
+# its strategy
+ENDGAME_TIME_FRACTION = 0.5
+
+# Above this many empty squares, moves are ordered by the opponent's mobility
+FASTEST_FIRST_EMPTIES = 7
+
+# The four 4x4 quadrants of the board, used for parity move ordering
+QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0,
+             0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+
+def order_by_parity(moves, empty):
+    """
+    Order moves so that moves in quadrants with an odd number of empty squares come first.
+    Playing last in every region of the board tends to win the endgame, so these
+    moves usually cause the earliest cutoffs.
+
+    Parameters
+    ----------
+    moves (int): A mask of legal moves.
+    empty (int): A mask of the empty squares.
+
+    Returns
+    -------
+    list[int]: The squares of the moves, in the order to search them.
+    """
+    odd = 0
+    for quadrant in QUADRANTS:
+        if (empty & quadrant).bit_count() & 1:
+            odd |= quadrant
+    squares = []
+    for group in (moves & odd, moves & ~odd):
+        squares.extend(sorted(bitboard.iter_bits(group),
+                              key=SQUARE_ORDER.__getitem__, reverse=True))
+    return squares
+
+
+def order_by_mobility(player, opponent, moves):
+    """
+    Order moves so that the moves leaving the opponent the fewest replies come first
+    ("fastest first"). This costs a move generation per child, so it is only worth it
+    far from the end of the game.
+
+    Parameters
+    ----------
+    player (int): The mask of the discs of the player to move.
+    opponent (int): The mask of the opponent's discs.
+    moves (int): A mask of legal moves.
+
+    Returns
+    -------
+    list[tuple[int, int]]: The child positions as (player to move, opponent) masks,
+        in the order to search them.
+    """
+    children = []
+    for square in bitboard.iter_bits(moves):
+        move_bit = 1 << square
+        flips = bitboard.get_flips(player, opponent, move_bit)
+        child_player = opponent ^ flips
+        child_opponent = player | flips | move_bit
+        mobility = bitboard.get_moves(child_player, child_opponent).bit_count()
+        # corners are worth trying early even when they leave replies
+        if move_bit & bitboard.CORNERS:
+            mobility -= 2
+        children.append((mobility, child_player, child_opponent))
+    children.sort(key=lambda child: child[0])
+    return [(child_player, child_opponent) for _, child_player, child_opponent in children]
+
+
+class EndgameSolver:
+    """
+    Exact alpha-beta solver for the last empty squares of the game.
+    Scores are final disc differentials for the player to move.
+    """
+
+    def __init__(self, time_limit=None):
+        """
+        Parameters
+        ----------
+        time_limit (float): The number of seconds to solve for, or None for no limit.
+        """
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.deadline = None
+
+    def solve(self, board_state, player_number):
+        """
+        Find the move with the best final disc differential.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        SearchResult: The best move, with the exact final disc differential as its score
+            and the number of empty squares as its depth.
+
+        Raises
+        ------
+        SearchTimeout: If the time limit passes before the position is solved.
+        """
+        board = Board(board_state)
+        start = time.perf_counter()
+        self.nodes = 0
+        self.deadline = None if self.time_limit is None else start + self.time_limit
+        player = board.bitboards[player_number]
+        opponent = board.bitboards[3 - player_number]
+        empty = bitboard.FULL ^ (player | opponent)
+        moves = bitboard.get_moves(player, opponent)
+        assert (moves)
+        best_square, alpha = None, -65
+        for square in order_by_parity(moves, empty):
+            move_bit = 1 << square
+            flips = bitboard.get_flips(player, opponent, move_bit)
+            score = -self.negamax(opponent ^ flips, player | flips | move_bit, -65, -alpha)
+            if score > alpha:
+                best_square, alpha = square, score
+        elapsed = time.perf_counter() - start
+        return SearchResult([best_square >> 3, best_square & 7], alpha,
+                            empty.bit_count(), self.nodes, elapsed)
+
+    def negamax(self, player, opponent, alpha, beta):
+        """
+        Solve a position with alpha-beta pruning.
+
+        Parameters
+        ----------
+        player (int): The mask of the discs of the player to move.
+        opponent (int): The mask of the opponent's discs.
+        alpha (int): The lower bound of the search window.
+        beta (int): The upper bound of the search window.
+
+        Returns
+        -------
+        int: The final disc differential for the player to move, with best play.
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and \
+                time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        moves = bitboard.get_moves(player, opponent)
+        if not moves:
+            if not bitboard.get_moves(opponent, player):
+                return player.bit_count() - opponent.bit_count()
+            # pass: the opponent moves again
+            return -self.negamax(opponent, player, -beta, -alpha)
+        empty = bitboard.FULL ^ (player | opponent)
+        if empty.bit_count() > FASTEST_FIRST_EMPTIES:
+            children = order_by_mobility(player, opponent, moves)
+        else:
+            children = []
+            for square in order_by_parity(moves, empty):
+                move_bit = 1 << square
+                flips = bitboard.get_flips(player, opponent, move_bit)
+                children.append((opponent ^ flips, player | flips | move_bit))
+        best = -65
+        for child_player, child_opponent in children:
+            score = -self.negamax(child_player, child_opponent, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
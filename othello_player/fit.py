@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Fitting of the pattern evaluation (see patterns.py) to self-play data (see selfplay.py).
+
+The shards are memory-mapped and read one mini-batch at a time, so the data can be far
+larger than the memory. The evaluation of each position is regressed on the game's final
+disc differential by stochastic gradient descent on the squared error. The update of a
+pattern weight is averaged over the positions of the batch that use it, so that rare
+configurations learn as fast as common ones.
+"""
+
+import random
+import sys
+
+import numpy as np
+
+from patterns import (FEATURES, INSTANCE_OFFSETS, PATTERN_OFFSETS, PATTERNS, PATTERNS_PATH,
+                      get_features, get_indices, save_weights, zero_weights)
+from selfplay import list_shards, read_shard
+
+BATCH_SIZE = 4096
+LEARNING_RATE = 0.02
+
+
+def iter_batches(paths, batch_size=BATCH_SIZE, rng=None):
+    """
+    Read the records of shards one mini-batch at a time.
+
+    Parameters
+    ----------
+    paths (list[str]): The paths of the shards.
+    batch_size (int): The largest number of records in a batch.
+    rng (random.Random): A generator to visit the shards, and the batches of each
+        shard, in a random order, or None to read them in order.
+
+    Yields
+    ------
+    np.ndarray: The records of a batch (see selfplay.RECORD_DTYPE), read from the shard.
+    """
+    paths = list(paths)
+    if rng is not None:
+        rng.shuffle(paths)
+    for path in paths:
+        shard = read_shard(path)
+        starts = list(range(0, len(shard), batch_size))
+        if rng is not None:
+            rng.shuffle(starts)
+        for start in starts:
+            yield np.array(shard[start:start + batch_size])
+        del shard
+
+
+def get_batch_features(records):
+    """
+    Compute the inputs of the evaluation for a batch of records.
+
+    Parameters
+    ----------
+    records (np.ndarray): The records (see selfplay.RECORD_DTYPE).
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]: The position of each pattern instance's configuration
+        in the concatenation of the pattern tables, of shape (N, len(INSTANCES)), and the
+        features (see patterns.get_features), of shape (N, len(FEATURES)).
+    """
+    player_1 = records['player_1']
+    player_2 = records['player_2']
+    return get_indices(player_1, player_2) + INSTANCE_OFFSETS, get_features(player_1, player_2)
+
+
+def predict(table, feature_weights, indices, features):
+    """
+    Evaluate a batch of positions from player 1's point of view.
+
+    Parameters
+    ----------
+    table (np.ndarray): The concatenation of the pattern tables.
+    feature_weights (np.ndarray): The weights of the features.
+    indices (np.ndarray): The positions of the configurations in table.
+    features (np.ndarray): The features of the positions.
+
+    Returns
+    -------
+    np.ndarray: The evaluation of each position.
+    """
+    return table[indices].sum(axis=1) + features @ feature_weights
+
+
+def fit(paths, epochs=1, batch_size=BATCH_SIZE, learning_rate=LEARNING_RATE, seed=0,
+        weights=None, verbose=False):
+    """
+    Fit the evaluation weights to the final disc differential of the positions of shards.
+
+    Parameters
+    ----------
+    paths (list[str]): The paths of the shards.
+    epochs (int): The number of passes over the data.
+    batch_size (int): The number of positions of each gradient step.
+    learning_rate (float): The size of the gradient steps.
+    seed (int): The seed of the order of the batches.
+    weights (dict[str, np.ndarray]): The weights to start from (see patterns.load_weights),
+        or None to start from zero.
+    verbose (bool): Whether to print the error of each epoch.
+
+    Returns
+    -------
+    tuple[dict[str, np.ndarray], list[float]]: The weights, and the mean squared error of
+        each epoch, measured on each batch before its update.
+    """
+    weights = zero_weights() if weights is None else weights
+    table = np.concatenate([weights[name] for name, _ in PATTERNS]).astype(np.float64)
+    feature_weights = weights['features'].astype(np.float64)
+    rng = random.Random(seed)
+    errors = []
+    for epoch in range(epochs):
+        squared_error = 0.0
+        positions = 0
+        for records in iter_batches(paths, batch_size, rng):
+            indices, features = get_batch_features(records)
+            error = records['result'] - predict(table, feature_weights, indices, features)
+            squared_error += float(error @ error)
+            positions += len(records)
+            # average the gradient of each weight over the positions that use it
+            flat = indices.ravel()
+            counts = np.bincount(flat, minlength=len(table))
+            gradient = np.bincount(flat, weights=np.repeat(error, indices.shape[1]),
+                                   minlength=len(table))
+            table += learning_rate * gradient / np.maximum(counts, 1)
+            feature_weights += learning_rate * (features.T @ error) / \
+                np.maximum((features ** 2).sum(axis=0), 1)
+        errors.append(squared_error / max(positions, 1))
+        if verbose:
+            print(f"Epoch {epoch + 1}: mean squared error {errors[-1]:.2f} over {positions} positions")
+    fitted = {name: table[start:end].astype(np.float32) for (name, _), start, end
+              in zip(PATTERNS, PATTERN_OFFSETS, PATTERN_OFFSETS[1:])}
+    fitted['features'] = feature_weights.astype(np.float32)
+    return fitted, errors
+
+
+if __name__ == "__main__":
+    """
+    Fit the evaluation weights to self-play shards and save them.
+
+    Parameters
+    ----------
+    directory (str): The directory of the shards, from selfplay.py or ingest.py.
+    --epochs=<n>: The number of passes over the data (default: 4).
+    --batch=<n>: The number of positions of each gradient step (default: 4096).
+    --learning-rate=<x>: The size of the gradient steps (default: 0.02).
+    --output=<path>: The weights file to write (default: patterns.npz).
+    --seed=<n>: The seed of the order of the batches (default: 0).
+    """
+    epochs = 4
+    batch_size = BATCH_SIZE
+    learning_rate = LEARNING_RATE
+    output = PATTERNS_PATH
+    seed = 0
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--epochs=') and arg[len('--epochs='):].isnumeric():
+            epochs = int(arg[len('--epochs='):])
+        elif arg.startswith('--batch=') and arg[len('--batch='):].isnumeric():
+            batch_size = int(arg[len('--batch='):])
+        elif arg.startswith('--learning-rate='):
+            learning_rate = float(arg[len('--learning-rate='):])
+        elif arg.startswith('--output='):
+            output = arg[len('--output='):]
+        elif arg.startswith('--seed=') and arg[len('--seed='):].isnumeric():
+            seed = int(arg[len('--seed='):])
+        else:
+            args.append(arg)
+    if len(args) != 1 or batch_size == 0:
+        print("Usage: python fit.py <directory> [--epochs=<n>] [--batch=<n>] "
+              "[--learning-rate=<x>] [--output=<path>] [--seed=<n>]")
+        sys.exit(1)
+    paths = list_shards(args[0], prefix=None)
+    if not paths:
+        print(f"No shards in {args[0]}")
+        sys.exit(1)
+    weights, _ = fit(paths, epochs, batch_size, learning_rate, seed, verbose=True)
+    if not all(np.isfinite(table).all() for table in weights.values()):
+        print("\033[31mThe fit diverged\033[0m: try a smaller --learning-rate")
+        sys.exit(1)
+    save_weights(output, weights)
+    print(f"Weights saved to {output}")
+    print(", ".join(f"{name}: {weight:.3f}" for name, weight in zip(FEATURES, weights['features'])))
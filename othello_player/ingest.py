@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Ingestion of the logs of the othello.jar server into self-play shards (see selfplay.py),
+so that historical games can be used like self-play games, e.g. by fit.py.
+
+The logs are read line by line, from plain or gzip files (including concatenated
+gzip members, as written by log rotation), so memory use does not depend on their size.
+Every move is replayed on a Board to check it. A game ends at the server's
+"Game over..." line, and its positions are written to the shards with the final disc
+differential. Games with an invalid move, or that do not end in a finished position,
+are skipped. The log does not mark the start of a game, so an opening move of player 1
+that is invalid in the current game, or follows an invalid move, is taken as the start
+of a new game after one that was cut off.
+"""
+
+import gzip
+import re
+import sys
+
+import bitboard
+from board import Board
+from selfplay import SHARD_BYTES, ShardWriter, encode_game
+
+GZIP_MAGIC = b'\x1f\x8b'
+LOG_PREFIX = 'INFO  othello.server.text-ui:'
+_MOVE = re.compile(r'Player (one|two) played.*?(\d)\D+(\d)\D*$')
+GAME_OVER = 'Game over...'
+
+
+def parse_line(line):
+    """
+    Parse a line of the server's log.
+
+    Parameters
+    ----------
+    line (str): The line.
+
+    Returns
+    -------
+    tuple: (player_number, [row, column]) for a move, GAME_OVER for the end of a game,
+        or None for any other line.
+    """
+    if not line.startswith(LOG_PREFIX):
+        return None
+    if GAME_OVER in line:
+        return GAME_OVER
+    match = _MOVE.search(line)
+    if match is None:
+        return None
+    return (1 if match.group(1) == 'one' else 2), [int(match.group(2)), int(match.group(3))]
+
+
+def open_log(path):
+    """
+    Open a log file, decompressing it if it is gzipped.
+
+    Parameters
+    ----------
+    path (str): The path of the log, or '-' for the standard input.
+
+    Returns
+    -------
+    io.TextIOBase: The lines of the log, with undecodable bytes replaced.
+    """
+    if path == '-':
+        return open(sys.stdin.fileno(), encoding='utf-8', errors='replace', closefd=False)
+    with open(path, 'rb') as log_file:
+        compressed = log_file.read(2) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+class GameParser:
+    """
+    Splitter of a stream of log lines into validated games.
+    """
+
+    def __init__(self):
+        self.board = Board()
+        self.player_number = 1  # the player expected to move next
+        self.played = []  # (player_1, player_2, player_number, square) of each move
+        self.corrupt = False  # whether the current game had an invalid move
+        # whether the current game started after an invalid move, and may be made of the
+        # rest of the broken game, which is already counted as skipped
+        self.recovering = False
+        self.games = 0
+        self.skipped = 0
+
+    def reset(self, recovering=False):
+        """
+        Start a new game.
+
+        Parameters
+        ----------
+        recovering (bool): Whether the game starts after an invalid move.
+        """
+        self.board = Board()
+        self.player_number = 1
+        self.played = []
+        self.corrupt = False
+        self.recovering = recovering
+
+    def discard(self):
+        """Count the current game as skipped, unless it is part of a broken game."""
+        if (self.played or self.corrupt) and not self.recovering:
+            self.skipped += 1
+
+    def play(self, player_number, move):
+        """
+        Replay a move of the current game.
+
+        Parameters
+        ----------
+        player_number (int): The number of the player who moved (1 or 2).
+        move (list[int]): The move, [row, column].
+
+        Returns
+        -------
+        bool: Whether the move is valid. The other player passed if the same player
+            moves twice.
+        """
+        if player_number != self.player_number and \
+                self.board.get_valid_moves(self.player_number):
+            return False
+        if not self.board.is_valid_move(move[0], move[1], player_number):
+            return False
+        self.played.append((self.board.bitboards[1], self.board.bitboards[2], player_number,
+                            bitboard.square(move[0], move[1])))
+        self.board.make_move(move[0], move[1], player_number)
+        self.player_number = 3 - player_number
+        return True
+
+    def feed(self, line):
+        """
+        Parse one line of the log.
+
+        Parameters
+        ----------
+        line (str): The line.
+
+        Returns
+        -------
+        bytes: The records of the positions of a game that ended on this line (see
+            selfplay.RECORD), or None.
+        """
+        event = parse_line(line)
+        if event is None:
+            return None
+        if event == GAME_OVER:
+            records = None
+            if self.played and not self.corrupt and self.board.check_game_over():
+                records = encode_game(self.played, self.board.score(1) - self.board.score(2))
+                self.games += 1
+            else:
+                self.discard()
+            self.reset()
+            return records
+        player_number, move = event
+        if not self.corrupt and self.play(player_number, move):
+            return None
+        if player_number == 1 and Board().is_valid_move(move[0], move[1], 1):
+            # the previous game, valid or not, was cut off and this move starts a new one
+            self.discard()
+            self.reset(self.corrupt or self.recovering)
+            self.play(player_number, move)
+        else:
+            self.corrupt = True
+        return None
+
+
+def ingest(paths, directory, shard_bytes=SHARD_BYTES, prefix='log'):
+    """
+    Convert server logs to shards of position records.
+
+    Parameters
+    ----------
+    paths (list[str]): The paths of the logs, read one after the other as one stream.
+    directory (str): The directory of the shards.
+    shard_bytes (int): The size after which a shard is closed.
+    prefix (str): The start of the shards' file names.
+
+    Returns
+    -------
+    tuple[int, int, int]: The number of games and positions written, and the number of
+        games skipped.
+    """
+    parser = GameParser()
+    with ShardWriter(directory, prefix, shard_bytes) as writer:
+        for path in paths:
+            with open_log(path) as log_file:
+                for line in log_file:
+                    records = parser.feed(line)
+                    if records is not None:
+                        writer.write(records)
+    # a game still in progress at the end of the logs is incomplete
+    parser.discard()
+    return parser.games, writer.positions, parser.skipped
+
+
+if __name__ == "__main__":
+    """
+    Convert othello.jar logs to shards of position records.
+
+    Parameters
+    ----------
+    directory (str): The directory of the shards.
+    logs (str): The log files, plain or gzipped, or '-' for the standard input.
+    --shard-mb=<n>: The size of a shard, in megabytes (default: 64).
+    --prefix=<name>: The start of the shards' file names (default: log).
+    """
+    shard_bytes = SHARD_BYTES
+    prefix = 'log'
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--shard-mb=') and arg[len('--shard-mb='):].isnumeric():
+            shard_bytes = int(arg[len('--shard-mb='):]) << 20
+        elif arg.startswith('--prefix=') and arg[len('--prefix='):]:
+            prefix = arg[len('--prefix='):]
+        else:
+            args.append(arg)
+    if len(args) < 2 or shard_bytes == 0:
+        print("Usage: python ingest.py <directory> <log> [<log> ...] [--shard-mb=<n>] "
+              "[--prefix=<name>]")
+        sys.exit(1)
+    games, positions, skipped = ingest(args[1:], args[0], shard_bytes, prefix)
+    print(f"{games} games ({positions} positions) written to {args[0]}, {skipped} skipped")
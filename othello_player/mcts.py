@@ -0,0 +1,238 @@
+import math
+import random
+import time
+from collections import namedtuple
+
+import bitboard
+from board import Board
+
+# Exploration constant of the UCB1 formula
+EXPLORATION = 1.4
+# How many playouts to run between updates of MCTS.best_move
+BEST_MOVE_INTERVAL = 64
+
+MCTSResult = namedtuple(
+    'MCTSResult', ['move', 'score', 'depth', 'nodes', 'elapsed', 'visits'])
+MCTSResult.__doc__ = """
+Result of a Monte Carlo tree search.
+
+Attributes
+----------
+move (list[int]): The most visited move, [row, column].
+score (float): The average result of the move's playouts (1 win, 0.5 tie, 0 loss).
+depth (int): The depth of the deepest node in the tree.
+nodes (int): The number of playouts.
+elapsed (float): The time spent searching in seconds.
+visits (dict[tuple[int, int], int]): The number of playouts through each root move.
+"""
+
+
+class Node:
+    """
+    Node of the Monte Carlo search tree.
+    """
+    __slots__ = ('player', 'opponent', 'player_number', 'square', 'parent',
+                 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, player, opponent, player_number, square=None, parent=None):
+        """
+        Parameters
+        ----------
+        player (int): The mask of the discs of the player to move.
+        opponent (int): The mask of the opponent's discs.
+        player_number (int): The number of the player to move (1 or 2).
+        square (int): The square of the move that led to this node, or None for the root
+            and for passes.
+        parent (Node): The parent node, or None for the root.
+        """
+        self.player = player
+        self.opponent = opponent
+        self.player_number = player_number
+        self.square = square
+        self.parent = parent
+        self.children = []
+        moves = bitboard.get_moves(player, opponent)
+        if moves:
+            self.untried = list(bitboard.iter_bits(moves))
+        elif bitboard.get_moves(opponent, player):
+            self.untried = [None]  # the only move is to pass
+        else:
+            self.untried = []  # game over
+        self.visits = 0
+        # total result of the playouts, for the player who moved into this node
+        self.wins = 0.0
+
+    def expand(self):
+        """
+        Add the child of one untried move.
+
+        Returns
+        -------
+        Node: The new child.
+        """
+        square = self.untried.pop(random.randrange(len(self.untried)))
+        if square is None:
+            child = Node(self.opponent, self.player, 3 - self.player_number, None, self)
+        else:
+            move_bit = 1 << square
+            flips = bitboard.get_flips(self.player, self.opponent, move_bit)
+            child = Node(self.opponent ^ flips, self.player | flips | move_bit,
+                         3 - self.player_number, square, self)
+        self.children.append(child)
+        return child
+
+    def select_child(self):
+        """
+        Select the child with the highest UCB1 value.
+
+        Returns
+        -------
+        Node: The selected child.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   EXPLORATION * math.sqrt(log_visits / child.visits))
+
+
+def playout(player, opponent):
+    """
+    Play random moves until the end of the game, always taking a corner when one is available.
+
+    Parameters
+    ----------
+    player (int): The mask of the discs of the player to move.
+    opponent (int): The mask of the opponent's discs.
+
+    Returns
+    -------
+    float: The result for the player to move: 1 for a win, 0.5 for a tie, 0 for a loss.
+    """
+    to_move = 0  # 0 when the original player is to move
+    passed = False
+    while True:
+        moves = bitboard.get_moves(player, opponent)
+        if not moves:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            corners = moves & bitboard.CORNERS
+            squares = list(bitboard.iter_bits(corners or moves))
+            move_bit = 1 << random.choice(squares)
+            flips = bitboard.get_flips(player, opponent, move_bit)
+            player, opponent = player | flips | move_bit, opponent ^ flips
+        player, opponent = opponent, player
+        to_move ^= 1
+    if to_move:
+        player, opponent = opponent, player
+    difference = player.bit_count() - opponent.bit_count()
+    return 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+
+
+class MCTS:
+    """
+    Monte Carlo tree search with UCT selection and random playouts.
+    The tree is kept between moves, and the subtree of the actual position is reused.
+    """
+
+    def __init__(self, time_limit=1.0):
+        """
+        Parameters
+        ----------
+        time_limit (float): The number of seconds to search for.
+        """
+        self.time_limit = time_limit
+        self.root = None
+        # set from another thread to end the current search early
+        self.stopped = False
+        # most visited move of the current search, updated every BEST_MOVE_INTERVAL
+        # playouts and readable from another thread
+        self.best_move = None
+
+    def __getstate__(self):
+        # the tree is only useful to the process that built it
+        state = self.__dict__.copy()
+        state['root'] = None
+        return state
+
+    def find_root(self, player, opponent, player_number):
+        """
+        Find the node of a position among the last root and its descendants up to two
+        moves below, so the playouts already made from it are reused.
+
+        Parameters
+        ----------
+        player (int): The mask of the discs of the player to move.
+        opponent (int): The mask of the opponent's discs.
+        player_number (int): The number of the player to move (1 or 2).
+
+        Returns
+        -------
+        Node: The node of the position, detached from its parent, or a new node.
+        """
+        level = [] if self.root is None else [self.root]
+        for _ in range(3):
+            for node in level:
+                if (node.player, node.opponent, node.player_number) == \
+                        (player, opponent, player_number):
+                    node.parent = None
+                    return node
+            level = [child for node in level for child in node.children]
+        return Node(player, opponent, player_number)
+
+    def search(self, board_state, player_number, time_limit=None):
+        """
+        Search for the best move until the time limit.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+        time_limit (float): The number of seconds to search for, or None to use the
+            searcher's time limit.
+
+        Returns
+        -------
+        MCTSResult: The most visited move and statistics about the search.
+        """
+        board = Board(board_state)
+        start = time.perf_counter()
+        deadline = start + (self.time_limit if time_limit is None else time_limit)
+        player = board.bitboards[player_number]
+        opponent = board.bitboards[3 - player_number]
+        assert (bitboard.get_moves(player, opponent))
+        root = self.find_root(player, opponent, player_number)
+        self.root = root
+        playouts = 0
+        max_depth = 0
+        self.best_move = None
+        while playouts == 0 or time.perf_counter() < deadline and not self.stopped:
+            # selection
+            node = root
+            depth = 0
+            while not node.untried and node.children:
+                node = node.select_child()
+                depth += 1
+            # expansion
+            if node.untried:
+                node = node.expand()
+                depth += 1
+            max_depth = max(max_depth, depth)
+            # simulation, from the point of view of the player who moved into the node
+            result = 1.0 - playout(node.player, node.opponent)
+            # backpropagation
+            while node is not None:
+                node.visits += 1
+                node.wins += result
+                result = 1.0 - result
+                node = node.parent
+            playouts += 1
+            if playouts % BEST_MOVE_INTERVAL == 0:
+                best = max(root.children, key=lambda child: child.visits)
+                self.best_move = [best.square >> 3, best.square & 7]
+        elapsed = time.perf_counter() - start
+        best = max(root.children, key=lambda child: child.visits)
+        visits = {(child.square >> 3, child.square & 7): child.visits for child in root.children}
+        return MCTSResult([best.square >> 3, best.square & 7], best.wins / best.visits,
+                          max_depth, playouts, elapsed, visits)
@@ -0,0 +1,208 @@
+"""
+Instrumentation of the moves chosen by a player.
+
+The Board counts the work done by its hot paths in the module-level `counters`,
+and MoveMetrics records the difference of the counters over each call of
+Player.get_move, along with the move's wall time, search statistics and the
+margin left before the server's deadline, counted from when its message was received.
+Records are appended to a JSON lines file, and a summary can be written in the
+Prometheus text format (e.g. for the node exporter's textfile collector).
+"""
+
+import cProfile
+import json
+import math
+import os
+import time
+
+from position import Position
+
+
+class Counters:
+    """Running totals of the work done by Board methods in this process."""
+    __slots__ = ('moves_generated', 'moves_made', 'stability_evals')
+
+    def __init__(self):
+        self.moves_generated = 0  # legal moves listed by get_valid_moves
+        self.moves_made = 0  # calls of make_move
+        self.stability_evals = 0  # calls of get_stable_discs and count_stable_discs
+
+    def snapshot(self):
+        """
+        Get the current totals.
+
+        Returns
+        -------
+        dict[str, int]: The value of each counter.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+counters = Counters()
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of values with the nearest-rank method.
+
+    Parameters
+    ----------
+    values (list[float]): The values, in any order.
+    fraction (float): The percentile as a fraction between 0 and 1.
+
+    Returns
+    -------
+    float: The smallest value that is at least the given fraction of the values,
+        or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(max(math.ceil(fraction * len(ordered)), 1), len(ordered))
+    return ordered[rank - 1]
+
+
+class MoveMetrics:
+    """
+    Recorder of per-move statistics for a Player (see Player's metrics parameter).
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, profile_dir=None):
+        """
+        Parameters
+        ----------
+        jsonl_path (str): A file to append one JSON object per move to, or None.
+        prometheus_path (str): A file to rewrite with a summary in the Prometheus text
+            format after every move, or None.
+        profile_dir (str): A directory to write the cProfile statistics of every move to,
+            as move-<n>.prof, or None to not profile.
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.profile_dir = profile_dir
+        self.num_moves = 0
+        self.wall_times = []
+        self.deadline_misses = 0
+        self.totals = dict.fromkeys(Counters.__slots__ + ('nodes', 'tt_hits', 'tt_misses'), 0)
+
+    def measure(self, player, board_state, player_number):
+        """
+        Select a move with a player and record its statistics.
+
+        Parameters
+        ----------
+        player (Player): The player selecting the move.
+        board_state (list[list[int]] or Position) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        position = board_state if isinstance(board_state, Position) else \
+            Position.from_rows(board_state)
+        tt = getattr(player.searcher, 'tt', None)
+        tt_before = (0, 0) if tt is None else (tt.hits, tt.misses)
+        before = counters.snapshot()
+        profile = cProfile.Profile() if self.profile_dir is not None else None
+        start = time.perf_counter()
+        # the player enables the profile on the thread of the selection, which is not
+        # this one when a watchdog runs it
+        player.profile = profile
+        try:
+            move = player.select_move(board_state, player_number)
+        finally:
+            player.profile = None
+        end = time.perf_counter()
+        wall_time = end - start
+        # the server's clock runs from the moment its message was received
+        turn_start = start if player.turn_start is None else player.turn_start
+        after = counters.snapshot()
+        # the table is allocated by the first search
+        tt = getattr(player.searcher, 'tt', None)
+        tt_after = (0, 0) if tt is None else (tt.hits, tt.misses)
+
+        record = {
+            'time': time.time(),
+            'move_number': self.num_moves,
+            'strategy': player.strategy.name,
+            'player': player_number,
+            'empties': position.empties,
+            'move': move,
+            'wall_time': wall_time,
+            'max_turn_time': player.max_turn_time,
+            'deadline_margin': None if player.max_turn_time is None else
+            player.max_turn_time - (end - turn_start),
+            'nodes': None if player.last_search is None else player.last_search.nodes,
+            'depth': None if player.last_search is None else player.last_search.depth,
+            'tt_hits': tt_after[0] - tt_before[0],
+            'tt_misses': tt_after[1] - tt_before[1],
+        }
+        for name in Counters.__slots__:
+            record[name] = after[name] - before[name]
+        if profile is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            record['profile'] = os.path.join(self.profile_dir, f'move-{self.num_moves}.prof')
+            profile.dump_stats(record['profile'])
+        self.add(record)
+        return move
+
+    def add(self, record):
+        """
+        Add the record of a move to the totals and write it out.
+
+        Parameters
+        ----------
+        record (dict): The statistics of the move (see measure).
+        """
+        self.num_moves += 1
+        self.wall_times.append(record['wall_time'])
+        if record['deadline_margin'] is not None and record['deadline_margin'] < 0:
+            self.deadline_misses += 1
+        for name in self.totals:
+            self.totals[name] += record[name] or 0
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, 'a') as jsonl_file:
+                jsonl_file.write(json.dumps(record) + '\n')
+        if self.prometheus_path is not None:
+            self.write_prometheus(self.prometheus_path)
+
+    def summary(self):
+        """
+        Summarize the recorded moves.
+
+        Returns
+        -------
+        dict: The number of moves, the p50 and p99 of the wall time, the number of
+            moves that missed the deadline and the totals of the counters.
+        """
+        return dict(moves=self.num_moves,
+                    p50=percentile(self.wall_times, 0.5),
+                    p99=percentile(self.wall_times, 0.99),
+                    deadline_misses=self.deadline_misses, **self.totals)
+
+    def write_prometheus(self, path):
+        """
+        Write the summary in the Prometheus text format. The file is replaced atomically,
+        so a collector never reads it half written.
+
+        Parameters
+        ----------
+        path (str): The file to write.
+        """
+        lines = ['# TYPE othello_move_seconds summary']
+        for fraction in (0.5, 0.99):
+            value = percentile(self.wall_times, fraction)
+            lines.append(f'othello_move_seconds{{quantile="{fraction}"}} '
+                         f'{"NaN" if value is None else value}')
+        lines.append(f'othello_move_seconds_sum {sum(self.wall_times)}')
+        lines.append(f'othello_move_seconds_count {self.num_moves}')
+        lines.append('# TYPE othello_deadline_misses_total counter')
+        lines.append(f'othello_deadline_misses_total {self.deadline_misses}')
+        for name, value in self.totals.items():
+            lines.append(f'# TYPE othello_{name}_total counter')
+            lines.append(f'othello_{name}_total {value}')
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as prometheus_file:
+            prometheus_file.write('\n'.join(lines) + '\n')
+        os.replace(temporary_path, path)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from book import BOOK_PATH
+from endgame import ENDGAME_EMPTIES
+from player import Player, Strategy
+from protocol import parse_message
+
+# Seconds to wait before connecting again when the server refuses the connection or
+# a game is broken off
+RETRY_DELAY = 1.0
+
+_worker_player = None
+
+
+def _init_worker(player):
+    """Store the player in a worker process, where its caches stay warm between moves."""
+    global _worker_player
+    _worker_player = player
+
+
+def _get_move(board_state, player_number, max_turn_time, turn_start=None):
+    """
+    Select a move with the player of a worker process.
+
+    Parameters
+    ----------
+    board_state (list[list[int]]) : The current state of the board.
+    player_number (int): The number of the current player (1 or 2).
+    max_turn_time (float): The time allowed for the move, in seconds.
+    turn_start (float): The time.perf_counter() when the message was received, which is
+        comparable between processes, or None for now.
+
+    Returns
+    -------
+    list[int]: The selected move as a list of two integers, [row, column].
+    """
+    _worker_player.max_turn_time = max_turn_time
+    _worker_player.turn_start = turn_start
+    return _worker_player.get_move(board_state, player_number)
+
+
+async def play_game(host, port, executor, turn_times, verbose=False):
+    """
+    Play one game of Othello over a network connection, computing the moves in an executor.
+
+    Parameters
+    ----------
+    host (str): The host to connect to.
+    port (int): The port number to connect to.
+    executor (concurrent.futures.Executor): The executor that runs _get_move, e.g. one
+        created with make_executor.
+    turn_times (list[float]): Receives the seconds from receiving each message of the
+        server to sending the reply.
+    verbose (bool): If True, print additional information about the connection.
+
+    Raises
+    ------
+    OSError: If the connection fails or is reset.
+    ValueError: If a message of the server cannot be parsed.
+    BrokenProcessPool: If a worker process of the executor died.
+    """
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    if verbose:
+        print(f'connected to {host} port {port}')
+    try:
+        while True:
+            try:
+                # the messages are JSON objects without nested objects
+                frame = await reader.readuntil(b'}')
+            except asyncio.IncompleteReadError:
+                break
+            message = parse_message(frame)
+            move = await loop.run_in_executor(executor, _get_move, message.position,
+                                              message.player_number, message.max_turn_time,
+                                              message.received)
+            writer.write('{}\n'.format(move).encode())
+            await writer.drain()
+            turn_times.append(time.perf_counter() - message.received)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+        if verbose:
+            print(f'connection to {host} port {port} closed')
+
+
+async def play_seat(host, port, pool, num_games=None, verbose=False):
+    """
+    Play consecutive games on one server, connecting again after each game. A game
+    broken off by a connection or protocol error, or by the death of a worker process,
+    is reported and counted as played.
+
+    Parameters
+    ----------
+    host (str): The host to connect to.
+    port (int): The port number to connect to.
+    pool (MovePool): The worker processes that compute the moves.
+    num_games (int): The number of games to play, or None to play until cancelled.
+    verbose (bool): If True, print additional information about the connections.
+
+    Returns
+    -------
+    list[float]: The seconds from receiving each message to sending the reply.
+    """
+    turn_times = []
+    games = 0
+    while num_games is None or games < num_games:
+        executor = pool.executor
+        try:
+            await play_game(host, port, executor, turn_times, verbose)
+        except ConnectionRefusedError:
+            # the server is not accepting the next game yet
+            await asyncio.sleep(RETRY_DELAY)
+            continue
+        except (OSError, ValueError, BrokenProcessPool) as error:
+            # the server's side of the game is over, so move on to the next one
+            print(f"\033[31mGame on {host} port {port} broken off\033[0m: {error!r}")
+            if isinstance(error, BrokenProcessPool):
+                pool.restart(executor)
+            await asyncio.sleep(RETRY_DELAY)
+        games += 1
+    return turn_times
+
+
+def make_executor(player, workers=None):
+    """
+    Create the process pool that computes the moves of every seat.
+
+    Parameters
+    ----------
+    player (Player): The player that selects the moves. Each worker process keeps its own
+        copy, so its transposition table and opening book stay loaded between games.
+    workers (int): The number of worker processes, or None for one per CPU. At most this
+        many moves are computed at once, the others wait in the pool's queue.
+
+    Returns
+    -------
+    concurrent.futures.ProcessPoolExecutor: The executor.
+    """
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(player,))
+    # start the workers now, before any connection is open, so they don't inherit the
+    # sockets and keep them open after the connection is closed here
+    executor.submit(int).result()
+    return executor
+
+
+class MovePool:
+    """
+    Worker processes that compute the moves of every seat (see make_executor), started
+    again if one of them dies, which breaks the whole pool.
+    """
+
+    def __init__(self, player, workers=None):
+        """
+        Parameters
+        ----------
+        player (Player): The player that selects the moves.
+        workers (int): The number of worker processes, or None for one per CPU.
+        """
+        self.player = player
+        self.workers = workers
+        self.executor = make_executor(player, workers)
+        self.restarts = 0
+
+    def restart(self, broken):
+        """
+        Replace a broken executor with a new one, unless another seat already did.
+
+        Parameters
+        ----------
+        broken (concurrent.futures.ProcessPoolExecutor): The executor that failed.
+        """
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False)
+        # the new workers inherit the connections open now, which is harmless since the
+        # server closes each game's connection first
+        self.executor = make_executor(self.player, self.workers)
+        self.restarts += 1
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+async def play_seats(seats, pool, num_games=None, verbose=False):
+    """
+    Play on many servers at the same time.
+
+    Parameters
+    ----------
+    seats (list[tuple[str, int]]): The (host, port) of each server.
+    pool (MovePool): The worker processes that compute the moves.
+    num_games (int): The number of games to play on each server, or None to play until
+        cancelled.
+    verbose (bool): If True, print additional information about the connections.
+
+    Returns
+    -------
+    list[list[float]]: The turn times of each seat (see play_seat), empty for a seat that
+        failed.
+    """
+    # a seat that fails does not stop the others
+    results = await asyncio.gather(*(play_seat(host, port, pool, num_games, verbose)
+                                     for host, port in seats), return_exceptions=True)
+    for (host, port), result in zip(seats, results):
+        if isinstance(result, BaseException):
+            print(f"\033[31mSeat {host} port {port} failed\033[0m: {result!r}")
+    return [[] if isinstance(result, BaseException) else result for result in results]
+
+
+if __name__ == "__main__":
+    """
+    Run the AI player on many servers from one process.
+
+    Parameters
+    ----------
+    seats (str): The servers to connect to, as <host>:<port>.
+    --workers=<n>: The number of processes computing moves (default: every core).
+    --games=<n>: The number of games to play on each server (default: until interrupted).
+    """
+    workers = None
+    num_games = None
+    seats = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--workers=') and arg[len('--workers='):].isnumeric():
+            workers = int(arg[len('--workers='):])
+        elif arg.startswith('--games=') and arg[len('--games='):].isnumeric():
+            num_games = int(arg[len('--games='):])
+        elif ':' in arg and arg.rsplit(':', 1)[1].isnumeric():
+            host, port = arg.rsplit(':', 1)
+            seats.append((host, int(port)))
+        else:
+            seats = []
+            break
+    if not seats:
+        print("Usage: python multi_client.py <host>:<port> [<host>:<port> ...] "
+              "[--workers=<n>] [--games=<n>]")
+        sys.exit(1)
+    book_path = BOOK_PATH if os.path.exists(BOOK_PATH) else None
+    ai_player = Player(Strategy.MAX_STABLE, endgame_empties=ENDGAME_EMPTIES,
+                       book_path=book_path)
+    with MovePool(ai_player, workers) as pool:
+        all_turn_times = asyncio.run(play_seats(seats, pool, num_games, verbose=True))
+    turn_times = sorted(turn_time for seat_times in all_turn_times for turn_time in seat_times)
+    if turn_times:
+        print(f"{len(turn_times)} turns, median turn time: "
+              f"{turn_times[len(turn_times) // 2] * 1000:.1f} ms, "
+              f"slowest: {turn_times[-1] * 1000:.1f} ms")
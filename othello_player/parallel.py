@@ -0,0 +1,207 @@
+"""
+Lazy SMP: several processes search the same root and share a transposition table.
+
+Every worker runs the normal iterative deepening search. The workers only
+cooperate through the table in shared memory, where each one finds the results
+of the others. The helpers start one or two plies deeper than the main worker,
+so they fill the table ahead of it instead of repeating its work. The workers search
+until a deadline of the wall clock, so the time a task waits in its queue counts, and
+stop early when the searcher is stopped from another thread.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import bitboard
+from board import Board
+from search import INFINITY, SearchResult, Searcher, order_moves
+from transposition import TranspositionTable, table_nbytes
+
+# Seconds kept between the end of the workers' search and the deadline, for
+# the workers to report their results
+COLLECT_MARGIN = 0.05
+
+
+def _search_worker(shm_name, tt_size_mb, max_depth, patterns, stop_event, tasks, results):
+    """
+    Search the positions received on a queue until None is received.
+
+    Parameters
+    ----------
+    shm_name (str): The name of the shared memory holding the transposition table.
+    tt_size_mb (float): The size of the transposition table, in megabytes.
+    max_depth (int): The deepest iteration to search.
+    patterns (dict[str, np.ndarray]): Pattern weight tables for the evaluation, or None.
+    stop_event (multiprocessing.Event): Set to end the current search early.
+    tasks (multiprocessing.Queue): The (search id, board_state, player_number,
+        deadline, first_depth) of each search, where the deadline is a time.time().
+    results (multiprocessing.Queue): Receives the (search id, SearchResult) of each search.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tt = TranspositionTable(tt_size_mb, shm.buf)
+    searcher = Searcher(max_depth, tt=tt, patterns=patterns, stop_event=stop_event)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            search_id, board_state, player_number, deadline, first_depth = task
+            time_limit = max(deadline - time.time(), 0.0)
+            results.put((search_id, searcher.search(board_state, player_number, first_depth,
+                                                    time_limit)))
+    finally:
+        # the views of the buffer have to be released before closing it
+        tt.words.release()
+        tt.buffer.release()
+        shm.close()
+
+
+class ParallelSearcher:
+    """
+    Alpha-beta search run by several worker processes that share a transposition table.
+    The workers are started on the first search and kept until close() is called.
+    """
+
+    def __init__(self, workers=None, max_depth=60, time_limit=1.0, tt_size_mb=64, patterns=None):
+        """
+        Parameters
+        ----------
+        workers (int): The number of worker processes, or None for one per CPU.
+        max_depth (int): The deepest iteration to search.
+        time_limit (float): The number of seconds to search for.
+        tt_size_mb (float): The memory used by the shared transposition table, in megabytes.
+        patterns (dict[str, np.ndarray]): Pattern weight tables for the evaluation (see
+            patterns.load_weights), or None to not use patterns.
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        assert (self.workers >= 1)
+        assert (time_limit is not None)
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.tt_size_mb = tt_size_mb
+        self.patterns = patterns
+        self.shm = None
+        self.processes = []
+        self.tasks = None
+        self.results = None
+        self.stop_event = None
+        self._stopped = False
+        self.search_id = 0
+        # move of the deepest search reported by a worker so far, readable from another thread
+        self.best_move = None
+
+    def __getstate__(self):
+        # the workers and the shared memory belong to the process that started them
+        state = self.__dict__.copy()
+        state.update(shm=None, processes=[], tasks=None, results=None, stop_event=None)
+        return state
+
+    @property
+    def stopped(self):
+        """Whether the current search is ended as if it timed out (see Searcher.stopped)."""
+        return self._stopped
+
+    @stopped.setter
+    def stopped(self, stopped):
+        self._stopped = stopped
+        # the workers only see the event
+        if self.stop_event is not None:
+            if stopped:
+                self.stop_event.set()
+            else:
+                self.stop_event.clear()
+
+    def start(self):
+        """Allocate the shared transposition table and start the worker processes."""
+        self.shm = shared_memory.SharedMemory(create=True, size=table_nbytes(self.tt_size_mb))
+        self.tasks = [multiprocessing.Queue() for _ in range(self.workers)]
+        self.results = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.stopped = self._stopped
+        self.processes = [
+            multiprocessing.Process(
+                target=_search_worker, daemon=True,
+                args=(self.shm.name, self.tt_size_mb, self.max_depth, self.patterns,
+                      self.stop_event, tasks, self.results))
+            for tasks in self.tasks]
+        for process in self.processes:
+            process.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Stop the worker processes and free the shared transposition table."""
+        atexit.unregister(self.close)
+        for tasks in self.tasks or []:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.tasks = None
+        self.results = None
+        self.stop_event = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def search(self, board_state, player_number, time_limit=None):
+        """
+        Search for the best move with all the workers until the time limit.
+        The move of the deepest iteration completed by any worker is returned.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+        time_limit (float): The number of seconds to search for, or None to use the
+            searcher's time limit.
+
+        Returns
+        -------
+        SearchResult: The best move found, and statistics summed over the workers. If no
+            worker reports by the time limit, the first move in the search's order, at
+            depth 0.
+        """
+        if self.shm is None:
+            self.start()
+        start = time.perf_counter()
+        time_limit = self.time_limit if time_limit is None else time_limit
+        deadline = time.time() + time_limit
+        # results of an earlier search that arrived after its deadline are discarded
+        self.search_id += 1
+        self.best_move = None
+        for index, tasks in enumerate(self.tasks):
+            first_depth = 1 + index % 3
+            tasks.put((self.search_id, board_state, player_number, deadline - COLLECT_MARGIN,
+                       first_depth))
+        best = None
+        nodes = 0
+        received = 0
+        while received < self.workers:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                search_id, result = self.results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if search_id != self.search_id:
+                continue
+            received += 1
+            nodes += result.nodes
+            # ties keep the first result received
+            if best is None or result.depth > best.depth:
+                best = result
+                self.best_move = best.move
+        elapsed = time.perf_counter() - start
+        if best is None:
+            # like a search that completes no iteration
+            board = Board(board_state)
+            square = order_moves(bitboard.get_moves(board.bitboards[player_number],
+                                                    board.bitboards[3 - player_number]))[0]
+            return SearchResult([square >> 3, square & 7], -INFINITY, 0, nodes, elapsed)
+        return SearchResult(best.move, best.score, best.depth, nodes, elapsed)
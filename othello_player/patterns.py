@@ -0,0 +1,263 @@
+"""
+Pattern evaluation: the discs on a few groups of squares (edges, corners, the 2x5
+corner regions and the diagonals) index tables of weights.
+
+Each pattern is a list of squares, and its configuration is read as a ternary number:
+square i of the pattern contributes 3**i times 0 (empty), 1 (player 1) or 2 (player 2).
+The pattern is repeated under the symmetries of the board, and all the instances of a
+pattern share its weight table. A position is worth the sum of the weights of the
+configurations of all the instances, from player 1's point of view, plus a weight for
+each of a few Board signals (FEATURES) taken as player 1's minus player 2's value.
+"""
+
+import os
+
+import numpy as np
+
+import bitboard
+import vectorized
+
+PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.npz')
+
+# The squares of each pattern, for the instance at the top left corner
+PATTERNS = [
+    ('edge', [0, 1, 2, 3, 4, 5, 6, 7]),
+    ('corner_3x3', [0, 1, 2, 8, 9, 10, 16, 17, 18]),
+    ('corner_2x5', [0, 1, 2, 3, 4, 8, 9, 10, 11, 12]),
+    ('diagonal_8', [0, 9, 18, 27, 36, 45, 54, 63]),
+    ('diagonal_7', [1, 10, 19, 28, 37, 46, 55]),
+    ('diagonal_6', [2, 11, 20, 29, 38, 47]),
+    ('diagonal_5', [3, 12, 21, 30, 39]),
+    ('diagonal_4', [3, 10, 17, 24]),
+]
+# Board signals weighted by the evaluation, as differences between the players: the
+# disc count, the stable disc count and the number of legal moves
+FEATURES = ['discs', 'stable', 'mobility']
+
+
+def _build_instances():
+    """
+    List the instances of every pattern under the 8 symmetries of the board.
+
+    Returns
+    -------
+    list[tuple[int, list[int]]]: The index of the pattern in PATTERNS and the squares of
+        each instance. Symmetries that map a pattern onto the same squares are skipped.
+    """
+    instances = []
+    for pattern, (_, squares) in enumerate(PATTERNS):
+        seen = set()
+        for symmetry in range(8):
+            mapped = [bitboard.transform(1 << square, symmetry).bit_length() - 1
+                      for square in squares]
+            if frozenset(mapped) not in seen:
+                seen.add(frozenset(mapped))
+                instances.append((pattern, mapped))
+    return instances
+
+
+def _build_square_powers(instances):
+    """
+    Tabulate the power of 3 of every square in every instance.
+
+    Parameters
+    ----------
+    instances (list[tuple[int, list[int]]]): The instances (see _build_instances).
+
+    Returns
+    -------
+    np.ndarray: An array of shape (64, len(instances)) holding the power of 3 of each
+        square in each instance, or 0 if the square is not part of the instance.
+    """
+    powers = np.zeros((64, len(instances)), dtype=np.int64)
+    for instance, (_, squares) in enumerate(instances):
+        for i, square in enumerate(squares):
+            powers[square, instance] = 3 ** i
+    return powers
+
+
+INSTANCES = _build_instances()
+SQUARE_POWERS = _build_square_powers(INSTANCES)
+# Start of each pattern's table in the concatenation of all the tables
+PATTERN_OFFSETS = np.cumsum([0] + [3 ** len(squares) for _, squares in PATTERNS])
+INSTANCE_OFFSETS = np.array([PATTERN_OFFSETS[pattern] for pattern, _ in INSTANCES], dtype=np.int64)
+# (instance, power of 3) of the instances each square is part of, for incremental updates
+SQUARE_UPDATES = [[(instance, int(SQUARE_POWERS[square, instance]))
+                   for instance in np.flatnonzero(SQUARE_POWERS[square]).tolist()]
+                  for square in range(64)]
+_BIT_INDICES = np.arange(64, dtype=np.uint64)
+
+
+def get_indices(player_1, player_2):
+    """
+    Compute the configuration of every pattern instance of a batch of positions.
+
+    Parameters
+    ----------
+    player_1 (np.ndarray): The masks of player 1's discs, as np.uint64.
+    player_2 (np.ndarray): The masks of player 2's discs, as np.uint64.
+
+    Returns
+    -------
+    np.ndarray: An array of shape (N, len(INSTANCES)) of the ternary index of each instance.
+    """
+    squares = ((player_1[:, None] >> _BIT_INDICES) & np.uint64(1)).astype(np.int64) + \
+        2 * ((player_2[:, None] >> _BIT_INDICES) & np.uint64(1)).astype(np.int64)
+    return squares @ SQUARE_POWERS
+
+
+def get_features(player_1, player_2):
+    """
+    Compute the FEATURES of a batch of positions.
+
+    Parameters
+    ----------
+    player_1 (np.ndarray): The masks of player 1's discs, as np.uint64.
+    player_2 (np.ndarray): The masks of player 2's discs, as np.uint64.
+
+    Returns
+    -------
+    np.ndarray: An array of shape (N, len(FEATURES)) of player 1's minus player 2's
+        value of each feature, as np.float64.
+    """
+    signals_1 = vectorized.evaluate(player_1, player_2)
+    signals_2 = vectorized.evaluate(player_2, player_1)
+    return np.stack([signals_1['discs'] - signals_2['discs'],
+                     signals_1['stable'] - signals_2['stable'],
+                     signals_1['mobility'] - signals_1['opponent_mobility']],
+                    axis=1).astype(np.float64)
+
+
+def zero_weights():
+    """
+    Create weight tables that evaluate every position as 0.
+
+    Returns
+    -------
+    dict[str, np.ndarray]: A table of 3**len(squares) np.float32 weights for each pattern,
+        and the len(FEATURES) weights of the features as 'features'.
+    """
+    weights = {name: np.zeros(3 ** len(squares), dtype=np.float32) for name, squares in PATTERNS}
+    weights['features'] = np.zeros(len(FEATURES), dtype=np.float32)
+    return weights
+
+
+def save_weights(path, weights):
+    """
+    Write weight tables to a compressed NumPy file.
+
+    Parameters
+    ----------
+    path (str): The path of the file.
+    weights (dict[str, np.ndarray]): The table of each pattern (see zero_weights).
+    """
+    with open(path, 'wb') as weights_file:
+        np.savez_compressed(weights_file, **weights)
+
+
+def load_weights(path=PATTERNS_PATH):
+    """
+    Read weight tables written by save_weights.
+
+    Parameters
+    ----------
+    path (str): The path of the file.
+
+    Returns
+    -------
+    dict[str, np.ndarray]: The table of each pattern and the weights of the features
+        (see zero_weights), as np.float32. Files without feature weights get zeros.
+    """
+    weights = zero_weights()
+    with np.load(path) as data:
+        for name in weights:
+            if name in data:
+                assert (data[name].shape == weights[name].shape)
+                weights[name] = data[name].astype(np.float32)
+            else:
+                assert (name == 'features')
+    return weights
+
+
+class PatternEvaluator:
+    """
+    Incrementally updated pattern configurations of one position.
+    Attach it to a Board with Board.attach_patterns, so that make_move and unmake_move
+    keep it up to date.
+
+    The configurations and the weights are kept in Python lists: with only a few dozen
+    instances, the per-call overhead of NumPy is larger than the work itself.
+    """
+
+    def __init__(self, weights):
+        """
+        Parameters
+        ----------
+        weights (dict[str, np.ndarray]): The table of each pattern (see load_weights).
+        """
+        self.table = np.concatenate([weights[name] for name, _ in PATTERNS]).tolist()
+        self.features = weights['features'].tolist() if 'features' in weights else \
+            [0.0] * len(FEATURES)
+        # position in self.table of the configuration of each instance
+        self.indices = None
+        self.stack = []  # indices before each move made
+
+    def reset(self, player_1, player_2):
+        """
+        Compute the configurations of a position from scratch.
+
+        Parameters
+        ----------
+        player_1 (int): The mask of player 1's discs.
+        player_2 (int): The mask of player 2's discs.
+        """
+        indices = get_indices(np.array([player_1], dtype=np.uint64),
+                              np.array([player_2], dtype=np.uint64))[0] + INSTANCE_OFFSETS
+        self.indices = indices.tolist()
+        self.stack = []
+
+    def make(self, square, flips, player_number):
+        """
+        Update the configurations after a move.
+
+        Parameters
+        ----------
+        square (int): The square of the move.
+        flips (int): The mask of the flipped discs.
+        player_number (int): The number of the player who moved (1 or 2).
+        """
+        self.stack.append(self.indices)
+        indices = self.indices.copy()
+        for instance, power in SQUARE_UPDATES[square]:
+            indices[instance] += player_number * power
+        # a flipped disc goes from 3 - player_number to player_number
+        sign = 2 * player_number - 3
+        for flipped in bitboard.iter_bits(flips):
+            for instance, power in SQUARE_UPDATES[flipped]:
+                indices[instance] += sign * power
+        self.indices = indices
+
+    def unmake(self):
+        """Restore the configurations before the last move."""
+        self.indices = self.stack.pop()
+
+    def score(self, player_number, features=None):
+        """
+        Evaluate the position.
+
+        Parameters
+        ----------
+        player_number (int): The number of the player to evaluate for (1 or 2).
+        features (tuple[float]): The value of each of FEATURES from the player's point of
+            view (the player's minus the opponent's), or None to only use the patterns.
+
+        Returns
+        -------
+        float: The sum of the weights of the configurations and of the weighted features,
+            positive when the position favours the player.
+        """
+        value = sum(map(self.table.__getitem__, self.indices))
+        value = value if player_number == 1 else -value
+        if features is not None:
+            value += sum(map(float.__mul__, self.features, features))
+        return value
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import json
+import multiprocessing
+import sys
+import time
+
+from board import Board
+
+# Number of positions at each depth from the start position, with a pass counted as a
+# move and a finished game counted as a leaf wherever it ends
+PERFT_COUNTS = [1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284,
+                212258800, 1939886636, 18429641748, 184042084512]
+# Largest number of positions kept in the hash cache before it is emptied
+CACHE_ENTRIES = 1 << 20
+
+
+def perft(board, player_number, depth, cache=None):
+    """
+    Count the positions reached after a number of moves, making and unmaking every move.
+
+    Parameters
+    ----------
+    board (Board): The position, which is restored before returning.
+    player_number (int): The number of the player to move (1 or 2).
+    depth (int): The number of moves to play.
+    cache (dict): Counts of positions already visited, shared between calls, or None
+        to not cache them.
+
+    Returns
+    -------
+    int: The number of positions.
+    """
+    if depth == 0:
+        return 1
+    if cache is not None:
+        key = (board.bitboards[1], board.bitboards[2], player_number, depth)
+        count = cache.get(key)
+        if count is not None:
+            return count
+    moves = board.get_valid_moves(player_number)
+    if not moves:
+        if board.check_game_over():
+            return 1
+        # the pass is a move
+        count = perft(board, 3 - player_number, depth - 1, cache)
+    elif depth == 1:
+        count = len(moves)
+    else:
+        count = 0
+        for move in moves:
+            undo = board.make_move(move[0], move[1], player_number)
+            count += perft(board, 3 - player_number, depth - 1, cache)
+            board.unmake_move(undo)
+    if cache is not None:
+        if len(cache) >= CACHE_ENTRIES:
+            cache.clear()
+        cache[key] = count
+    return count
+
+
+def _perft_move(task):
+    """
+    Count the positions after one root move, in a worker process.
+
+    Parameters
+    ----------
+    task (tuple): The board_state, the number of the player to move, the move,
+        the depth and whether to use a hash cache.
+
+    Returns
+    -------
+    int: The number of positions.
+    """
+    board_state, player_number, move, depth, use_cache = task
+    board = Board(board_state)
+    board.make_move(move[0], move[1], player_number)
+    return perft(board, 3 - player_number, depth - 1, {} if use_cache else None)
+
+
+def divide(board_state, player_number, depth, workers=1, use_cache=False):
+    """
+    Count the positions reached after a number of moves, split by the first move.
+
+    Parameters
+    ----------
+    board_state (list[list[int]]) : The position to start from.
+    player_number (int): The number of the player to move (1 or 2).
+    depth (int): The number of moves to play, at least 1.
+    workers (int): The number of processes the root moves are split between, or None
+        for one per CPU.
+    use_cache (bool): If True, reuse the count of a position reached by transposition
+        from a hash cache (one per root move when running in several processes). Every
+        path is still counted, so the totals are the same.
+
+    Returns
+    -------
+    list[tuple[list[int], int]]: Each root move and its number of positions. A pass at
+        the root is reported as the move None.
+    """
+    assert (depth >= 1)
+    board = Board(board_state)
+    moves = board.get_valid_moves(player_number)
+    if not moves:
+        count = perft(board, player_number, depth, {} if use_cache else None)
+        return [(None, count)]
+    tasks = [(board_state, player_number, move, depth, use_cache) for move in moves]
+    if workers == 1:
+        cache = {} if use_cache else None
+        counts = []
+        for move in moves:
+            undo = board.make_move(move[0], move[1], player_number)
+            counts.append(perft(board, 3 - player_number, depth - 1, cache))
+            board.unmake_move(undo)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            counts = pool.map(_perft_move, tasks, chunksize=1)
+    return list(zip(moves, counts))
+
+
+if __name__ == "__main__":
+    """
+    Count the positions reached from a position and report the speed of the move generator.
+
+    Parameters
+    ----------
+    depth (int): The number of moves to play.
+    --divide: Print the count of each root move.
+    --workers=<n>: The number of processes to split the root moves between (default: 1).
+    --hash: Reuse the count of a position reached by transposition, from a hash cache.
+    --board=<json>: The board_state to start from (default: the start position).
+    --player=<n>: The number of the player to move (default: 1).
+    """
+    depth = None
+    show_divide = False
+    workers = 1
+    use_cache = False
+    board_state = Board().board_state
+    player_number = 1
+    for arg in sys.argv[1:]:
+        if arg == '--divide':
+            show_divide = True
+        elif arg == '--hash':
+            use_cache = True
+        elif arg.startswith('--workers=') and arg[len('--workers='):].isnumeric():
+            workers = int(arg[len('--workers='):])
+        elif arg.startswith('--board='):
+            board_state = json.loads(arg[len('--board='):])
+        elif arg in ('--player=1', '--player=2'):
+            player_number = int(arg[-1])
+        elif arg.isnumeric() and depth is None:
+            depth = int(arg)
+        else:
+            depth = None
+            break
+    if depth is None or depth < 1:
+        print("Usage: python perft.py <depth> [--divide] [--workers=<n>] [--hash] "
+              "[--board=<json>] [--player=<n>]")
+        sys.exit(1)
+    start = time.perf_counter()
+    counts = divide(board_state, player_number, depth, workers, use_cache)
+    elapsed = time.perf_counter() - start
+    total = sum(count for _, count in counts)
+    if show_divide:
+        for move, count in counts:
+            print(f"{'pass' if move is None else move}: {count}")
+    print(f"perft({depth}) = {total}")
+    print(f"{elapsed:.2f} s, {total / max(elapsed, 1e-9):.0f} nodes/s")
+    if board_state == Board().board_state and player_number == 1 and depth < len(PERFT_COUNTS):
+        if total == PERFT_COUNTS[depth]:
+            print("\033[32mMatches\033[0m the published count")
+        else:
+            print(f"\033[31mMismatch\033[0m: the published count is {PERFT_COUNTS[depth]}")
+            sys.exit(1)
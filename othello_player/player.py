@@ -1,9 +1,20 @@
-import json
+import math
 import socket
+import threading
+import time
 from enum import Enum
 
 import numpy as np
+import bitboard
 from board import Board
+from book import OpeningBook
+from endgame import ENDGAME_TIME_FRACTION, EndgameSolver
+from mcts import MCTS
+from parallel import ParallelSearcher
+from patterns import load_weights
+from protocol import MessageReader
+from search import Searcher, SearchTimeout, order_moves, position_key
+from timing import TimeManager, Watchdog
 
 
 class Strategy(Enum):
@@ -12,6 +23,8 @@ class Strategy(Enum):
     RANDOM = 1
     GREEDY = 2
     MAX_STABLE = 3
+    ALPHA_BETA = 4
+    MCTS = 5
 
 
 class Player:
@@ -21,14 +34,59 @@ class Player:
     The player can play a game against another player (or robot) over a network connection.
     """
 
-    def __init__(self, strategy):
+    def __init__(self, strategy, search_time=1.0, search_depth=60, tt_size_mb=16,
+                 endgame_empties=None, book_path=None, search_workers=None, ponder=False,
+                 metrics=None, patterns_path=None):
         """
         Parameters
         ----------
         strategy (Strategy): The strategy that the player will use to select a move.
+        search_time (float): The number of seconds that search strategies may use per move
+            when the server's turn time is not known. Otherwise the time manager budgets it.
+        search_depth (int): The deepest iteration that search strategies will search.
+        tt_size_mb (float): The memory used by the search's transposition table, in megabytes.
+        endgame_empties (int): Solve the game exactly instead of using the strategy when at
+            most this many squares are empty, or None to always use the strategy.
+        book_path (str): The path of an opening book file (see book.py) to play from
+            before using the strategy, or None to not use a book.
+        search_workers (int): The number of processes the alpha-beta search runs on,
+            sharing one transposition table, or None to search in this process.
+        ponder (bool): If True, keep searching during the opponent's turn in play_game
+            (alpha-beta and MCTS strategies in this process only).
+        metrics (MoveMetrics): A recorder of the statistics of every move (see metrics.py),
+            or None to not record them.
+        patterns_path (str): The path of a pattern weights file (see patterns.py) for the
+            alpha-beta search's evaluation, or None to not use patterns.
         """
         assert (type(strategy) == Strategy)
         self.strategy = strategy
+        patterns = None if patterns_path is None else load_weights(patterns_path)
+        if search_workers is None:
+            self.searcher = Searcher(search_depth, search_time, tt_size_mb, patterns=patterns)
+        else:
+            self.searcher = ParallelSearcher(search_workers, search_depth, search_time, tt_size_mb,
+                                             patterns)
+        self.mcts = MCTS(search_time)
+        self.endgame_empties = endgame_empties
+        self.book = None if book_path is None else OpeningBook(book_path)
+        self.max_turn_time = None  # seconds per move allowed by the server, if known
+        # time.perf_counter() when the server's message was received, or None for when
+        # the move selection starts
+        self.turn_start = None
+        self.deadline = None  # time.perf_counter() at the end of the current move's budget
+        self.time_manager = TimeManager()
+        self.watchdog = Watchdog()
+        self.last_search = None  # SearchResult of the last move chosen by search
+        assert (not ponder or search_workers is None)
+        self.ponder = ponder
+        self.ponder_thread = None
+        # seconds from receiving each message of the server to sending the reply
+        self.turn_times = []
+        # SearchResult of each position searched while pondering, by (p1 mask, p2 mask, player number)
+        self.ponder_results = {}
+        self.metrics = metrics
+        # cProfile.Profile enabled while the strategy selects a move, or None
+        self.profile = None
 
     def human_select(self, board_state, player_number):
         """
@@ -99,9 +157,9 @@ class Player:
         max_score = -1
         best_moves = []  # list of moves that result in the highest score
         for move in moves:
-            possible_board = Board(board_state)
-            possible_board.make_move(move[0], move[1], player_number)
-            score = possible_board.score(player_number)
+            undo = board.make_move(move[0], move[1], player_number)
+            score = board.score(player_number)
+            board.unmake_move(undo)
             if score > max_score:  # update the best move
                 max_score = score
                 best_moves = [move]
@@ -128,10 +186,12 @@ class Player:
         moves = board.get_valid_moves(player_number)
         max_stable = -1
         stable_moves = []
+        # stable discs stay stable, so each child only extends the current stable set
+        current_stable = board.get_stable_discs(player_number)
         for move in moves:
-            possible_board = Board(board_state)
-            possible_board.make_move(move[0], move[1], player_number)
-            stable = possible_board.count_stable_discs(player_number)
+            undo = board.make_move(move[0], move[1], player_number)
+            stable = board.count_stable_discs(player_number, current_stable)
+            board.unmake_move(undo)
             if stable > max_stable:
                 max_stable = stable
                 stable_moves = [move]
@@ -141,19 +201,234 @@ class Player:
             return self.greedy_select(board_state, player_number)
         return stable_moves[np.random.choice(list(range(len(stable_moves))))]
 
+    def alpha_beta_select(self, board_state, player_number):
+        """
+        Select the move found by an alpha-beta search with iterative deepening.
+        The evaluation combines stable discs, mobility and score.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        board = Board(board_state)
+        self.last_search = self.ponder_results.get(
+            (board.bitboards[1], board.bitboards[2], player_number))
+        if self.last_search is None:
+            self.last_search = self.searcher.search(board_state, player_number,
+                                                    time_limit=self.time_left())
+        return self.last_search.move
+
+    def mcts_select(self, board_state, player_number):
+        """
+        Select the most visited move of a Monte Carlo tree search.
+        The search uses the move's time budget if the server's turn time is known.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        self.last_search = self.mcts.search(board_state, player_number, self.time_left())
+        return self.last_search.move
+
+    def book_select(self, board_state, player_number):
+        """
+        Select the opening book move for the current position.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column], or None
+            if there is no book or the position is not in it.
+        """
+        if self.book is None:
+            return None
+        board = Board(board_state)
+        move = self.book.lookup(board, player_number)
+        if move is None or not board.is_valid_move(move[0], move[1], player_number):
+            return None
+        return move
+
+    def endgame_select(self, board_state, player_number):
+        """
+        Select the move with the best final score by solving the rest of the game exactly.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column], or None
+            if there are too many empty squares or the game could not be solved in time.
+        """
+        if self.endgame_empties is None:
+            return None
+        board = Board(board_state)
+        empties = 64 - board.score(1) - board.score(2)
+        if empties > self.endgame_empties:
+            return None
+        time_limit = self.time_left()
+        if time_limit is not None:
+            time_limit *= ENDGAME_TIME_FRACTION
+        try:
+            self.last_search = EndgameSolver(time_limit).solve(board_state, player_number)
+        except SearchTimeout:
+            return None
+        return self.last_search.move
+
     def get_move(self, board_state, player_number):
+        """
+        Select a move based on the player's strategy, recording its statistics if the
+        player has metrics.
+
+        Parameters
+        ----------
+        board_state (list[list[int]] or Position) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        if self.metrics is None:
+            return self.select_move(board_state, player_number)
+        return self.metrics.measure(self, board_state, player_number)
+
+    def time_left(self):
+        """
+        Get the time left in the current move's budget.
+
+        Returns
+        -------
+        float: The number of seconds, or None if the server's turn time is not known.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    def select_move(self, board_state, player_number):
+        """
+        Select a move based on the player's strategy, within the server's turn time if it
+        is known. The strategy then searches until the move's budget, and a watchdog
+        returns the best move found so far if it is still running at the hard limit.
+
+        Parameters
+        ----------
+        board_state (list[list[int]] or Position) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        if self.max_turn_time is None or self.strategy == Strategy.HUMAN:
+            self.deadline = None
+            return self.profiled_select(board_state, player_number, self.profile)
+        self.wait_for_selection()
+        start = time.perf_counter() if self.turn_start is None else self.turn_start
+        board = Board(board_state)
+        budget, hard_limit = self.time_manager.start_move(
+            self.max_turn_time, 64 - board.score(1) - board.score(2))
+        self.deadline = start + budget
+        # only moves of this position may be returned by the fallback
+        self.searcher.best_move = None
+        self.mcts.best_move = None
+        profile = self.profile
+        return self.watchdog.run(lambda: self.profiled_select(board_state, player_number, profile),
+                                 start + hard_limit, self.stop_search,
+                                 lambda: self.best_move_so_far(board, player_number))
+
+    def stop_search(self):
+        """End the searches running on other threads, as if their time was up."""
+        self.searcher.stopped = True
+        self.mcts.stopped = True
+
+    def wait_for_selection(self):
+        """Wait for a selection left running by the watchdog, and allow searching again."""
+        self.watchdog.wait()
+        self.searcher.stopped = False
+        self.mcts.stopped = False
+
+    def best_move_so_far(self, board, player_number):
+        """
+        Get the best move found by the current selection, for the watchdog.
+
+        Parameters
+        ----------
+        board (Board): The current position.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The move of the search's deepest completed iteration or MCTS's most
+            visited move if there is one, or else the first move in the search's order.
+        """
+        self.last_search = None
+        for move in (self.searcher.best_move, self.mcts.best_move):
+            if move is not None:
+                return move
+        moves = bitboard.get_moves(board.bitboards[player_number], board.bitboards[3 - player_number])
+        square = order_moves(moves)[0]
+        return [square >> 3, square & 7]
+
+    def profiled_select(self, board_state, player_number, profile):
+        """
+        Select a move based on the player's strategy, profiling the thread that runs it.
+
+        Parameters
+        ----------
+        board_state (list[list[int]] or Position) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+        profile (cProfile.Profile): The profile to enable during the selection, or None.
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        if profile is None:
+            return self.strategy_select(board_state, player_number)
+        profile.enable()
+        try:
+            return self.strategy_select(board_state, player_number)
+        finally:
+            profile.disable()
+
+    def strategy_select(self, board_state, player_number):
         """
         Select a move based on the player's strategy.
 
         Parameters
         ----------
-        board_state (list[list[int]]) : The current state of the board.
+        board_state (list[list[int]] or Position) : The current state of the board.
         player_number (int): The number of the current player (1 or 2).
 
         Returns
         -------
         list[int]: The selected move as a list of two integers, [row, column].
         """
+        self.last_search = None
+        if self.strategy != Strategy.HUMAN:
+            move = self.book_select(board_state, player_number)
+            if move is not None:
+                return move
+            move = self.endgame_select(board_state, player_number)
+            if move is not None:
+                return move
         if self.strategy == Strategy.HUMAN:
             move = self.human_select(board_state, player_number)
         elif self.strategy == Strategy.RANDOM:
@@ -162,8 +437,77 @@ class Player:
             move = self.greedy_select(board_state, player_number)
         elif self.strategy == Strategy.MAX_STABLE:
             move = self.max_stable_select(board_state, player_number)
+        elif self.strategy == Strategy.ALPHA_BETA:
+            move = self.alpha_beta_select(board_state, player_number)
+        elif self.strategy == Strategy.MCTS:
+            move = self.mcts_select(board_state, player_number)
         return move
 
+    def ponder_replies(self, board_state, player_number):
+        """
+        Search during the opponent's turn, until every likely reply is searched or
+        stop_pondering() is called. Runs on the ponder thread.
+
+        The alpha-beta strategy searches the position after each of the opponent's replies,
+        starting with the reply its last search expected, and keeps the completed results
+        for alpha_beta_select. MCTS grows the tree of the opponent's position, which the
+        next search reuses.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The state of the board after our move.
+        player_number (int): The number of our player (1 or 2).
+        """
+        board = Board(board_state)
+        opponent_number = 3 - player_number
+        replies = bitboard.get_moves(board.bitboards[opponent_number], board.bitboards[player_number])
+        if not replies:
+            return
+        if self.strategy == Strategy.MCTS:
+            self.mcts.search(board_state, opponent_number, math.inf)
+            return
+        entry = None if self.searcher.tt is None else \
+            self.searcher.tt.probe(position_key(board, opponent_number))
+        for square in order_moves(replies, None if entry is None else entry[3]):
+            undo = board.make_move(square >> 3, square & 7, opponent_number)
+            if board.get_valid_moves(player_number):
+                result = self.searcher.search(board.board_state, player_number)
+                if self.searcher.stopped:
+                    return
+                self.ponder_results[(board.bitboards[1], board.bitboards[2], player_number)] = result
+            board.unmake_move(undo)
+
+    def start_pondering(self, board_state, player_number, move):
+        """
+        Start pondering on a background thread after sending a move.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The state of the board before our move.
+        player_number (int): The number of our player (1 or 2).
+        move (list[int]): Our move, [row, column].
+        """
+        if not self.ponder or self.strategy not in (Strategy.ALPHA_BETA, Strategy.MCTS):
+            return
+        self.wait_for_selection()
+        board = Board(board_state)
+        board.make_move(move[0], move[1], player_number)
+        self.ponder_results = {}
+        self.ponder_thread = threading.Thread(
+            target=self.ponder_replies, args=(board.board_state, player_number), daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the ponder thread, keeping the results it completed."""
+        if self.ponder_thread is None:
+            return
+        self.searcher.stopped = True
+        self.mcts.stopped = True
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        self.searcher.stopped = False
+        self.mcts.stopped = False
+
     def prepare_response(self, move):
         """Prepare a response to send to the game server."""
         response = '{}\n'.format(move).encode()
@@ -188,26 +532,44 @@ class Player:
             sock.connect((host, port))
             if verbose:
                 print('connected!')
+            reader = MessageReader(sock)
             while True:
-                data = sock.recv(1024)
-                if not data:
+                message = reader.read_message()
+                # the ponder results are kept, they may hold the search of this position
+                self.stop_pondering()
+                if message is None:
                     if verbose:
                         print('closing connection...')
                     break
-                json_data = json.loads(str(data.decode('UTF-8')))
-                board_state = json_data['board']
-                maxTurnTime = json_data['maxTurnTime']
-                player_number = json_data['player']
+                board_state = message.position
+                player_number = message.player_number
+                self.max_turn_time = message.max_turn_time
+                self.turn_start = message.received
 
                 if self.strategy == Strategy.HUMAN:
                     display_player = "\033[31m1\033[0m" if player_number == 1 else "\033[34m2\033[0m"
                     print("\nPlayer:", display_player,
-                          "maxTurnTime:", maxTurnTime/1000, "s")
+                          "maxTurnTime:", self.max_turn_time, "s")
 
                 move = self.get_move(board_state, player_number)
                 response = self.prepare_response(move)
                 sock.sendall(response)
+                self.turn_times.append(time.perf_counter() - message.received)
+                late = self.deadline is not None and self.watchdog.fired
+                if self.deadline is not None:
+                    self.time_manager.finish_move(self.turn_times[-1], late)
+                if verbose:
+                    if self.last_search is not None:
+                        search = self.last_search
+                        print(f"depth: {search.depth}, nodes: {search.nodes}, "
+                              f"nodes/s: {search.nodes / max(search.elapsed, 1e-9):.0f}")
+                    print(f"turn time: {self.turn_times[-1] * 1000:.1f} ms"
+                          f"{' (watchdog)' if late else ''}")
+                self.start_pondering(board_state, player_number, move)
         finally:
+            self.stop_pondering()
             sock.close()
             if verbose:
                 print("connection closed")
+                if self.time_manager.num_moves:
+                    print("time:", self.time_manager.summary())
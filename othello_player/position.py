@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+import bitboard
+
+
+class Position(namedtuple('Position', ['player_1', 'player_2'])):
+    """
+    Immutable snapshot of the discs on the board, as one mask per player.
+
+    A Position is two integers, so it is hashable, cheap to copy and to pickle, and
+    building a Board from it (Board(position)) skips the conversion of the nested lists.
+    It can be passed anywhere a board_state is accepted.
+
+    Attributes
+    ----------
+    player_1 (int): The mask of player 1's discs.
+    player_2 (int): The mask of player 2's discs.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_rows(cls, board_state):
+        """
+        Build a position from the nested list format used by the server.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]): The board state, with 0 for empty, 1 and 2 for each player.
+
+        Returns
+        -------
+        Position: The position.
+        """
+        return cls(*bitboard.from_rows(board_state))
+
+    @property
+    def rows(self):
+        """list[list[int]]: The board in the nested list format used by the server."""
+        return bitboard.to_rows(self.player_1, self.player_2)
+
+    @property
+    def empties(self):
+        """int: The number of empty squares."""
+        return 64 - (self.player_1 | self.player_2).bit_count()
+
+    def play(self, row, col, player_number):
+        """
+        Get the position after a move. The position itself is not changed.
+
+        Parameters
+        ----------
+        row (int): The row index of the move.
+        col (int): The column index of the move.
+        player_number (int): The number of the player making the move (1 or 2).
+
+        Returns
+        -------
+        Position: The position after the move.
+        """
+        move_bit = 1 << bitboard.square(row, col)
+        assert (not (self.player_1 | self.player_2) & move_bit)
+        if player_number == 1:
+            flips = bitboard.get_flips(self.player_1, self.player_2, move_bit)
+            assert (flips)
+            return Position(self.player_1 | flips | move_bit, self.player_2 ^ flips)
+        flips = bitboard.get_flips(self.player_2, self.player_1, move_bit)
+        assert (flips)
+        return Position(self.player_1 ^ flips, self.player_2 | flips | move_bit)
@@ -0,0 +1,163 @@
+"""
+Reading the game server's messages from a socket.
+
+The server sends one JSON object per turn, e.g.
+{"board": [[0, 0, ...], ...], "maxTurnTime": 5000, "player": 1}, optionally followed
+by a newline. A single recv may hold part of a message or several messages, so the
+bytes are kept in a buffer and split into frames at the closing brace of each
+object (the messages have no nested objects).
+"""
+
+import re
+import time
+from collections import namedtuple
+
+import bitboard
+from position import Position
+
+RECV_SIZE = 4096
+
+# "name": value, where the value is a number or a list of numbers
+_FIELD = re.compile(rb'"(\w+)"\s*:\s*(\[[\[\]\d,\s]*\]|-?\d+(?:\.\d+)?)')
+# characters of the board list that are not squares
+_BOARD_SEPARATORS = b'[], \t\r\n'
+# translate the squares of the board to the bits of one player's mask
+_PLAYER_1_BITS = bytes.maketrans(b'012', b'010')
+_PLAYER_2_BITS = bytes.maketrans(b'012', b'001')
+
+
+class Message(namedtuple('Message', ['player_number', 'max_turn_time', 'player_1', 'player_2',
+                                     'received'])):
+    """
+    Message sent by the server at the start of each of our turns.
+
+    Attributes
+    ----------
+    player_number (int): The number of the player to move (1 or 2).
+    max_turn_time (float): The time allowed for the move, in seconds.
+    player_1 (int): The mask of player 1's discs.
+    player_2 (int): The mask of player 2's discs.
+    received (float): The time.perf_counter() when the end of the message was received.
+    """
+    __slots__ = ()
+
+    @property
+    def position(self):
+        """Position: The board, without building the nested lists."""
+        return Position(self.player_1, self.player_2)
+
+    @property
+    def board_state(self):
+        """list[list[int]]: The board in the nested list format used by the server."""
+        return bitboard.to_rows(self.player_1, self.player_2)
+
+
+def parse_board(text):
+    """
+    Convert the board of a message to masks, without building the nested lists.
+
+    Parameters
+    ----------
+    text (bytes): The JSON list of the 8 rows of the board.
+
+    Returns
+    -------
+    tuple[int, int]: The masks of player 1's and player 2's discs.
+
+    Raises
+    ------
+    ValueError: If the board does not have 64 squares.
+    """
+    squares = text.translate(None, _BOARD_SEPARATORS)
+    if len(squares) != 64:
+        raise ValueError(f"Board of {len(squares)} squares in message: {bytes(text)!r}")
+    # the first square is bit 0, so the digits are reversed to read them as a binary number
+    squares = squares[::-1]
+    return int(squares.translate(_PLAYER_1_BITS), 2), int(squares.translate(_PLAYER_2_BITS), 2)
+
+
+def parse_message(frame, received=None):
+    """
+    Parse one message of the server.
+
+    Parameters
+    ----------
+    frame (bytes): The JSON object of the message.
+    received (float): The time the message was received, or None for now.
+
+    Returns
+    -------
+    Message: The parsed message.
+
+    Raises
+    ------
+    ValueError: If a field of the message is missing, or the board does not have 64 squares.
+    """
+    fields = dict(_FIELD.findall(frame))
+    try:
+        player_1, player_2 = parse_board(fields[b'board'])
+        return Message(int(fields[b'player']), float(fields[b'maxTurnTime']) / 1000,
+                       player_1, player_2,
+                       time.perf_counter() if received is None else received)
+    except KeyError as error:
+        raise ValueError(f"Missing field {error} in message: {bytes(frame)!r}")
+
+
+class MessageReader:
+    """
+    Buffered reader that splits the bytes received on a socket into messages.
+    The receive buffer is allocated once and reused for every read.
+    """
+
+    def __init__(self, sock, recv_size=RECV_SIZE):
+        """
+        Parameters
+        ----------
+        sock (socket.socket): The connected socket to read from.
+        recv_size (int): The largest number of bytes read at once.
+        """
+        self.sock = sock
+        self.chunk = bytearray(recv_size)
+        self.chunk_view = memoryview(self.chunk)
+        self.buffer = bytearray()
+        self.received = None  # time the last bytes were received
+
+    def next_frame(self):
+        """
+        Remove the first complete message from the buffer.
+
+        Returns
+        -------
+        bytes: The JSON object of the message, or None if no message is complete.
+
+        Raises
+        ------
+        ValueError: If the buffer holds the end of an object that was never started.
+        """
+        end = self.buffer.find(b'}')
+        if end < 0:
+            return None
+        start = self.buffer.find(b'{', 0, end)
+        if start < 0:
+            raise ValueError(f"Invalid message: {bytes(self.buffer[:end + 1])!r}")
+        frame = bytes(self.buffer[start:end + 1])
+        del self.buffer[:end + 1]
+        return frame
+
+    def read_message(self):
+        """
+        Read the next message, waiting for the server if it is not complete yet.
+
+        Returns
+        -------
+        Message: The next message, or None if the server closed the connection.
+        """
+        frame = self.next_frame()
+        while frame is None:
+            size = self.sock.recv_into(self.chunk_view)
+            if not size:
+                return None
+            self.received = time.perf_counter()
+            self.buffer += self.chunk_view[:size]
+            frame = self.next_frame()
+        return parse_message(frame, self.received)
@@ -0,0 +1,312 @@
+import time
+from collections import namedtuple
+
+import bitboard
+import zobrist
+from board import Board
+from patterns import PatternEvaluator
+from transposition import Bound, TranspositionTable
+
+# Weights of the signals used to evaluate a position that is not game over
+STABLE_WEIGHT = 10
+MOBILITY_WEIGHT = 5
+SCORE_WEIGHT = 1
+# Weight of the pattern evaluation (see patterns.py), which predicts the final disc
+# difference, so that it counts like the stable discs
+PATTERN_WEIGHT = 10
+# Finished games are scored by disc difference times this weight, which is
+# larger than any evaluation of an unfinished game
+GAME_OVER_WEIGHT = 1000
+# Evaluations of unfinished games are clamped to this, which keeps them below any won
+# or lost game whatever the pattern weights
+HEURISTIC_LIMIT = GAME_OVER_WEIGHT - 1
+INFINITY = 1000000
+
+# Static value of each square, used only to order moves before searching them.
+# Corners are tried first and the squares next to the corners last.
+SQUARE_ORDER = [
+    100, -20, 10, 5, 5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10, 5, 5, 10, -20, 100,
+]
+
+# How many nodes to search between checks of the clock
+CHECK_INTERVAL = 1024
+
+SearchResult = namedtuple(
+    'SearchResult', ['move', 'score', 'depth', 'nodes', 'elapsed'])
+SearchResult.__doc__ = """
+Result of a search.
+
+Attributes
+----------
+move (list[int]): The best move found, [row, column].
+score (int): The evaluation of the move for the player to move.
+depth (int): The deepest iteration that was completed.
+nodes (int): The number of positions visited over all iterations.
+elapsed (float): The time spent searching in seconds.
+"""
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline has passed."""
+
+
+def evaluate(board, player_number):
+    """
+    Evaluate a position from the point of view of a player.
+
+    Parameters
+    ----------
+    board (Board): The position to evaluate.
+    player_number (int): The number of the player (1 or 2).
+
+    Returns
+    -------
+    int: The evaluation, positive when the position favours the player, and smaller in
+        absolute value than GAME_OVER_WEIGHT.
+    """
+    opponent_number = 3 - player_number
+    player = board.bitboards[player_number]
+    opponent = board.bitboards[opponent_number]
+    stable = board.count_stable_discs(player_number) - \
+        board.count_stable_discs(opponent_number)
+    mobility = bitboard.get_moves(player, opponent).bit_count() - \
+        bitboard.get_moves(opponent, player).bit_count()
+    score = board.score(player_number) - board.score(opponent_number)
+    value = STABLE_WEIGHT * stable + MOBILITY_WEIGHT * mobility + SCORE_WEIGHT * score
+    if board.patterns is not None:
+        features = (score, stable, mobility)  # in the order of patterns.FEATURES
+        value += round(PATTERN_WEIGHT * board.patterns.score(player_number, features))
+    return max(-HEURISTIC_LIMIT, min(value, HEURISTIC_LIMIT))
+
+
+def order_moves(moves, first=None):
+    """
+    Order the squares of a move mask so that the most promising are searched first.
+
+    Parameters
+    ----------
+    moves (int): A mask of legal moves.
+    first (int): A square to search before all others, if it is legal.
+
+    Returns
+    -------
+    list[int]: The squares of the moves, best first.
+    """
+    squares = sorted(bitboard.iter_bits(moves),
+                     key=SQUARE_ORDER.__getitem__, reverse=True)
+    if first is not None and first in squares:
+        squares.remove(first)
+        squares.insert(0, first)
+    return squares
+
+
+def position_key(board, player_number):
+    """
+    Get the transposition table key of a position.
+
+    Parameters
+    ----------
+    board (Board): The position.
+    player_number (int): The number of the player to move (1 or 2).
+
+    Returns
+    -------
+    int: The Zobrist hash of the position and the player to move.
+    """
+    return board.hash ^ zobrist.SIDE_KEY if player_number == 2 else board.hash
+
+
+class Searcher:
+    """
+    Negamax search with alpha-beta pruning, iterative deepening and a transposition table.
+    """
+
+    def __init__(self, max_depth=60, time_limit=None, tt_size_mb=16, tt=None, patterns=None,
+                 stop_event=None):
+        """
+        Parameters
+        ----------
+        max_depth (int): The deepest iteration to search.
+        time_limit (float): The number of seconds to search for, or None to only
+            stop at max_depth.
+        tt_size_mb (float): The memory used by the transposition table, in megabytes.
+            The table is allocated on the first search and kept between searches.
+        tt (TranspositionTable): A table to use instead of allocating one, for example
+            one shared with other processes.
+        patterns (dict[str, np.ndarray]): Pattern weight tables (see patterns.load_weights)
+            to add to the evaluation, or None to not use patterns.
+        stop_event (multiprocessing.Event): An event set from another process to end the
+            current search as if it timed out, or None.
+        """
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.tt_size_mb = tt_size_mb
+        self.tt = tt
+        self.patterns = None if patterns is None else PatternEvaluator(patterns)
+        self.nodes = 0
+        self.deadline = None
+        # set from another thread to end the current search as if it timed out
+        self.stopped = False
+        self.stop_event = stop_event
+        # move of the deepest iteration completed so far, readable from another thread
+        self.best_move = None
+
+    def __getstate__(self):
+        # the transposition table is reallocated on the first search after unpickling
+        state = self.__dict__.copy()
+        state['tt'] = None
+        return state
+
+    def search(self, board_state, player_number, first_depth=1, time_limit=None):
+        """
+        Search for the best move with iterative deepening.
+        Each iteration searches one ply deeper, until max_depth or the time limit is reached.
+        The move of the deepest completed iteration is returned.
+
+        Parameters
+        ----------
+        board_state (list[list[int]]) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+        first_depth (int): The depth of the first iteration.
+        time_limit (float): The number of seconds to search for, or None to use the
+            searcher's time limit.
+
+        Returns
+        -------
+        SearchResult: The best move found and statistics about the search.
+        """
+        board = Board(board_state)
+        if self.patterns is not None:
+            board.attach_patterns(self.patterns)
+        start = time.perf_counter()
+        if self.tt is None:
+            self.tt = TranspositionTable(self.tt_size_mb)
+        self.tt.new_search()
+        self.nodes = 0
+        time_limit = self.time_limit if time_limit is None else time_limit
+        self.deadline = None if time_limit is None else start + time_limit
+        moves = bitboard.get_moves(board.bitboards[player_number],
+                                   board.bitboards[3 - player_number])
+        assert (moves)
+        root_moves = order_moves(moves)
+        best_square, best_score, depth = root_moves[0], -INFINITY, 0
+        self.best_move = [best_square >> 3, best_square & 7]
+        for iteration in range(first_depth, self.max_depth + 1):
+            try:
+                square, score, root_moves = self.search_root(
+                    board, root_moves, iteration, player_number)
+            except SearchTimeout:
+                break
+            best_square, best_score, depth = square, score, iteration
+            self.best_move = [best_square >> 3, best_square & 7]
+            # no point searching deeper once every line reaches the end of the game
+            if abs(score) >= GAME_OVER_WEIGHT or iteration >= 64 - board.score(1) - board.score(2):
+                break
+        elapsed = time.perf_counter() - start
+        return SearchResult([best_square >> 3, best_square & 7], best_score, depth, self.nodes, elapsed)
+
+    def search_root(self, board, root_moves, depth, player_number):
+        """
+        Search every root move to a fixed depth.
+
+        Parameters
+        ----------
+        board (Board): The position to search, which is restored before returning
+            (unless the search times out).
+        root_moves (list[int]): The squares of the legal moves, in the order to search them.
+        depth (int): The depth to search to.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        tuple[int, int, list[int]]: The best square, its score, and the root moves
+            reordered by score for the next iteration.
+        """
+        alpha = -INFINITY
+        scores = {}
+        for square in root_moves:
+            undo = board.make_move(square >> 3, square & 7, player_number)
+            score = -self.negamax(board, depth - 1, -INFINITY, -alpha, 3 - player_number)
+            board.unmake_move(undo)
+            scores[square] = score
+            if score > alpha:
+                alpha = score
+        ordered = sorted(root_moves, key=scores.__getitem__, reverse=True)
+        self.tt.store(position_key(board, player_number), depth,
+                      Bound.EXACT, scores[ordered[0]], ordered[0])
+        return ordered[0], scores[ordered[0]], ordered
+
+    def negamax(self, board, depth, alpha, beta, player_number):
+        """
+        Search a position with alpha-beta pruning.
+
+        Parameters
+        ----------
+        board (Board): The position to search, which is restored before returning
+            (unless the search times out).
+        depth (int): The remaining depth to search.
+        alpha (int): The lower bound of the search window.
+        beta (int): The upper bound of the search window.
+        player_number (int): The number of the player to move (1 or 2).
+
+        Returns
+        -------
+        int: The score of the position for the player to move.
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and (
+                self.stopped or self.deadline is not None and time.perf_counter() > self.deadline
+                or self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchTimeout()
+        opponent_number = 3 - player_number
+        player = board.bitboards[player_number]
+        opponent = board.bitboards[opponent_number]
+        moves = bitboard.get_moves(player, opponent)
+        if not moves:
+            if not bitboard.get_moves(opponent, player):
+                return GAME_OVER_WEIGHT * (board.score(player_number) - board.score(opponent_number))
+            # pass: the opponent moves again without using up depth
+            return -self.negamax(board, depth, -beta, -alpha, opponent_number)
+        if depth <= 0:
+            return evaluate(board, player_number)
+        key = position_key(board, player_number)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, bound, score, tt_move = entry
+            if entry_depth >= depth:
+                if bound == Bound.EXACT:
+                    return score
+                if bound == Bound.LOWER and score >= beta:
+                    return score
+                if bound == Bound.UPPER and score <= alpha:
+                    return score
+        alpha_start = alpha
+        best = -INFINITY
+        best_square = None
+        for square in order_moves(moves, tt_move):
+            undo = board.make_move(square >> 3, square & 7, player_number)
+            score = -self.negamax(board, depth - 1, -beta, -alpha, opponent_number)
+            board.unmake_move(undo)
+            if score > best:
+                best = score
+                best_square = square
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if best >= beta:
+            bound = Bound.LOWER
+        elif best <= alpha_start:
+            bound = Bound.UPPER
+        else:
+            bound = Bound.EXACT
+        self.tt.store(key, depth, bound, best, best_square)
+        return best
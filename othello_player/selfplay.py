@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Self-play data generation: games between two players are streamed to binary shards
+of fixed-width records, one per position where a move was played.
+
+Each record is RECORD_SIZE bytes, little-endian: the masks of player 1's and player 2's
+discs (8 bytes each), the player to move, the square of the move played
+(row * 8 + column), the number of moves played before it in the game (0 at the start
+of a game), and the final disc differential of the game from player 1's point of view
+(signed). The records of a game are never split between shards, and a shard is read
+back with read_shard as a NumPy array of RECORD_DTYPE without loading it into memory.
+"""
+
+import multiprocessing
+import os
+import random
+import struct
+import sys
+
+import numpy as np
+from tqdm import tqdm
+
+import arena
+import bitboard
+from arena import play_match, seed_game
+from board import Board
+from player import Player, Strategy
+
+RECORD = struct.Struct('<QQBBBb')
+RECORD_SIZE = RECORD.size
+RECORD_DTYPE = np.dtype([('player_1', '<u8'), ('player_2', '<u8'), ('player', 'u1'),
+                         ('move', 'u1'), ('ply', 'u1'), ('result', 'i1')])
+assert (RECORD_DTYPE.itemsize == RECORD_SIZE)
+# Size after which a shard is closed and the next one started
+SHARD_BYTES = 64 << 20
+# Number of games handed to the worker processes at a time, which bounds the number of
+# finished games waiting to be written
+BATCH_GAMES = 256
+
+
+def encode_game(played, result):
+    """
+    Encode the positions of a game as records.
+
+    Parameters
+    ----------
+    played (list[tuple[int, int, int, int]]): The masks of player 1's and player 2's discs,
+        the number of the player to move and the square of the move, for each move.
+    result (int): The final disc differential, from player 1's point of view.
+
+    Returns
+    -------
+    bytes: The records of the positions, RECORD_SIZE bytes each.
+    """
+    return b''.join(RECORD.pack(player_1, player_2, player_number, square, ply, result)
+                    for ply, (player_1, player_2, player_number, square) in enumerate(played))
+
+
+class RandomOpening:
+    """
+    Player that moves at random for the first moves of a game, then lets another player
+    move, so that games between deterministic players differ.
+    """
+
+    def __init__(self, player, random_plies, rng=None):
+        """
+        Parameters
+        ----------
+        player (Player): The player to move after the opening.
+        random_plies (int): The number of moves of the game played at random.
+        rng (random.Random): The generator of the random moves, or None to use the
+            random module.
+        """
+        self.player = player
+        self.random_plies = random_plies
+        self.rng = random if rng is None else rng
+
+    def get_move(self, board_state, player_number):
+        """
+        Select a move (see Player.get_move).
+
+        Parameters
+        ----------
+        board_state (Position) : The current state of the board.
+        player_number (int): The number of the current player (1 or 2).
+
+        Returns
+        -------
+        list[int]: The selected move as a list of two integers, [row, column].
+        """
+        if board_state.empties > 60 - self.random_plies:
+            return self.rng.choice(Board(board_state).get_valid_moves(player_number))
+        return self.player.get_move(board_state, player_number)
+
+
+def play_game_records(player_1, player_2, random_plies=0, rng=None):
+    """
+    Play a game between two players in this process and encode its positions.
+
+    Parameters
+    ----------
+    player_1 (Player): The player who moves first.
+    player_2 (Player): The player who moves second.
+    random_plies (int): The number of moves at the start of the game that are played
+        at random instead of by the players.
+    rng (random.Random): The generator of the random moves, or None to use the
+        random module.
+
+    Returns
+    -------
+    bytes: The records of the positions, RECORD_SIZE bytes each.
+
+    Raises
+    ------
+    ValueError: If a player selects an invalid move.
+    """
+    played = []  # (player_1, player_2, player_number, square) of each move
+
+    def record_move(board, player_number, move):
+        played.append((board.bitboards[1], board.bitboards[2], player_number,
+                       bitboard.square(move[0], move[1])))
+
+    if random_plies:
+        rng = random if rng is None else rng
+        player_1 = RandomOpening(player_1, random_plies, rng)
+        player_2 = RandomOpening(player_2, random_plies, rng)
+    p1_score, p2_score = play_match(player_1, player_2, on_move=record_move)
+    return encode_game(played, p1_score - p2_score)
+
+
+def _play_seeded_game(index):
+    """
+    Play one game of self_play in a worker process (see arena.init_worker).
+
+    Parameters
+    ----------
+    index (int): The index of the game.
+
+    Returns
+    -------
+    bytes: The records of the game's positions.
+    """
+    player_1, player_2, random_plies, seed = arena.worker_args
+    game_seed = seed_game(seed, index)
+    return play_game_records(player_1, player_2, random_plies, random.Random(game_seed))
+
+
+def self_play(player_1, player_2, num_games, random_plies=0, workers=1, seed=0):
+    """
+    Generate self-play games lazily.
+
+    Parameters
+    ----------
+    player_1 (Player): The player who moves first. Each worker process gets its own copy.
+    player_2 (Player): The player who moves second.
+    num_games (int): The number of games to play.
+    random_plies (int): The number of random moves at the start of each game.
+    workers (int): The number of processes to play the games on, or None to use every core.
+    seed (int): The seed from which the seed of every game is derived.
+
+    Yields
+    ------
+    bytes: The records of the positions of each game (see play_game_records). With
+        several workers, games are yielded in the order they finish.
+    """
+    if workers == 1:
+        arena.init_worker(player_1, player_2, random_plies, seed)
+        for index in range(num_games):
+            yield _play_seeded_game(index)
+        return
+    with multiprocessing.Pool(workers, initializer=arena.init_worker,
+                              initargs=(player_1, player_2, random_plies, seed)) as pool:
+        # batches keep the pool from running far ahead of the consumer
+        for start in range(0, num_games, BATCH_GAMES):
+            indices = range(start, min(start + BATCH_GAMES, num_games))
+            yield from pool.imap_unordered(_play_seeded_game, indices)
+
+
+class ShardWriter:
+    """
+    Writer of records to numbered shard files, <prefix>-<n>.bin, starting a new shard
+    when the current one reaches a size. A shard is written as <name>.tmp and renamed
+    when it is complete, so readers only ever see whole shards.
+    """
+
+    def __init__(self, directory, prefix='selfplay', shard_bytes=SHARD_BYTES):
+        """
+        Parameters
+        ----------
+        directory (str): The directory of the shards, created if needed. Numbering
+            continues after the shards already in it.
+        prefix (str): The start of the shards' file names.
+        shard_bytes (int): The size after which a shard is closed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_bytes = shard_bytes
+        existing = [name for name in os.listdir(directory)
+                    if name.startswith(prefix + '-') and name.endswith('.bin')]
+        self.next_index = max((int(name[len(prefix) + 1:-len('.bin')]) for name in existing),
+                              default=-1) + 1
+        self.shard_file = None
+        self.shard_size = 0
+        self.paths = []  # completed shards
+        self.positions = 0
+
+    def write(self, records):
+        """
+        Write the records of one game to the current shard.
+
+        Parameters
+        ----------
+        records (bytes): Whole records, kept together in one shard.
+        """
+        assert (len(records) % RECORD_SIZE == 0)
+        if self.shard_file is not None and self.shard_size + len(records) > self.shard_bytes:
+            self.close()
+        if self.shard_file is None:
+            path = os.path.join(self.directory, f'{self.prefix}-{self.next_index:05d}.bin')
+            self.next_index += 1
+            self.shard_file = open(path + '.tmp', 'wb')
+            self.shard_size = 0
+        self.shard_file.write(records)
+        self.shard_size += len(records)
+        self.positions += len(records) // RECORD_SIZE
+
+    def close(self):
+        """Complete the current shard, if any. Writing again starts a new shard."""
+        if self.shard_file is None:
+            return
+        self.shard_file.close()
+        path = self.shard_file.name[:-len('.tmp')]
+        os.replace(self.shard_file.name, path)
+        self.paths.append(path)
+        self.shard_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_self_play(player_1, player_2, num_games, directory, shard_bytes=SHARD_BYTES,
+                    random_plies=0, workers=1, seed=0, progress=False):
+    """
+    Play self-play games and write their positions to shards. Memory use does not grow
+    with the number of games.
+
+    Parameters
+    ----------
+    player_1 (Player): The player who moves first.
+    player_2 (Player): The player who moves second.
+    num_games (int): The number of games to play.
+    directory (str): The directory of the shards.
+    shard_bytes (int): The size after which a shard is closed.
+    random_plies (int): The number of random moves at the start of each game.
+    workers (int): The number of processes to play the games on, or None to use every core.
+    seed (int): The seed from which the seed of every game is derived.
+    progress (bool): Whether to show a progress bar.
+
+    Returns
+    -------
+    tuple[list[str], int]: The paths of the shards written and the number of positions.
+    """
+    games = self_play(player_1, player_2, num_games, random_plies, workers, seed)
+    with ShardWriter(directory, shard_bytes=shard_bytes) as writer:
+        for records in tqdm(games, total=num_games, disable=not progress):
+            writer.write(records)
+    return writer.paths, writer.positions
+
+
+def read_shard(path):
+    """
+    Map a shard into memory.
+
+    Parameters
+    ----------
+    path (str): The path of the shard.
+
+    Returns
+    -------
+    np.ndarray: The records of the shard, as a read-only memory map of RECORD_DTYPE.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+
+def list_shards(directory, prefix='selfplay'):
+    """
+    List the complete shards of a directory.
+
+    Parameters
+    ----------
+    directory (str): The directory of the shards.
+    prefix (str): The start of the shards' file names, or None for shards of any prefix.
+
+    Returns
+    -------
+    list[str]: The paths of the shards, in order.
+    """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if (prefix is None or name.startswith(prefix + '-')) and name.endswith('.bin'))
+
+
+if __name__ == "__main__":
+    """
+    Play games between two strategies and write their positions to binary shards.
+
+    Parameters
+    ----------
+    num_games (int): The number of games to play.
+    directory (str): The directory of the shards.
+    --p1=<strategy>: The strategy of player 1 (default: max_stable).
+    --p2=<strategy>: The strategy of player 2 (default: max_stable).
+    --random-plies=<n>: The number of random moves at the start of each game (default: 8).
+    --shard-mb=<n>: The size of a shard, in megabytes (default: 64).
+    --workers=<n>: The number of processes to play the games on (default: every core).
+    --seed=<n>: The seed of the games (default: 0).
+    """
+    strategies = {strategy.name.lower(): strategy for strategy in Strategy
+                  if strategy != Strategy.HUMAN}
+    player_strategies = [Strategy.MAX_STABLE, Strategy.MAX_STABLE]
+    random_plies = 8
+    shard_bytes = SHARD_BYTES
+    workers = None
+    seed = 0
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith(('--p1=', '--p2=')) and arg[len('--p1='):] in strategies:
+            player_strategies[int(arg[3]) - 1] = strategies[arg[len('--p1='):]]
+        elif arg.startswith('--random-plies=') and arg[len('--random-plies='):].isnumeric():
+            random_plies = int(arg[len('--random-plies='):])
+        elif arg.startswith('--shard-mb=') and arg[len('--shard-mb='):].isnumeric():
+            shard_bytes = int(arg[len('--shard-mb='):]) << 20
+        elif arg.startswith('--workers=') and arg[len('--workers='):].isnumeric():
+            workers = int(arg[len('--workers='):])
+        elif arg.startswith('--seed=') and arg[len('--seed='):].isnumeric():
+            seed = int(arg[len('--seed='):])
+        else:
+            args.append(arg)
+    if len(args) != 2 or not args[0].isnumeric() or shard_bytes == 0:
+        print("Usage: python selfplay.py <num_games> <directory> [--p1=<strategy>] "
+              "[--p2=<strategy>] [--random-plies=<n>] [--shard-mb=<n>] [--workers=<n>] "
+              "[--seed=<n>]")
+        print(f"Strategies: {', '.join(strategies)}")
+        sys.exit(1)
+    paths, positions = write_self_play(
+        Player(player_strategies[0]), Player(player_strategies[1]), int(args[0]), args[1],
+        shard_bytes, random_plies, workers, seed, progress=True)
+    print(f"{positions} positions written to {len(paths)} shards in {args[1]}")
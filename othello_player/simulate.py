@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+
+import numpy as np
+
+import vectorized
+
+START_PLAYER_1 = 0x0000001008000000
+START_PLAYER_2 = 0x0000000810000000
+_BIT_INDICES = np.arange(64, dtype=np.uint64)
+
+
+def choose_random_moves(moves, rng):
+    """
+    Choose one legal move uniformly at random in every position.
+
+    Parameters
+    ----------
+    moves (np.ndarray): The masks of legal moves.
+    rng (np.random.Generator): The random number generator.
+
+    Returns
+    -------
+    np.ndarray: The square of the chosen move of each position (np.int64),
+        or -1 where there is no legal move.
+    """
+    legal = ((moves[:, None] >> _BIT_INDICES) & np.uint64(1)).astype(bool)
+    # the largest random key among the legal squares is a uniform choice
+    keys = np.where(legal, rng.random(legal.shape), -1.0)
+    squares = keys.argmax(axis=1)
+    return np.where(moves != 0, squares, -1)
+
+
+def simulate_random_games(num_games, seed=None, record_moves=False):
+    """
+    Play many games with random moves for both players, advancing all of them one move
+    per step with vectorized operations.
+
+    Parameters
+    ----------
+    num_games (int): The number of games to play.
+    seed (int): The seed of the random number generator.
+    record_moves (bool): If True, also return the moves played in every game.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]: The final scores of player 1 and player 2 in each game.
+        If record_moves is True, a third array of shape (num_games, num_steps) holds the
+        square of the move played at each step, or -1 where the player passed or the game
+        was over. Player 1 plays at even steps, player 2 at odd steps.
+    """
+    rng = np.random.default_rng(seed)
+    player_1 = np.full(num_games, START_PLAYER_1, dtype=np.uint64)
+    player_2 = np.full(num_games, START_PLAYER_2, dtype=np.uint64)
+    player_1_to_move = True
+    over = np.zeros(num_games, dtype=bool)
+    # number of consecutive passes, the game is over after two
+    passes = np.zeros(num_games, dtype=np.int64)
+    recorded = []
+    while not over.all():
+        player, opponent = (player_1, player_2) if player_1_to_move else (player_2, player_1)
+        moves = vectorized.get_moves(player, opponent)
+        moves[over] = 0
+        squares = choose_random_moves(moves, rng)
+        moved = squares >= 0
+        passes = np.where(moved, 0, passes + 1)
+        over |= passes >= 2
+        move_bits = np.where(moved, np.uint64(1) << squares.astype(np.uint64), np.uint64(0))
+        flips = vectorized.get_flips(player, opponent, move_bits)
+        player = player | flips | move_bits
+        opponent = opponent ^ flips
+        player_1, player_2 = (player, opponent) if player_1_to_move else (opponent, player)
+        player_1_to_move = not player_1_to_move
+        if record_moves:
+            recorded.append(squares)
+    scores = (vectorized.popcount(player_1), vectorized.popcount(player_2))
+    if record_moves:
+        return scores + (np.stack(recorded, axis=1),)
+    return scores
+
+
+if __name__ == "__main__":
+    """
+    Play random games and report the results and throughput.
+
+    Parameters
+    ----------
+    num_games (int): The number of games to play.
+    """
+    if len(sys.argv) != 2 or not sys.argv[1].isnumeric():
+        print("Usage: python simulate.py <num_games>")
+        sys.exit(1)
+    num_games = int(sys.argv[1])
+    start = time.perf_counter()
+    p1_scores, p2_scores = simulate_random_games(num_games)
+    elapsed = time.perf_counter() - start
+    print(f"Player one wins: {(p1_scores > p2_scores).sum()}, "
+          f"Player two wins: {(p1_scores < p2_scores).sum()}, "
+          f"Ties: {(p1_scores == p2_scores).sum()}")
+    print(f"{num_games / elapsed:.0f} games/s")
@@ -1,10 +1,49 @@
+import asyncio
+import gzip
+import json
+import os
+import pstats
+import random
+import signal
+import socket
+import struct
 import sys
+import tempfile
+import threading
+import time
 import unittest
 from io import StringIO
 from unittest.mock import patch
 
+import numpy as np
+
+import bitboard
+from arena import play_match
+from benchmark import build_corpus, compare, run_benchmarks
 from board import Board, GameResult
+from book import OpeningBook, canonicalize, write_book
+from endgame import EndgameSolver
+from fit import fit, get_batch_features, iter_batches, predict
+from ingest import GAME_OVER, ingest, parse_line
+from mcts import MCTS, playout
+from metrics import MoveMetrics, counters, percentile
+from multi_client import MovePool, play_seats
+from parallel import ParallelSearcher
+from patterns import (FEATURES, INSTANCES, PATTERNS, PatternEvaluator, get_features, get_indices,
+                      load_weights, save_weights, zero_weights)
+from perft import PERFT_COUNTS, divide, perft
 from player import Player, Strategy
+from position import Position
+from protocol import MessageReader, parse_message
+from selfplay import (RECORD_DTYPE, RECORD_SIZE, ShardWriter, list_shards, play_game_records,
+                      read_shard, write_self_play)
+from simulate import simulate_random_games
+from test_strategies import run_many_othello_parallel
+from search import GAME_OVER_WEIGHT, Searcher, SearchTimeout, evaluate
+import vectorized
+from timing import TimeManager, Watchdog
+from transposition import Bound, TranspositionTable
+from zobrist import hash_position
 
 
 class TestBoard(unittest.TestCase):
@@ -116,6 +155,50 @@ class TestBoard(unittest.TestCase):
         for move in test_board.get_valid_moves(2):
             self.assertIn(move, p2_moves)
 
+    def test_iter_valid_moves(self):
+        test_board = Board(TestEndgame.board)
+        for player_number in (1, 2):
+            self.assertEqual(list(test_board.iter_valid_moves(player_number)),
+                             test_board.get_valid_moves(player_number))
+        # both count the moves they generate
+        before = counters.moves_generated
+        moves = list(test_board.iter_valid_moves(1))
+        self.assertEqual(counters.moves_generated - before, len(moves))
+        # only the moves taken from the generator are counted
+        before = counters.moves_generated
+        next(test_board.iter_valid_moves(1))
+        self.assertEqual(counters.moves_generated - before, 1)
+
+    def test_has_any_move(self):
+        test_board = Board()
+        self.assertTrue(test_board.has_any_move(1))
+        # player 2 has no discs left after this move
+        board = [[0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 1, 2, 0, 0, 0], [
+            0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]]
+        test_board = Board(board)
+        test_board.make_move(3, 5, 1)
+        self.assertFalse(test_board.has_any_move(1))
+        self.assertFalse(test_board.has_any_move(2))
+        self.assertTrue(test_board.check_game_over())
+        # the memoized moves give the same answer
+        test_board.get_valid_moves(1)
+        self.assertFalse(test_board.has_any_move(1))
+
+    def test_position(self):
+        test_board = Board(TestEndgame.board)
+        position = test_board.position
+        self.assertEqual(Position.from_rows(TestEndgame.board), position)
+        self.assertEqual(position.rows, TestEndgame.board)
+        self.assertEqual(position.empties, 6)
+        self.assertEqual(Board(position).board_state, TestEndgame.board)
+        self.assertEqual(Board(position).hash, test_board.hash)
+        self.assertEqual(len({position, Position.from_rows(TestEndgame.board)}), 1)
+        # playing a move leaves the position unchanged
+        child = position.play(0, 1, 1)
+        test_board.make_move(0, 1, 1)
+        self.assertEqual(child, test_board.position)
+        self.assertEqual(position.rows, TestEndgame.board)
+
     def test_flip_pieces(self):
         test_board = Board()
         test_board.flip_pieces(2, 4, (1, 0), 1)
@@ -138,6 +221,34 @@ class TestBoard(unittest.TestCase):
                          0, 0, 0, 1, 1, 0, 0, 0], [0, 0, 1, 1, 1, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]])
         self.assertRaises(AssertionError, test_board.make_move, 2, 4, 1)
 
+    def test_unmake_move(self):
+        test_board = Board()
+        start = test_board.board_state
+        undo_1 = test_board.make_move(2, 4, 1)
+        self.assertEqual(test_board.score(1), 4)
+        self.assertEqual(test_board.score(2), 1)
+        after_first = test_board.board_state
+        undo_2 = test_board.make_move(2, 3, 2)
+        self.assertEqual(test_board.score(1), 3)
+        self.assertEqual(test_board.score(2), 3)
+        test_board.unmake_move(undo_2)
+        self.assertEqual(test_board.board_state, after_first)
+        test_board.unmake_move(undo_1)
+        self.assertEqual(test_board.board_state, start)
+        self.assertEqual(test_board.score(1), 2)
+        self.assertEqual(test_board.score(2), 2)
+
+    def test_hash(self):
+        test_board = Board()
+        start_hash = test_board.hash
+        undo = test_board.make_move(2, 4, 1)
+        self.assertNotEqual(test_board.hash, start_hash)
+        self.assertEqual(test_board.hash, hash_position(
+            test_board.bitboards[1], test_board.bitboards[2]))
+        self.assertEqual(test_board.hash, Board(test_board.board_state).hash)
+        test_board.unmake_move(undo)
+        self.assertEqual(test_board.hash, start_hash)
+
     def test_is_corner_piece(self):
         test_board = Board()
         self.assertTrue(test_board.is_corner_piece(0, 0))
@@ -164,6 +275,828 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(test_board.count_stable_discs(1), 7)
         self.assertEqual(test_board.count_stable_discs(2), 12)
 
+    def test_count_stable_discs_from_parent(self):
+        board = [[1, 1, 1, 1, 1, 2, 0, 0], [1, 1, 2, 2, 0, 0, 0, 0], [1, 0, 2, 1, 0, 0, 0, 0], [1, 0, 0, 2, 1, 0, 0, 0], [
+            0, 0, 0, 2, 1, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]]
+        test_board = Board(board)
+        parent_stable = test_board.get_stable_discs(1)
+        self.assertEqual(parent_stable.bit_count(), 9)
+        test_board.make_move(0, 6, 1)
+        self.assertEqual(test_board.count_stable_discs(1, parent_stable),
+                         test_board.count_stable_discs(1))
+        self.assertEqual(test_board.count_stable_discs(1), 11)
+
+
+class TestBitboard(unittest.TestCase):
+    def test_rows_round_trip(self):
+        board = [[1, 2, 1, 1, 1, 1, 2, 1], [2, 1, 1, 2, 2, 2, 2, 1], [1, 1, 2, 2, 1, 2, 1, 1], [2, 2, 2, 1, 1, 2, 1, 1], [
+            2, 1, 1, 1, 2, 2, 1, 2], [2, 1, 2, 2, 2, 1, 1, 1], [2, 2, 2, 2, 1, 2, 2, 1], [0, 0, 0, 0, 2, 2, 2, 2]]
+        player_1, player_2 = bitboard.from_rows(board)
+        self.assertEqual(player_1 & player_2, 0)
+        self.assertEqual(bitboard.to_rows(player_1, player_2), board)
+
+    def test_get_moves(self):
+        player_1, player_2 = bitboard.from_rows(Board().board_state)
+        moves = bitboard.get_moves(player_1, player_2)
+        self.assertEqual([[sq >> 3, sq & 7] for sq in bitboard.iter_bits(moves)],
+                         [[2, 4], [3, 5], [4, 2], [5, 3]])
+        # moves never wrap around the edge of the board
+        player = 1 << bitboard.square(0, 7)
+        opponent = 1 << bitboard.square(1, 0)
+        self.assertEqual(bitboard.get_moves(player, opponent), 0)
+
+    def test_get_flips(self):
+        player_1, player_2 = bitboard.from_rows(Board().board_state)
+        flips = bitboard.get_flips(player_1, player_2, 1 << bitboard.square(2, 4))
+        self.assertEqual(flips, 1 << bitboard.square(3, 4))
+        self.assertEqual(bitboard.get_flips(
+            player_1, player_2, 1 << bitboard.square(0, 0)), 0)
+
+
+class TestVectorized(unittest.TestCase):
+    def test_matches_bitboard(self):
+        boards = [Board().board_state,
+                  [[1, 2, 1, 1, 1, 1, 2, 1], [2, 1, 1, 2, 2, 2, 2, 1], [1, 1, 2, 2, 1, 2, 1, 1], [2, 2, 2, 1, 1, 2, 1, 1], [
+                      2, 1, 1, 1, 2, 2, 1, 2], [2, 1, 2, 2, 2, 1, 1, 1], [2, 2, 2, 2, 1, 2, 2, 1], [0, 0, 0, 1, 2, 2, 2, 2]],
+                  [[1, 1, 1, 1, 1, 2, 0, 0], [1, 1, 2, 2, 0, 0, 0, 0], [1, 0, 2, 1, 0, 0, 0, 0], [1, 0, 0, 2, 1, 0, 0, 0], [
+                      0, 0, 0, 2, 1, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]]]
+        masks = [bitboard.from_rows(board) for board in boards]
+        players = vectorized.to_array(player for player, _ in masks)
+        opponents = vectorized.to_array(opponent for _, opponent in masks)
+        features = vectorized.evaluate(players, opponents)
+        for i, (player, opponent) in enumerate(masks):
+            self.assertEqual(features['discs'][i], player.bit_count())
+            self.assertEqual(features['stable'][i], bitboard.get_stable(player).bit_count())
+            self.assertEqual(features['mobility'][i],
+                             bitboard.get_moves(player, opponent).bit_count())
+            self.assertEqual(features['opponent_mobility'][i],
+                             bitboard.get_moves(opponent, player).bit_count())
+        self.assertEqual(list(features['frontier']), [2, 1, 9])
+
+    def test_get_children(self):
+        test_board = Board()
+        moves, players, opponents = vectorized.get_children(test_board, 1)
+        self.assertEqual(moves, test_board.get_valid_moves(1))
+        for move, player, opponent in zip(moves, players, opponents):
+            child = Board()
+            child.make_move(move[0], move[1], 1)
+            self.assertEqual((int(player), int(opponent)), (child.bitboards[1], child.bitboards[2]))
+
+
+class TestSimulate(unittest.TestCase):
+    def test_simulate_random_games(self):
+        p1_scores, p2_scores, moves = simulate_random_games(20, seed=0, record_moves=True)
+        # replaying the recorded moves on a Board gives the same result
+        for game in range(20):
+            test_board = Board()
+            for step, square in enumerate(moves[game].tolist()):
+                player_number = 1 if step % 2 == 0 else 2
+                if square < 0:
+                    self.assertEqual(test_board.get_valid_moves(player_number), [])
+                else:
+                    test_board.make_move(square >> 3, square & 7, player_number)
+            self.assertTrue(test_board.check_game_over())
+            self.assertEqual(test_board.score(1), p1_scores[game])
+            self.assertEqual(test_board.score(2), p2_scores[game])
+
+
+class TestSearch(unittest.TestCase):
+    def test_evaluate_is_symmetric(self):
+        board = [[1, 2, 2, 1, 2, 1, 1, 2], [1, 2, 2, 1, 2, 1, 2, 2], [1, 2, 1, 1, 2, 2, 1, 1], [1, 1, 2, 2, 2, 1, 1, 1], [
+            1, 2, 2, 2, 1, 2, 1, 1], [2, 2, 2, 2, 1, 1, 1, 2], [2, 2, 2, 1, 2, 1, 1, 1], [2, 2, 2, 2, 2, 1, 2, 0]]
+        test_board = Board(board)
+        self.assertEqual(evaluate(test_board, 1), -evaluate(test_board, 2))
+
+    def test_search_reports_depth_and_nodes(self):
+        result = Searcher(max_depth=3).search(Board().board_state, 1)
+        self.assertIn(result.move, Board().get_valid_moves(1))
+        self.assertEqual(result.depth, 3)
+        self.assertGreater(result.nodes, 0)
+
+    def test_search_scores_game_over(self):
+        # the last empty square ends the game 22 to 42
+        board = [[0, 2, 2, 2, 2, 2, 2, 1], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [
+            2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [1, 2, 2, 2, 2, 2, 2, 1]]
+        result = Searcher(max_depth=5).search(board, 1)
+        self.assertEqual(result.move, [0, 0])
+        self.assertEqual(result.score, -20 * GAME_OVER_WEIGHT)
+        self.assertEqual(result.depth, 1)
+
+
+class TestParallel(unittest.TestCase):
+    def test_search(self):
+        searcher = ParallelSearcher(workers=2, max_depth=3, time_limit=5, tt_size_mb=1)
+        try:
+            result = searcher.search(Board().board_state, 1)
+            self.assertIn(result.move, Board().get_valid_moves(1))
+            self.assertEqual(result.depth, 3)
+            # the second search reuses the workers and the shared table
+            result = searcher.search(TestEndgame.board, 1)
+            self.assertEqual(result.move, [0, 1])
+        finally:
+            searcher.close()
+        self.assertIsNone(searcher.shm)
+
+    def test_stop(self):
+        searcher = ParallelSearcher(workers=2, max_depth=60, time_limit=30, tt_size_mb=1)
+        try:
+            # a first search starts the workers
+            searcher.search(Board().board_state, 1, time_limit=0.2)
+            timer = threading.Timer(0.2, lambda: setattr(searcher, 'stopped', True))
+            timer.start()
+            start = time.perf_counter()
+            result = searcher.search(Board().board_state, 1)
+            self.assertLess(time.perf_counter() - start, 10)
+            self.assertGreater(result.depth, 0)
+            self.assertEqual(searcher.best_move, result.move)
+            searcher.stopped = False
+            self.assertFalse(searcher.stop_event.is_set())
+        finally:
+            searcher.close()
+
+    def test_deadline(self):
+        searcher = ParallelSearcher(workers=2, max_depth=60, time_limit=30, tt_size_mb=1)
+        try:
+            searcher.search(Board().board_state, 1, time_limit=0.2)
+            start = time.perf_counter()
+            # no worker can report in time, so the search does not wait for them
+            result = searcher.search(Board().board_state, 1, time_limit=0.0)
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertEqual(result.depth, 0)
+            self.assertIn(result.move, Board().get_valid_moves(1))
+            self.assertIsNone(searcher.best_move)
+            # the late results of that search are not taken for the next one's
+            result = searcher.search(TestEndgame.board, 1, time_limit=1.0)
+            self.assertEqual(result.move, [0, 1])
+        finally:
+            searcher.close()
+
+    def test_player_turn_time(self):
+        test_player = Player(Strategy.ALPHA_BETA, search_workers=2, tt_size_mb=1)
+        try:
+            test_player.max_turn_time = 2.0
+            start = time.perf_counter()
+            move = test_player.get_move(Board().board_state, 1)
+            self.assertLess(time.perf_counter() - start, 2.0)
+            self.assertIn(move, Board().get_valid_moves(1))
+            # the watchdog's fallback and stop work on the parallel searcher
+            test_player.stop_search()
+            self.assertTrue(test_player.searcher.stop_event.is_set())
+            self.assertEqual(test_player.best_move_so_far(Board(), 1), test_player.searcher.best_move)
+            test_player.wait_for_selection()
+            self.assertFalse(test_player.searcher.stop_event.is_set())
+        finally:
+            test_player.searcher.close()
+
+
+class TestEndgame(unittest.TestCase):
+    board = [[2, 0, 2, 2, 2, 2, 2, 1], [1, 2, 1, 1, 1, 2, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1], [2, 0, 1, 2, 1, 1, 1, 1], [
+        2, 2, 2, 1, 2, 2, 1, 2], [2, 2, 2, 2, 1, 2, 2, 2], [0, 0, 0, 2, 2, 2, 1, 2], [0, 2, 2, 2, 2, 2, 1, 2]]
+
+    def test_solve(self):
+        result = EndgameSolver().solve(self.board, 1)
+        self.assertEqual(result.move, [0, 1])
+        self.assertEqual(result.score, 40)
+        self.assertEqual(result.depth, 6)
+        result = EndgameSolver().solve(self.board, 2)
+        self.assertEqual(result.move, [0, 1])
+        self.assertEqual(result.score, -14)
+
+    def test_solve_with_pass(self):
+        # after player 1 takes the corner, player 2 has no move and player 1 plays again
+        board = [[0, 2, 2, 2, 2, 2, 1, 0], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [
+            2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [2, 2, 2, 2, 2, 2, 2, 2], [1, 2, 2, 2, 2, 2, 2, 1]]
+        result = EndgameSolver().solve(board, 1)
+        test_board = Board(board)
+        test_board.make_move(result.move[0], result.move[1], 1)
+        self.assertEqual(test_board.get_valid_moves(2), [])
+        self.assertEqual(result.move, [0, 0])
+        self.assertEqual(result.score, 4)
+
+    def test_solve_timeout(self):
+        self.assertRaises(SearchTimeout, EndgameSolver(0).solve, Board().board_state, 1)
+
+
+class TestBook(unittest.TestCase):
+    def test_canonicalize(self):
+        test_board = Board()
+        test_board.make_move(2, 4, 1)
+        player, opponent = test_board.bitboards[2], test_board.bitboards[1]
+        canonical = canonicalize(player, opponent)[:2]
+        for symmetry in range(8):
+            self.assertEqual(canonicalize(bitboard.transform(player, symmetry),
+                                          bitboard.transform(opponent, symmetry))[:2], canonical)
+
+    def test_lookup(self):
+        test_board = Board()
+        test_board.make_move(2, 4, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            write_book(path, [(test_board.bitboards[2], test_board.bitboards[1],
+                               bitboard.square(2, 5), 0)])
+            book = OpeningBook(path)
+            self.assertEqual(book.lookup(test_board, 2), [2, 5])
+            self.assertIsNone(book.lookup(test_board, 1))
+            # the symmetric opening is answered with the symmetric reply
+            test_board = Board()
+            test_board.make_move(5, 3, 1)
+            self.assertEqual(book.lookup(test_board, 2), [5, 2])
+            book.close()
+
+
+class TestMCTS(unittest.TestCase):
+    def test_playout(self):
+        player, opponent = bitboard.from_rows(TestEndgame.board)
+        self.assertIn(playout(player, opponent), [0.0, 0.5, 1.0])
+        # a finished game is scored without playing
+        self.assertEqual(playout(bitboard.FULL, 0), 1.0)
+
+    def test_search(self):
+        search = MCTS(0.2)
+        result = search.search(Board().board_state, 1)
+        self.assertIn(result.move, Board().get_valid_moves(1))
+        self.assertEqual(sum(result.visits.values()), result.nodes)
+        self.assertEqual(max(result.visits.values()), result.visits[tuple(result.move)])
+        # the subtree of the position after the reply is reused
+        test_board = Board()
+        test_board.make_move(result.move[0], result.move[1], 1)
+        reply = test_board.get_valid_moves(2)[0]
+        test_board.make_move(reply[0], reply[1], 2)
+        previous = search.root.children
+        result = search.search(test_board.board_state, 1, 0.05)
+        self.assertIn(search.root, [grandchild for child in previous for grandchild in child.children])
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_store_and_probe(self):
+        table = TranspositionTable(size_mb=1)
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, 4, Bound.LOWER, -250, 27)
+        self.assertEqual(table.probe(12345), (4, Bound.LOWER, -250, 27))
+        table.store(12345, 5, Bound.EXACT, 3)
+        self.assertEqual(table.probe(12345), (5, Bound.EXACT, 3, None))
+        self.assertEqual(table.hits, 2)
+        self.assertEqual(table.misses, 1)
+        self.assertEqual(table.overwrites, 0)
+
+    def test_replacement(self):
+        table = TranspositionTable(size_mb=0)
+        self.assertEqual(table.stats()['entries'], 2)
+        table.store(1, 8, Bound.EXACT, 10)
+        # a shallower result goes to the always-replace slot
+        table.store(2, 2, Bound.EXACT, 20)
+        table.store(3, 3, Bound.EXACT, 30)
+        self.assertEqual(table.probe(1), (8, Bound.EXACT, 10, None))
+        self.assertIsNone(table.probe(2))
+        self.assertEqual(table.probe(3), (3, Bound.EXACT, 30, None))
+        self.assertEqual(table.overwrites, 1)
+        # results of an earlier search are replaced regardless of depth
+        table.new_search()
+        table.store(4, 1, Bound.EXACT, 40)
+        self.assertIsNone(table.probe(1))
+        self.assertEqual(table.probe(4), (1, Bound.EXACT, 40, None))
+        table.clear()
+        self.assertIsNone(table.probe(4))
+
+
+class TestProtocol(unittest.TestCase):
+    @staticmethod
+    def message(board_state, player_number):
+        return json.dumps({'board': board_state, 'maxTurnTime': 5000, 'player': player_number}).encode()
+
+    def test_parse_message(self):
+        message = parse_message(self.message(TestEndgame.board, 2))
+        self.assertEqual(message.board_state, TestEndgame.board)
+        self.assertEqual((message.player_1, message.player_2), bitboard.from_rows(TestEndgame.board))
+        self.assertEqual(message.player_number, 2)
+        self.assertEqual(message.max_turn_time, 5.0)
+        with self.assertRaises(ValueError):
+            parse_message(b'{"player": 1}')
+        with self.assertRaises(ValueError):
+            parse_message(b'{"board":[[0,0],[1]],"maxTurnTime":5000,"player":1}')
+
+    def test_read_split_and_merged_messages(self):
+        first = self.message(Board().board_state, 1)
+        second = self.message(TestEndgame.board, 2)
+        server, client = socket.socketpair()
+        with server, client:
+            reader = MessageReader(client, recv_size=16)
+            # the first message arrives in two parts, the second right after it
+            server.sendall(first[:10])
+            server.sendall(first[10:] + b'\n' + second)
+            self.assertEqual(reader.read_message().board_state, Board().board_state)
+            self.assertEqual(reader.read_message().board_state, TestEndgame.board)
+            server.close()
+            self.assertIsNone(reader.read_message())
+
+
+class TestMultiClient(unittest.TestCase):
+    async def serve_and_play(self, pool):
+        moves = []
+
+        async def serve(reader, writer):
+            # two turns of player 1 from the start position, then the game ends
+            for _ in range(2):
+                writer.write(TestProtocol.message(Board().board_state, 1))
+                moves.append(json.loads(await reader.readline()))
+            writer.close()
+
+        servers = [await asyncio.start_server(serve, '127.0.0.1', 0) for _ in range(2)]
+        seats = [('127.0.0.1', server.sockets[0].getsockname()[1]) for server in servers]
+        turn_times = await play_seats(seats, pool, num_games=2)
+        for server in servers:
+            server.close()
+        return moves, turn_times
+
+    def test_play_seats(self):
+        with MovePool(Player(Strategy.GREEDY), workers=1) as pool:
+            moves, turn_times = asyncio.run(self.serve_and_play(pool))
+        # two seats, two games each, two turns per game
+        self.assertEqual(len(moves), 8)
+        for move in moves:
+            self.assertIn(move, Board().get_valid_moves(1))
+        self.assertEqual([len(seat_times) for seat_times in turn_times], [4, 4])
+
+    async def serve_and_break(self, pool):
+        connections = []
+
+        async def serve_broken(reader, writer):
+            # after one turn, the first game is reset, the second sends a board that is cut
+            # short and the third a garbled message
+            connections.append(writer)
+            writer.write(TestProtocol.message(Board().board_state, 1))
+            await reader.readline()
+            if len(connections) == 1:
+                writer.get_extra_info('socket').setsockopt(
+                    socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            elif len(connections) == 2:
+                writer.write(b'{"board":[[0,0],[1]],"maxTurnTime":5000,"player":1}')
+            else:
+                writer.write(b'{"board": }')
+            writer.close()
+
+        async def serve(reader, writer):
+            writer.write(TestProtocol.message(Board().board_state, 1))
+            await reader.readline()
+            writer.close()
+
+        servers = [await asyncio.start_server(serve_broken, '127.0.0.1', 0),
+                   await asyncio.start_server(serve, '127.0.0.1', 0)]
+        seats = [('127.0.0.1', server.sockets[0].getsockname()[1]) for server in servers]
+        turn_times = await play_seats(seats, pool, num_games=3)
+        for server in servers:
+            server.close()
+        return turn_times
+
+    @patch('multi_client.RETRY_DELAY', 0.0)
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_play_seats_survives_broken_games(self, stdout):
+        with MovePool(Player(Strategy.GREEDY), workers=1) as pool:
+            turn_times = asyncio.run(self.serve_and_break(pool))
+        # the broken games are counted, and the other seat plays on
+        self.assertEqual([len(seat_times) for seat_times in turn_times], [3, 3])
+        self.assertIn('ConnectionResetError', stdout.getvalue())
+        self.assertIn('Board of 3 squares', stdout.getvalue())
+        self.assertIn('Missing field', stdout.getvalue())
+
+    async def serve_and_kill_worker(self, pool):
+        connections = []
+
+        async def serve(reader, writer):
+            connections.append(writer)
+            if len(connections) == 1:
+                # the worker dies before the first move is computed
+                pid = await asyncio.wrap_future(pool.executor.submit(os.getpid))
+                os.kill(pid, signal.SIGKILL)
+            writer.write(TestProtocol.message(Board().board_state, 1))
+            await reader.readline()
+            writer.close()
+
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        turn_times = await play_seats([('127.0.0.1', server.sockets[0].getsockname()[1])],
+                                      pool, num_games=2)
+        server.close()
+        return turn_times
+
+    @patch('multi_client.RETRY_DELAY', 0.0)
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_play_seats_restarts_dead_workers(self, stdout):
+        with MovePool(Player(Strategy.GREEDY), workers=1) as pool:
+            turn_times = asyncio.run(self.serve_and_kill_worker(pool))
+            self.assertEqual(pool.restarts, 1)
+        # the game of the dead worker is counted, and the next one is played
+        self.assertEqual([len(seat_times) for seat_times in turn_times], [1])
+        self.assertIn('BrokenProcessPool', stdout.getvalue())
+
+
+class TestMetrics(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile(values, 1.0), 100)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_measure(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = os.path.join(directory, 'moves.jsonl')
+            prometheus_path = os.path.join(directory, 'moves.prom')
+            metrics = MoveMetrics(jsonl_path, prometheus_path, os.path.join(directory, 'profiles'))
+            test_player = Player(Strategy.ALPHA_BETA, search_depth=2, metrics=metrics)
+            test_player.max_turn_time = 5.0
+            # the server's message was received a second before the selection started
+            test_player.turn_start = time.perf_counter() - 1.0
+            move = test_player.get_move(Board().board_state, 1)
+            test_player.turn_start = None
+            test_player.get_move(Board().board_state, 1)
+            with open(jsonl_path) as jsonl_file:
+                records = [json.loads(line) for line in jsonl_file]
+            with open(prometheus_path) as prometheus_file:
+                prometheus = prometheus_file.read()
+            self.assertTrue(os.path.exists(records[0]['profile']))
+            # the search runs on the watchdog's thread, which must be profiled too
+            profiled = {name for _, _, name in pstats.Stats(records[0]['profile']).stats}
+        self.assertIn('search', profiled)
+        self.assertIn('negamax', profiled)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['move'], move)
+        self.assertEqual(records[0]['depth'], 2)
+        self.assertGreater(records[0]['moves_made'], 0)
+        self.assertGreater(records[0]['stability_evals'], 0)
+        self.assertLessEqual(records[0]['deadline_margin'], 4.0 - records[0]['wall_time'])
+        self.assertGreater(records[0]['deadline_margin'], 3.0)
+        self.assertAlmostEqual(records[1]['deadline_margin'], 5.0 - records[1]['wall_time'])
+        # the second search finds the first one's results in the transposition table
+        self.assertGreater(records[1]['tt_hits'], 0)
+        self.assertEqual(metrics.summary()['moves'], 2)
+        self.assertIn('othello_move_seconds_count 2\n', prometheus)
+        self.assertIn('othello_deadline_misses_total 0\n', prometheus)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_build_corpus_is_fixed(self):
+        corpus = build_corpus(num_games=2)
+        self.assertEqual(corpus, build_corpus(num_games=2))
+        for board_state, player_number in corpus['endgame']:
+            self.assertEqual(sum(row.count(0) for row in board_state), 12)
+            self.assertTrue(Board(board_state).get_valid_moves(player_number))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(build_corpus(num_games=1), repeat=1, min_time=0,
+                                 names=['get_valid_moves', 'greedy_select'])
+        self.assertEqual(sorted(results), ['get_valid_moves/endgame', 'get_valid_moves/midgame',
+                                           'get_valid_moves/opening', 'greedy_select/endgame',
+                                           'greedy_select/midgame', 'greedy_select/opening'])
+
+    def test_compare(self):
+        baseline = {'a/opening': 1.0, 'b/opening': 1.0}
+        results = {'a/opening': 1.1, 'b/opening': 1.3, 'c/opening': 5.0}
+        self.assertEqual(compare(results, baseline, 0.2), [('b/opening', 1.0, 1.3)])
+        self.assertEqual(compare(results, baseline, 0.5), [])
+
+
+class TestPerft(unittest.TestCase):
+    def test_perft(self):
+        for depth in range(7):
+            self.assertEqual(perft(Board(), 1, depth), PERFT_COUNTS[depth])
+        self.assertEqual(perft(Board(), 1, 6, cache={}), PERFT_COUNTS[6])
+
+    def test_perft_restores_board(self):
+        test_board = Board(TestEndgame.board)
+        perft(test_board, 1, 4)
+        self.assertEqual(test_board.board_state, TestEndgame.board)
+
+    def test_divide(self):
+        counts = divide(Board().board_state, 1, 5)
+        self.assertEqual([move for move, _ in counts], Board().get_valid_moves(1))
+        self.assertEqual(sum(count for _, count in counts), PERFT_COUNTS[5])
+        self.assertEqual(divide(Board().board_state, 1, 5, workers=2, use_cache=True), counts)
+
+
+class TestPatterns(unittest.TestCase):
+    @staticmethod
+    def random_weights():
+        rng = np.random.default_rng(0)
+        return {name: rng.standard_normal(len(table)).astype(np.float32)
+                for name, table in zero_weights().items()}
+
+    def test_get_indices(self):
+        indices = get_indices(np.array([0, 1], dtype=np.uint64), np.array([0, 1 << 63], dtype=np.uint64))
+        self.assertEqual(indices.shape, (2, len(INSTANCES)))
+        self.assertFalse(indices[0].any())
+        # the top left corner is the first square of the edge and of the top left 3x3 corner
+        self.assertEqual(indices[1, 0], 1)
+        self.assertEqual(indices[1, [pattern for pattern, _ in INSTANCES].index(1)], 1)
+
+    def test_incremental_updates(self):
+        evaluator = PatternEvaluator(self.random_weights())
+        test_board = Board()
+        test_board.attach_patterns(evaluator)
+        rng = np.random.default_rng(1)
+        player_number = 1
+        undos = []
+        while not test_board.check_game_over():
+            moves = test_board.get_valid_moves(player_number)
+            if moves:
+                move = moves[rng.integers(len(moves))]
+                undos.append(test_board.make_move(move[0], move[1], player_number))
+                expected = PatternEvaluator(self.random_weights())
+                expected.reset(test_board.bitboards[1], test_board.bitboards[2])
+                self.assertEqual(evaluator.indices, expected.indices)
+            player_number = 3 - player_number
+        for undo in reversed(undos):
+            test_board.unmake_move(undo)
+        expected.reset(test_board.bitboards[1], test_board.bitboards[2])
+        self.assertEqual(evaluator.indices, expected.indices)
+
+    def test_get_features(self):
+        test_board = Board(TestEndgame.board)
+        features = get_features(np.array([test_board.bitboards[1]], dtype=np.uint64),
+                                np.array([test_board.bitboards[2]], dtype=np.uint64))
+        self.assertEqual(features.shape, (1, len(FEATURES)))
+        self.assertEqual(features[0].tolist(), [
+            test_board.score(1) - test_board.score(2),
+            test_board.count_stable_discs(1) - test_board.count_stable_discs(2),
+            len(test_board.get_valid_moves(1)) - len(test_board.get_valid_moves(2))])
+
+    def test_score_is_symmetric(self):
+        evaluator = PatternEvaluator(self.random_weights())
+        Board(TestEndgame.board).attach_patterns(evaluator)
+        self.assertNotEqual(evaluator.score(1), 0)
+        self.assertEqual(evaluator.score(1), -evaluator.score(2))
+
+    def test_save_and_load(self):
+        weights = self.random_weights()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'patterns.npz')
+            save_weights(path, weights)
+            loaded = load_weights(path)
+        self.assertEqual(list(loaded), [name for name, _ in PATTERNS] + ['features'])
+        for name in weights:
+            np.testing.assert_array_equal(loaded[name], weights[name])
+
+    def test_evaluate_stays_below_game_over(self):
+        weights = {name: np.full(len(table), 1e6, dtype=np.float32)
+                   for name, table in zero_weights().items()}
+        test_board = Board(TestEndgame.board)
+        test_board.attach_patterns(PatternEvaluator(weights))
+        for player_number in (1, 2):
+            self.assertLess(abs(evaluate(test_board, player_number)), GAME_OVER_WEIGHT)
+        # an extreme heuristic does not end iterative deepening as if the game were decided
+        result = Searcher(max_depth=2, patterns=weights).search(Board().board_state, 1)
+        self.assertEqual(result.depth, 2)
+
+    def test_search_with_patterns(self):
+        searcher = Searcher(max_depth=3, patterns=self.random_weights())
+        result = searcher.search(Board().board_state, 1)
+        self.assertIn(result.move, Board().get_valid_moves(1))
+        self.assertEqual(result.depth, 3)
+
+
+class TestSelfPlay(unittest.TestCase):
+    def test_play_game_records(self):
+        records = np.frombuffer(play_game_records(Player(Strategy.GREEDY), Player(Strategy.RANDOM)),
+                                dtype=RECORD_DTYPE)
+        self.assertEqual(records['ply'].tolist(), list(range(len(records))))
+        self.assertEqual(len(set(records['result'].tolist())), 1)
+        test_board = Board()
+        for record in records:
+            self.assertEqual((test_board.bitboards[1], test_board.bitboards[2]),
+                             (int(record['player_1']), int(record['player_2'])))
+            test_board.make_move(int(record['move']) // 8, int(record['move']) % 8, int(record['player']))
+        self.assertTrue(test_board.check_game_over())
+        self.assertEqual(test_board.score(1) - test_board.score(2), records['result'][0])
+
+    def test_write_self_play_rotates_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths, positions = write_self_play(Player(Strategy.MAX_STABLE), Player(Strategy.MAX_STABLE),
+                                               6, directory, shard_bytes=100 * RECORD_SIZE,
+                                               random_plies=4, workers=2)
+            self.assertEqual(list_shards(directory), paths)
+            self.assertGreater(len(paths), 1)
+            shards = [read_shard(path) for path in paths]
+            self.assertEqual(sum(len(shard) for shard in shards), positions)
+            for shard in shards:
+                self.assertLessEqual(len(shard), 100)
+                # every shard starts with the first position of a game
+                self.assertEqual(shard['ply'][0], 0)
+            # numbering continues after the existing shards
+            with ShardWriter(directory, shard_bytes=100 * RECORD_SIZE) as writer:
+                writer.write(bytes(RECORD_SIZE))
+            self.assertEqual(writer.paths, [os.path.join(directory, f'selfplay-{len(paths):05d}.bin')])
+
+    def test_self_play_is_reproducible(self):
+        players = (Player(Strategy.RANDOM), Player(Strategy.RANDOM))
+        with tempfile.TemporaryDirectory() as directory:
+            paths, _ = write_self_play(*players, 3, os.path.join(directory, 'a'), seed=5)
+            write_self_play(*players, 3, os.path.join(directory, 'b'), seed=5)
+            self.assertEqual(read_shard(paths[0]).tobytes(),
+                             read_shard(os.path.join(directory, 'b', 'selfplay-00000.bin')).tobytes())
+
+
+class TestFit(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.paths, cls.positions = write_self_play(
+            Player(Strategy.RANDOM), Player(Strategy.RANDOM), 40, cls.directory.name,
+            shard_bytes=500 * RECORD_SIZE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_iter_batches(self):
+        batches = list(iter_batches(self.paths, 64, random.Random(0)))
+        self.assertTrue(all(len(batch) <= 64 for batch in batches))
+        self.assertEqual(sum(len(batch) for batch in batches), self.positions)
+
+    def test_fit(self):
+        weights, errors = fit(self.paths, epochs=3, batch_size=256)
+        self.assertEqual(len(errors), 3)
+        self.assertLess(errors[-1], errors[0])
+        # the evaluator scores positions as the fitter predicts them
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'patterns.npz')
+            save_weights(path, weights)
+            evaluator = PatternEvaluator(load_weights(path))
+        records = read_shard(self.paths[0])[:10]
+        indices, features = get_batch_features(records)
+        table = np.concatenate([weights[name] for name, _ in PATTERNS])
+        predictions = predict(table, weights['features'], indices, features)
+        for record, feature, prediction in zip(records, features, predictions):
+            evaluator.reset(int(record['player_1']), int(record['player_2']))
+            self.assertAlmostEqual(evaluator.score(1, tuple(feature)), prediction, places=3)
+            self.assertAlmostEqual(evaluator.score(2, tuple(-feature)), -prediction, places=3)
+
+
+class TestTiming(unittest.TestCase):
+    def test_budgets(self):
+        time_manager = TimeManager()
+        hard_limit = time_manager.get_hard_limit(5.0)
+        self.assertLess(hard_limit, 5.0)
+        budgets = [time_manager.get_budget(5.0, empties) for empties in (58, 45, 20)]
+        self.assertEqual(budgets, sorted(budgets))
+        self.assertLess(budgets[-1], hard_limit)
+        # the margin never takes more than half of a short turn
+        self.assertEqual(time_manager.get_hard_limit(0.02), 0.01)
+        self.assertEqual(time_manager.get_budget(0.02, 20), 0.0)
+
+    def test_statistics(self):
+        time_manager = TimeManager()
+        budget, _ = time_manager.start_move(1.0, 30)
+        time_manager.finish_move(budget / 2)
+        time_manager.start_move(1.0, 30)
+        time_manager.finish_move(1.25, late=True)
+        summary = time_manager.summary()
+        self.assertEqual(summary['moves'], 2)
+        self.assertEqual(summary['used_p99'], 1.25)
+        self.assertEqual(summary['budget_overruns'], 1)
+        self.assertEqual(summary['deadline_overruns'], 1)
+        self.assertAlmostEqual(summary['worst_overrun'], 0.25)
+        self.assertEqual(summary['watchdog_moves'], 1)
+
+    def test_watchdog(self):
+        watchdog = Watchdog()
+        self.assertEqual(watchdog.run(lambda: [2, 3], time.perf_counter() + 1, None, None), [2, 3])
+        self.assertFalse(watchdog.fired)
+        stop = []
+
+        def slow_select():
+            while not stop:
+                time.sleep(0.001)
+            return [2, 3]
+
+        start = time.perf_counter()
+        move = watchdog.run(slow_select, start + 0.05, lambda: stop.append(True), lambda: [4, 5])
+        self.assertEqual(move, [4, 5])
+        self.assertTrue(watchdog.fired)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        watchdog.wait()
+        self.assertIsNone(watchdog.thread)
+        with self.assertRaises(ValueError):
+            watchdog.run(lambda: int('x'), time.perf_counter() + 1, None, None)
+
+    def test_search_uses_budget(self):
+        test_player = Player(Strategy.ALPHA_BETA, search_time=60)
+        test_player.max_turn_time = 0.5
+        start = time.perf_counter()
+        move = test_player.get_move(Board().board_state, 1)
+        self.assertIn(move, Board().get_valid_moves(1))
+        self.assertLess(time.perf_counter() - start, test_player.time_manager.hard_limit)
+        # the search runs until its budget
+        self.assertGreater(test_player.last_search.elapsed, 0.8 * test_player.time_manager.budget)
+        self.assertFalse(test_player.watchdog.fired)
+
+    def test_watchdog_delivers_a_move(self):
+        test_player = Player(Strategy.MAX_STABLE)
+        test_player.max_turn_time = 0.2
+
+        def slow_select(board_state, player_number):
+            time.sleep(0.5)
+            return [0, 0]
+
+        start = time.perf_counter()
+        with patch.object(test_player, 'strategy_select', slow_select):
+            move = test_player.get_move(Board().board_state, 1)
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertTrue(test_player.watchdog.fired)
+        self.assertIn(move, Board().get_valid_moves(1))
+        test_player.wait_for_selection()
+
+
+class TestIngest(unittest.TestCase):
+    @staticmethod
+    def log_lines(records):
+        """Write the log lines of the server for the records of a game."""
+        lines = []
+        for record in np.frombuffer(records, dtype=RECORD_DTYPE):
+            name = 'one' if record['player'] == 1 else 'two'
+            lines.append(f"INFO  othello.server.text-ui: Player {name} played "
+                         f"({record['move'] // 8},{record['move'] % 8})\n")
+        lines.append("INFO  othello.server.text-ui: Game over...\n")
+        return lines
+
+    def test_parse_line(self):
+        self.assertEqual(parse_line("INFO  othello.server.text-ui: Player two played (3,4)\n"),
+                         (2, [3, 4]))
+        self.assertEqual(parse_line("INFO  othello.server.text-ui: Player one played [5, 6]\r\n"),
+                         (1, [5, 6]))
+        self.assertEqual(parse_line("INFO  othello.server.text-ui: Game over...\n"), GAME_OVER)
+        self.assertIsNone(parse_line("Player one played (3,4)\n"))
+        self.assertIsNone(parse_line("INFO  othello.server.text-ui: Listening on port 1337\n"))
+
+    def test_ingest(self):
+        np.random.seed(0)
+        games = [play_game_records(Player(Strategy.RANDOM), Player(Strategy.RANDOM)) for _ in range(4)]
+        lines = [self.log_lines(records) for records in games]
+        with tempfile.TemporaryDirectory() as directory:
+            # two gzip members, as a rotated log appended to another one
+            compressed_path = os.path.join(directory, 'server.log.gz')
+            for game_lines in lines[:2]:
+                with gzip.open(compressed_path, 'at') as log_file:
+                    log_file.writelines(["DEBUG other output\n"] + game_lines)
+            # a game cut off by a new one, then a game with an invalid move
+            plain_path = os.path.join(directory, 'server.log')
+            with open(plain_path, 'w') as log_file:
+                log_file.writelines(lines[0][:10] + lines[2])
+                log_file.writelines(lines[1][:5] + [lines[1][3]] + lines[1][5:])
+                log_file.writelines(lines[3])
+            shards = os.path.join(directory, 'shards')
+            self.assertEqual(ingest([compressed_path, plain_path], shards),
+                             (4, sum(len(records) for records in games) // RECORD_SIZE, 2))
+            self.assertEqual(b''.join(read_shard(path).tobytes()
+                                      for path in list_shards(shards, 'log')),
+                             games[0] + games[1] + games[2] + games[3])
+
+    def test_ingest_after_truncated_corrupt_game(self):
+        np.random.seed(1)
+        games = [play_game_records(Player(Strategy.RANDOM), Player(Strategy.RANDOM)) for _ in range(2)]
+        lines = [self.log_lines(records) for records in games]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'server.log')
+            with open(path, 'w') as log_file:
+                # the first game repeats a move and is cut off before its end
+                log_file.writelines(lines[0][:3] + [lines[0][1]])
+                log_file.writelines(lines[1])
+            shards = os.path.join(directory, 'shards')
+            games_written, positions, skipped = ingest([path], shards)
+            self.assertEqual(games_written, 1)
+            self.assertEqual(skipped, 1)
+            self.assertEqual(read_shard(list_shards(shards, 'log')[0]).tobytes(), games[1])
+
+
+class TestArena(unittest.TestCase):
+    def test_play_match(self):
+        p1_score, p2_score = play_match(Player(Strategy.RANDOM), Player(Strategy.GREEDY))
+        self.assertLessEqual(p1_score + p2_score, 64)
+        self.assertGreater(p1_score + p2_score, 4)
+
+    def test_play_match_on_move(self):
+        test_board = Board()
+
+        def replay(board, player_number, move):
+            self.assertEqual(board.board_state, test_board.board_state)
+            test_board.make_move(move[0], move[1], player_number)
+
+        p1_score, p2_score = play_match(Player(Strategy.RANDOM), Player(Strategy.GREEDY),
+                                        on_move=replay)
+        self.assertEqual((test_board.score(1), test_board.score(2)), (p1_score, p2_score))
+
+    def test_play_match_invalid_move(self):
+        test_player = Player(Strategy.RANDOM)
+        with patch.object(test_player, 'get_move', return_value=[3, 3]):
+            self.assertRaises(ValueError, play_match, test_player, Player(Strategy.RANDOM))
+
+
+class TestStrategies(unittest.TestCase):
+    @patch('sys.stderr', new_callable=StringIO)
+    def test_serial_games_match_parallel_games(self, stderr):
+        player_numbers = [1, 2, 2, 1]
+        serial = run_many_othello_parallel(Player(Strategy.RANDOM), player_numbers, workers=1)
+        parallel = run_many_othello_parallel(Player(Strategy.RANDOM), player_numbers, workers=2)
+        self.assertEqual(serial, parallel)
+
 
 class TestPlayer(unittest.TestCase):
     def test_prepare_response_returns_a_valid_response(self):
@@ -192,6 +1125,36 @@ class TestPlayer(unittest.TestCase):
             test_board.board_state, 1), test_board.get_valid_moves(1))
         sys.stdout = sys.__stdout__
 
+    def test_get_move_solves_endgame(self):
+        test_player = Player(Strategy.RANDOM, endgame_empties=6)
+        self.assertEqual(test_player.get_move(TestEndgame.board, 1), [0, 1])
+        self.assertEqual(test_player.last_search.score, 40)
+        test_player.endgame_empties = 5
+        test_player.get_move(TestEndgame.board, 1)
+        self.assertIsNone(test_player.last_search)
+
+    def test_ponder_alpha_beta(self):
+        test_player = Player(Strategy.ALPHA_BETA, search_depth=2, ponder=True)
+        test_player.start_pondering(Board().board_state, 1, [2, 4])
+        test_player.ponder_thread.join()
+        test_player.stop_pondering()
+        # player 2 has three replies to [2, 4]
+        self.assertEqual(len(test_player.ponder_results), 3)
+        test_board = Board()
+        test_board.make_move(2, 4, 1)
+        test_board.make_move(2, 3, 2)
+        pondered = test_player.ponder_results[(test_board.bitboards[1], test_board.bitboards[2], 1)]
+        self.assertEqual(test_player.get_move(test_board.board_state, 1), pondered.move)
+        self.assertIs(test_player.last_search, pondered)
+
+    def test_ponder_mcts_until_stopped(self):
+        test_player = Player(Strategy.MCTS, ponder=True)
+        test_player.start_pondering(Board().board_state, 1, [2, 4])
+        test_player.stop_pondering()
+        self.assertIsNone(test_player.ponder_thread)
+        self.assertFalse(test_player.mcts.stopped)
+        self.assertGreater(test_player.mcts.root.visits, 0)
+
     def test_get_move(self):
         for strategy in Strategy:
             if strategy == Strategy.HUMAN:
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 
+import multiprocessing
 import os
 import subprocess
 import sys
 import time
 
 import numpy as np
+import arena
+from arena import play_match, seed_game
 from board import Board
+from ingest import GAME_OVER, LOG_PREFIX, parse_line
 from player import Player, Strategy
 from tqdm import tqdm
 
@@ -25,16 +29,9 @@ def update_board(line, board, verbose):
     -------
     tuple[int, int]: The scores of the two players if the game is over, otherwise False.
     """
-    if line.startswith("INFO  othello.server.text-ui:"):
-        if "Player one played" in line:
-            row = int(line[-5])
-            col = int(line[-3])
-            board.make_move(row, col, 1)
-        elif "Player two played" in line:
-            row = int(line[-5])
-            col = int(line[-3])
-            board.make_move(row, col, 2)
-        elif "Game over..." in line:
+    if line.startswith(LOG_PREFIX):
+        event = parse_line(line)
+        if event == GAME_OVER:
             if not board.check_game_over():
                 raise ValueError("Game over, but the board is not full.")
             p1_score = board.score(1)
@@ -44,6 +41,9 @@ def update_board(line, board, verbose):
                 print("\033[31mPlayer One\033[0m:", p1_score)
                 print("\033[34mPlayer Two\033[0m:", p2_score)
             return (p1_score, p2_score)
+        elif event is not None:
+            player_number, move = event
+            board.make_move(move[0], move[1], player_number)
     else:
         if verbose:
             print(line, end='')
@@ -133,6 +133,101 @@ def run_many_othello_remote(othello_jar_path, player, player_numbers, verbose=Fa
     return scores
 
 
+def run_othello_local(player, player_number, verbose=False):
+    """
+    Run an Othello game in this process against a random player.
+
+    Parameters
+    ----------
+    player (Player): The player being tested.
+    player_number (int): The number of the player being tested (1 or 2).
+    verbose (bool): Whether to print the moves and the final board.
+
+    Returns
+    -------
+    tuple[int, int]: The scores of the two players.
+    """
+    assert (player_number in [1, 2])
+    opponent = Player(Strategy.RANDOM)
+    if player_number == 1:
+        return play_match(player, opponent, verbose)
+    return play_match(opponent, player, verbose)
+
+
+def run_many_othello_local(player, player_numbers, verbose=False, seed=0):
+    """
+    Run multiple Othello games in this process against a random player.
+
+    Parameters
+    ----------
+    player (Player): The player being tested.
+    player_numbers (list[int]): The numbers of the player being tested (1 or 2).
+    verbose (bool): Whether to print the moves and the final board.
+    seed (int): The seed from which the seed of every game is derived (see
+        run_many_othello_parallel).
+
+    Returns
+    -------
+    list[tuple[int, int]]: The scores of the tested player and the opponent for each game.
+    """
+    scores = []
+    for index, player_number in enumerate(tqdm(player_numbers)):
+        seed_game(seed, index)
+        score = run_othello_local(player, player_number, verbose)
+        scores.append(score if player_number == 1 else score[::-1])
+    return scores
+
+
+def _run_seeded_game(game):
+    """
+    Run one game of run_many_othello_parallel in a worker process.
+
+    Parameters
+    ----------
+    game (tuple[int, int, int]): The index of the game, the number of the player being
+        tested (1 or 2), and the seed of the run.
+
+    Returns
+    -------
+    tuple[int, tuple[int, int]]: The index of the game and the scores of the tested
+        player and the opponent.
+    """
+    index, player_number, seed = game
+    seed_game(seed, index)
+    player, = arena.worker_args
+    score = run_othello_local(player, player_number)
+    return index, (score if player_number == 1 else score[::-1])
+
+
+def run_many_othello_parallel(player, player_numbers, workers=None, seed=0):
+    """
+    Run multiple Othello games against a random player, spread over a pool of processes.
+
+    Parameters
+    ----------
+    player (Player): The player being tested. Each worker process gets its own copy.
+    player_numbers (list[int]): The numbers of the player being tested (1 or 2).
+    workers (int): The number of worker processes, or None to use every core. With one
+        worker, the games are run in this process (see run_many_othello_local).
+    seed (int): The seed from which the seed of every game is derived, so that game i
+        plays the same way whatever the number of workers.
+
+    Returns
+    -------
+    list[tuple[int, int]]: The scores of the tested player and the opponent for each game,
+        in the order of player_numbers.
+    """
+    if workers == 1:
+        return run_many_othello_local(player, player_numbers, seed=seed)
+    games = [(index, int(player_number), seed) for index, player_number in enumerate(player_numbers)]
+    scores = [None] * len(games)
+    with multiprocessing.Pool(workers, initializer=arena.init_worker, initargs=(player,)) as pool:
+        # results stream back as soon as each game finishes
+        for index, score in tqdm(pool.imap_unordered(_run_seeded_game, games), total=len(games)):
+            scores[index] = score
+    return scores
+
+
 def process_scores(scores):
     """
     Process the scores from multiple games.
@@ -197,13 +292,25 @@ if __name__ == "__main__":
     Parameters
     ----------
     num_games (int): The number of games to run.
+    --remote: Play against the random player of othello.jar instead of in this process.
+    --workers=<n>: The number of processes to run the games on (default: every core).
     """
     num_games = 100
-    if len(sys.argv) > 1:
-        if sys.argv[1].isnumeric() and int(sys.argv[1]) > 0:
-            num_games = int(sys.argv[1])
+    remote = False
+    workers = None
+    args = []
+    for arg in sys.argv[1:]:
+        if arg == '--remote':
+            remote = True
+        elif arg.startswith('--workers=') and arg[len('--workers='):].isnumeric():
+            workers = int(arg[len('--workers='):])
+        else:
+            args.append(arg)
+    if len(args) > 0:
+        if len(args) == 1 and args[0].isnumeric() and int(args[0]) > 0:
+            num_games = int(args[0])
         else:
-            print("Usage: python test_strategies.py <num_games>")
+            print("Usage: python test_strategies.py <num_games> [--remote] [--workers=<n>]")
             sys.exit(1)
     for strategy in Strategy:
         if strategy == Strategy.HUMAN:
@@ -213,6 +320,10 @@ if __name__ == "__main__":
         remote_player = Player(strategy)
         player_numbers = np.random.choice([1, 2], num_games)
         verbose = False
-        wins, losses, ties = process_scores(run_many_othello_remote(
-            othello_jar_path, remote_player, player_numbers, verbose))
+        if remote:
+            scores = run_many_othello_remote(
+                othello_jar_path, remote_player, player_numbers, verbose)
+        else:
+            scores = run_many_othello_parallel(remote_player, player_numbers, workers)
+        wins, losses, ties = process_scores(scores)
         display_results(wins, losses, ties)
@@ -0,0 +1,201 @@
+"""
+Time management of the moves played against a server that allows maxTurnTime seconds
+per move.
+
+TimeManager turns the server's limit into two times measured from the moment the
+server's message was received: the budget, until which the strategy may search, and
+the hard limit, by which a move is sent whatever happens. The hard limit keeps a safety
+margin before the server's limit for the network and the server's own clock, and the
+budget grows from the opening to the endgame, where deeper searches pay off most.
+Watchdog runs the move selection on a thread and, at the hard limit, delivers the best
+move found so far instead of waiting for it.
+"""
+
+import threading
+import time
+
+from metrics import percentile
+
+# Seconds kept between the hard limit and the server's limit, plus a fraction of the
+# server's limit (at most half of the limit is kept in total)
+SAFETY_MARGIN = 0.05
+SAFETY_FRACTION = 0.05
+# Seconds between the end of the budget and the hard limit, for a search to notice its
+# deadline and return before the watchdog fires
+WATCHDOG_MARGIN = 0.03
+# (fewest empty squares, fraction of the usable time) of each phase of the game,
+# from the opening to the endgame
+PHASE_FRACTIONS = [(50, 0.3), (40, 0.7), (0, 1.0)]
+
+
+class TimeManager:
+    """
+    Budgets of the moves of a player and statistics of the time they used.
+    """
+
+    def __init__(self, safety_margin=SAFETY_MARGIN, safety_fraction=SAFETY_FRACTION):
+        """
+        Parameters
+        ----------
+        safety_margin (float): The seconds kept before the server's limit.
+        safety_fraction (float): The fraction of the server's limit kept in addition.
+        """
+        self.safety_margin = safety_margin
+        self.safety_fraction = safety_fraction
+        self.budget = None  # budget and hard limit of the current move, in seconds
+        self.hard_limit = None
+        self.max_turn_time = None
+        self.num_moves = 0
+        self.used = []  # fraction of the server's limit used by each move
+        self.budget_overruns = 0
+        self.deadline_overruns = 0
+        self.worst_overrun = 0.0  # seconds past the server's limit
+        self.watchdog_moves = 0
+
+    def get_hard_limit(self, max_turn_time):
+        """
+        Get the time by which a move must be sent.
+
+        Parameters
+        ----------
+        max_turn_time (float): The seconds allowed per move by the server.
+
+        Returns
+        -------
+        float: The seconds after the server's message was received.
+        """
+        margin = min(self.safety_margin + self.safety_fraction * max_turn_time, max_turn_time / 2)
+        return max_turn_time - margin
+
+    def get_budget(self, max_turn_time, empties):
+        """
+        Get the time a strategy may search for a move.
+
+        Parameters
+        ----------
+        max_turn_time (float): The seconds allowed per move by the server.
+        empties (int): The number of empty squares of the position.
+
+        Returns
+        -------
+        float: The seconds after the server's message was received.
+        """
+        fraction = next(fraction for fewest, fraction in PHASE_FRACTIONS if empties >= fewest)
+        return max(self.get_hard_limit(max_turn_time) - WATCHDOG_MARGIN, 0.0) * fraction
+
+    def start_move(self, max_turn_time, empties):
+        """
+        Compute the budget and the hard limit of a move, and remember them for finish_move.
+
+        Parameters
+        ----------
+        max_turn_time (float): The seconds allowed per move by the server.
+        empties (int): The number of empty squares of the position.
+
+        Returns
+        -------
+        tuple[float, float]: The budget and the hard limit, in seconds after the server's
+            message was received.
+        """
+        self.max_turn_time = max_turn_time
+        self.budget = self.get_budget(max_turn_time, empties)
+        self.hard_limit = self.get_hard_limit(max_turn_time)
+        return self.budget, self.hard_limit
+
+    def finish_move(self, elapsed, late=False):
+        """
+        Record the time used by the move started last.
+
+        Parameters
+        ----------
+        elapsed (float): The seconds from receiving the server's message to sending the move.
+        late (bool): Whether the watchdog delivered the move.
+        """
+        assert (self.max_turn_time is not None)
+        self.num_moves += 1
+        self.used.append(elapsed / self.max_turn_time if self.max_turn_time > 0 else 1.0)
+        if elapsed > self.budget:
+            self.budget_overruns += 1
+        if elapsed > self.max_turn_time:
+            self.deadline_overruns += 1
+            self.worst_overrun = max(self.worst_overrun, elapsed - self.max_turn_time)
+        if late:
+            self.watchdog_moves += 1
+
+    def summary(self):
+        """
+        Summarize the recorded moves.
+
+        Returns
+        -------
+        dict: The number of moves, the p50 and p99 of the fraction of the server's limit
+            used, the number of moves past their budget and past the server's limit, the
+            largest overrun of the server's limit in seconds, and the number of moves
+            delivered by the watchdog.
+        """
+        return dict(moves=self.num_moves,
+                    used_p50=percentile(self.used, 0.5),
+                    used_p99=percentile(self.used, 0.99),
+                    budget_overruns=self.budget_overruns,
+                    deadline_overruns=self.deadline_overruns,
+                    worst_overrun=self.worst_overrun,
+                    watchdog_moves=self.watchdog_moves)
+
+
+class Watchdog:
+    """
+    Runner of move selections on a thread, returning at a deadline whether or not the
+    selection has finished. A late selection keeps running until it returns, and the
+    next run waits for it, so two selections never run at once.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.fired = False  # whether the last run hit its deadline
+
+    def wait(self):
+        """Wait for a late selection to finish."""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self, select, deadline, stop, fallback):
+        """
+        Run a selection until a deadline.
+
+        Parameters
+        ----------
+        select (function): The selection, called without arguments on the thread.
+        deadline (float): The time.perf_counter() by which to return.
+        stop (function): Called at the deadline to end the selection early.
+        fallback (function): Called at the deadline to get the best move found so far.
+
+        Returns
+        -------
+        list[int]: The move selected, or the fallback's move if the selection is late.
+
+        Raises
+        ------
+        Exception: Whatever the selection raised, if it finished by the deadline.
+        """
+        self.wait()
+        outcome = []
+
+        def target():
+            try:
+                outcome.append((True, select()))
+            except BaseException as error:
+                outcome.append((False, error))
+
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        self.thread.join(max(deadline - time.perf_counter(), 0.0))
+        self.fired = not outcome
+        if self.fired:
+            stop()
+            return fallback()
+        self.thread = None
+        succeeded, value = outcome[0]
+        if not succeeded:
+            raise value
+        return value
@@ -0,0 +1,165 @@
+from enum import IntEnum
+
+# Each entry is two 64-bit words: the key XOR the data, and the data.
+# Storing the key XOR the data means an entry torn by a concurrent write fails
+# verification instead of returning the data of another position.
+ENTRY_BYTES = 16
+# Entries are grouped in buckets of two: a depth-preferred slot and an
+# always-replace slot
+BUCKET_ENTRIES = 2
+
+# Layout of the data word
+SCORE_BITS = 32
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+DEPTH_SHIFT = 32
+FLAG_SHIFT = 40
+MOVE_SHIFT = 42
+GENERATION_SHIFT = 49
+NO_MOVE = 64
+
+
+def table_nbytes(size_mb):
+    """
+    Compute the number of bytes used by the entries of a table.
+
+    Parameters
+    ----------
+    size_mb (float): The memory to use for entries, in megabytes.
+
+    Returns
+    -------
+    int: The size of the largest power of two number of buckets that fits.
+    """
+    bucket_bytes = BUCKET_ENTRIES * ENTRY_BYTES
+    num_buckets = 1
+    while num_buckets * 2 * bucket_bytes <= size_mb * 2**20:
+        num_buckets *= 2
+    return num_buckets * bucket_bytes
+
+
+class Bound(IntEnum):
+    """Enum for how a stored score relates to the true score of the position."""
+    EXACT = 1
+    LOWER = 2  # the true score is at least the stored score (fail high)
+    UPPER = 3  # the true score is at most the stored score (fail low)
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Every bucket has a depth-preferred slot, which keeps the deepest result of the
+    current search, and an always-replace slot, which takes everything else.
+    """
+
+    def __init__(self, size_mb=16, buffer=None):
+        """
+        Parameters
+        ----------
+        size_mb (float): The memory to use for entries, in megabytes. The number of
+            buckets is rounded down to a power of two.
+        buffer (object): A writable buffer to store the entries in, e.g. the buf of a
+            multiprocessing.shared_memory.SharedMemory. A new one is allocated if None.
+        """
+        self.num_buckets = table_nbytes(size_mb) // (BUCKET_ENTRIES * ENTRY_BYTES)
+        self.mask = self.num_buckets - 1
+        if buffer is None:
+            buffer = bytearray(self.nbytes)
+        self.buffer = memoryview(buffer)[:self.nbytes]
+        self.words = self.buffer.cast('Q')
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @property
+    def nbytes(self):
+        """int: The number of bytes used by the entries."""
+        return self.num_buckets * BUCKET_ENTRIES * ENTRY_BYTES
+
+    def new_search(self):
+        """Mark the start of a new search, so entries from earlier searches are replaced first."""
+        self.generation = (self.generation + 1) & 0x7F
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        self.buffer[:] = bytes(self.nbytes)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def probe(self, key):
+        """
+        Look up a position.
+
+        Parameters
+        ----------
+        key (int): The Zobrist hash of the position.
+
+        Returns
+        -------
+        tuple[int, Bound, int, int]: The (depth, bound, score, move square) stored for
+            the position, or None if it is not in the table. The move square is None
+            if no best move was stored.
+        """
+        words = self.words
+        index = (key & self.mask) * (BUCKET_ENTRIES * 2)
+        for slot in range(index, index + BUCKET_ENTRIES * 2, 2):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.hits += 1
+                move = (data >> MOVE_SHIFT) & 0x7F
+                return ((data >> DEPTH_SHIFT) & 0xFF,
+                        Bound((data >> FLAG_SHIFT) & 0x3),
+                        (data & 0xFFFFFFFF) - SCORE_OFFSET,
+                        None if move == NO_MOVE else move)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Store the result of searching a position.
+
+        Parameters
+        ----------
+        key (int): The Zobrist hash of the position.
+        depth (int): The depth the position was searched to.
+        bound (Bound): How the score relates to the true score of the position.
+        score (int): The score of the position.
+        move (int): The square of the best move, or None if there is none.
+        """
+        words = self.words
+        data = ((score + SCORE_OFFSET) |
+                (depth << DEPTH_SHIFT) |
+                (bound << FLAG_SHIFT) |
+                ((NO_MOVE if move is None else move) << MOVE_SHIFT) |
+                (self.generation << GENERATION_SHIFT))
+        index = (key & self.mask) * (BUCKET_ENTRIES * 2)
+        slot = index
+        old = words[slot + 1]
+        if old and words[slot] ^ old != key and \
+                (old >> GENERATION_SHIFT) == self.generation and \
+                ((old >> DEPTH_SHIFT) & 0xFF) > depth:
+            # keep the deeper result and use the always-replace slot
+            slot = index + 2
+            old = words[slot + 1]
+        if old and words[slot] ^ old != key:
+            self.overwrites += 1
+        words[slot] = key ^ data
+        words[slot + 1] = data
+        self.stores += 1
+
+    def stats(self):
+        """
+        Get the usage counters of the table.
+
+        Returns
+        -------
+        dict[str, int]: The number of hits, misses, stores and overwrites, and the
+            number of entries the table can hold.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores,
+                'overwrites': self.overwrites,
+                'entries': self.num_buckets * BUCKET_ENTRIES}
@@ -0,0 +1,217 @@
+"""
+NumPy versions of the bitboard primitives that work on arrays of positions.
+
+Every function takes and returns arrays of np.uint64 masks with the same layout
+as bitboard.py, so a batch of N positions is two arrays of shape (N,).
+"""
+
+import numpy as np
+
+import bitboard
+
+# (shift, mask) pairs as in bitboard.SHIFTS, split by the direction of the shift
+SHIFTS = [(step > 0, np.uint64(abs(step)), np.uint64(mask)) for step, mask in bitboard.SHIFTS]
+STABILITY_AXES = [(np.uint64(edge),
+                   (np.uint64(forward[0]), np.uint64(forward[1])),
+                   (np.uint64(-backward[0]), np.uint64(backward[1])))
+                  for edge, forward, backward in bitboard.STABILITY_AXES]
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def to_array(masks):
+    """
+    Convert a sequence of integer masks to an array.
+
+    Parameters
+    ----------
+    masks (iterable[int]): The masks.
+
+    Returns
+    -------
+    np.ndarray: The masks as an array of np.uint64.
+    """
+    return np.fromiter(masks, dtype=np.uint64)
+
+
+def popcount(bits):
+    """
+    Count the set bits of every mask.
+
+    Parameters
+    ----------
+    bits (np.ndarray): An array of masks.
+
+    Returns
+    -------
+    np.ndarray: The number of set bits of each mask, as np.int64.
+    """
+    bits = bits - ((bits >> np.uint64(1)) & _M1)
+    bits = (bits & _M2) + ((bits >> np.uint64(2)) & _M2)
+    bits = (bits + (bits >> np.uint64(4))) & _M4
+    return ((bits * _H01) >> np.uint64(56)).astype(np.int64)
+
+
+def shift(bits, forward, step, mask):
+    """
+    Shift every mask one step in a direction (see bitboard.shift).
+
+    Parameters
+    ----------
+    bits (np.ndarray): An array of masks.
+    forward (bool): True to shift towards higher bit indices.
+    step (np.uint64): The size of the shift.
+    mask (np.uint64): The mask that removes bits wrapping around the board edge.
+
+    Returns
+    -------
+    np.ndarray: The shifted masks.
+    """
+    if forward:
+        return (bits << step) & mask
+    return (bits >> step) & mask
+
+
+def get_moves(player, opponent):
+    """
+    Compute the legal moves of every position (see bitboard.get_moves).
+
+    Parameters
+    ----------
+    player (np.ndarray): The masks of the discs of the player to move.
+    opponent (np.ndarray): The masks of the opponent's discs.
+
+    Returns
+    -------
+    np.ndarray: The masks of legal moves.
+    """
+    empty = ~(player | opponent)
+    moves = np.zeros_like(player)
+    for forward, step, mask in SHIFTS:
+        candidates = shift(player, forward, step, mask) & opponent
+        for _ in range(5):
+            candidates |= shift(candidates, forward, step, mask) & opponent
+        moves |= shift(candidates, forward, step, mask)
+    return moves & empty
+
+
+def get_flips(player, opponent, move_bits):
+    """
+    Compute the discs flipped by a move in every position (see bitboard.get_flips).
+
+    Parameters
+    ----------
+    player (np.ndarray): The masks of the discs of the player to move.
+    opponent (np.ndarray): The masks of the opponent's discs.
+    move_bits (np.ndarray): Masks with only the bit of each move set.
+
+    Returns
+    -------
+    np.ndarray: The masks of flipped discs.
+    """
+    flips = np.zeros_like(player)
+    for forward, step, mask in SHIFTS:
+        line = np.zeros_like(player)
+        bits = shift(move_bits, forward, step, mask)
+        for _ in range(6):
+            # only keep extending lines that are still running over opponent discs
+            bits &= opponent
+            line |= bits
+            bits = shift(bits, forward, step, mask)
+        # a line only flips if the square after it holds one of the player's discs
+        closed = shift(line, forward, step, mask) & player
+        flips |= np.where(closed != 0, line, np.uint64(0))
+    return flips
+
+
+def get_stable(player):
+    """
+    Compute the stable discs of every position (see bitboard.get_stable).
+
+    Parameters
+    ----------
+    player (np.ndarray): The masks of the player's discs.
+
+    Returns
+    -------
+    np.ndarray: The masks of stable discs.
+    """
+    stable = np.zeros_like(player)
+    while True:
+        candidates = player & ~stable
+        for edge, (step_1, mask_1), (step_2, mask_2) in STABILITY_AXES:
+            candidates &= edge | ((stable << step_1) & mask_1) | ((stable >> step_2) & mask_2)
+        if not candidates.any():
+            return stable
+        stable |= candidates
+
+
+def get_frontier(player, opponent):
+    """
+    Compute the frontier discs of every position: discs next to at least one empty square.
+
+    Parameters
+    ----------
+    player (np.ndarray): The masks of the player's discs.
+    opponent (np.ndarray): The masks of the opponent's discs.
+
+    Returns
+    -------
+    np.ndarray: The masks of the player's frontier discs.
+    """
+    empty = ~(player | opponent)
+    near_empty = np.zeros_like(player)
+    for forward, step, mask in SHIFTS:
+        near_empty |= shift(empty, forward, step, mask)
+    return player & near_empty
+
+
+def get_children(board, player_number):
+    """
+    Compute every position reachable with one move of a player, all at once.
+
+    Parameters
+    ----------
+    board (Board): The current position.
+    player_number (int): The number of the player to move (1 or 2).
+
+    Returns
+    -------
+    tuple[list[list[int]], np.ndarray, np.ndarray]: The moves as [row, column], and the
+        masks of the player's and the opponent's discs after each move.
+    """
+    player = board.bitboards[player_number]
+    opponent = board.bitboards[3 - player_number]
+    squares = list(bitboard.iter_bits(bitboard.get_moves(player, opponent)))
+    move_bits = to_array(1 << square for square in squares)
+    players = np.full(len(squares), player, dtype=np.uint64)
+    opponents = np.full(len(squares), opponent, dtype=np.uint64)
+    flips = get_flips(players, opponents, move_bits)
+    return [[square >> 3, square & 7] for square in squares], players | flips | move_bits, opponents ^ flips
+
+
+def evaluate(players, opponents):
+    """
+    Compute the evaluation signals of a batch of positions.
+
+    Parameters
+    ----------
+    players (np.ndarray): The masks of the player's discs.
+    opponents (np.ndarray): The masks of the opponent's discs.
+
+    Returns
+    -------
+    dict[str, np.ndarray]: 'discs', 'stable', 'frontier' and 'mobility' hold the player's
+        disc count, stable disc count, frontier disc count and number of legal moves in
+        each position, and 'opponent_mobility' the opponent's number of legal moves.
+    """
+    return {
+        'discs': popcount(players),
+        'stable': popcount(get_stable(players)),
+        'frontier': popcount(get_frontier(players, opponents)),
+        'mobility': popcount(get_moves(players, opponents)),
+        'opponent_mobility': popcount(get_moves(opponents, players)),
+    }
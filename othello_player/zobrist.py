@@ -0,0 +1,61 @@
+"""
+Zobrist keys for hashing Othello positions.
+
+The hash of a position is the XOR of one random key per occupied square and
+player. The keys come from a fixed seed so that every process (and every run)
+computes the same hash for the same position.
+"""
+
+import numpy as np
+
+import bitboard
+
+_rng = np.random.default_rng(0x07E110)
+
+# KEYS[player_number][square], index 0 is unused like Board.bitboards
+KEYS = [[0] * 64] + [[int(key) for key in _rng.integers(0, 2**64, size=64, dtype=np.uint64)]
+                     for _ in range(2)]
+# Flipping a disc removes it from one player and adds it to the other, which is
+# the same XOR whichever way it goes
+FLIP_KEYS = [KEYS[1][square] ^ KEYS[2][square] for square in range(64)]
+# XORed into the hash when player 2 is to move
+SIDE_KEY = int(_rng.integers(0, 2**64, dtype=np.uint64))
+
+
+def hash_position(player_1, player_2):
+    """
+    Compute the Zobrist hash of a position from scratch.
+
+    Parameters
+    ----------
+    player_1 (int): The mask of player 1's discs.
+    player_2 (int): The mask of player 2's discs.
+
+    Returns
+    -------
+    int: The 64-bit hash of the position.
+    """
+    key = 0
+    for square in bitboard.iter_bits(player_1):
+        key ^= KEYS[1][square]
+    for square in bitboard.iter_bits(player_2):
+        key ^= KEYS[2][square]
+    return key
+
+
+def hash_flips(flips):
+    """
+    Compute the change in hash caused by flipping discs.
+
+    Parameters
+    ----------
+    flips (int): A mask of the flipped discs.
+
+    Returns
+    -------
+    int: The value to XOR into the hash.
+    """
+    key = 0
+    for square in bitboard.iter_bits(flips):
+        key ^= FLIP_KEYS[square]
+    return key